@@ -1,12 +1,145 @@
 from jvpm.ClassFile import ClassFile
+from jvpm.ClassCache import ClassCache, default_directory
+from jvpm.ClassLoader import ClassLoader
+from jvpm.ClassPath import ClassPath
+from jvpm.Linker import Linker
+from jvpm import ClassScan
+from jvpm import Analysis
+from jvpm import SharedImage
+from jvpm import Runner
+from jvpm import Server
+from jvpm.Profiler import Profiler
+from jvpm.Coverage import Coverage
+from jvpm.Sampler import Sampler
+import argparse
+import os
 import sys
+import time
 
-def main(path):
-    java = ClassFile(path)
+def main(path, cache_dir=None, classpath=None):
+    cache = None if cache_dir is None else ClassCache(cache_dir)
+    if classpath is not None:
+        # start from main and load only the classes it reaches
+        with ClassPath.parse(classpath) as entries:
+            Linker(ClassLoader(entries, cache=cache)).run(path)
+        return
+    java = ClassFile(path) if cache is None else cache.load(path)
     java.run_opcodes()
 
+def profile_main(path, json_path=None, top=10):
+    profiler = Profiler()
+    profiler.run(ClassFile(path))
+    sys.stderr.write(profiler.report(top))
+    if json_path is not None:
+        profiler.save_json(json_path)
+
+def coverage_main(paths, json_path):
+    coverage = Coverage()
+    errors = 0
+    for path in paths:
+        # a class that fails keeps what it covered, and the rest of the classes still run
+        try:
+            coverage.run(ClassFile(path))
+        except Exception as exc:
+            sys.stderr.write('%s: %s: %s\n' % (path, type(exc).__name__, exc))
+            errors += 1
+    if os.path.exists(json_path):
+        # add the blocks covered by earlier runs
+        coverage.merge(Coverage.load_json(json_path))
+    coverage.save_json(json_path)
+    sys.stderr.write(coverage.report())
+    return 1 if errors else 0
+
+def sample_main(paths, collapsed_path, interval, cache_dir=None):
+    with Sampler(interval) as sampler:
+        for path in paths:
+            main(path, cache_dir)
+    sampler.save(collapsed_path)
+
+def batch_main(paths, jobs, shared=False):
+    start = time.perf_counter()
+    if shared:
+        results = SharedImage.run_files_shared(paths, jobs)
+    else:
+        results = Runner.run_files(paths, jobs)
+    for result in results:
+        sys.stdout.write(Runner.format_result(result))
+    print("Ran %d class files in %.3fs" % (len(results), time.perf_counter() - start))
+    return 1 if any(result.error is not None for result in results) else 0
+
+def scan_main(paths):
+    return 1 if ClassScan.write_records(ClassScan.scan(paths), sys.stdout) else 0
+
+def analyze_main(paths, jobs, json_path=None, top=10):
+    stats = Analysis.analyze(paths, jobs)
+    sys.stdout.write(stats.report(top))
+    if json_path is not None:
+        stats.save_json(json_path)
+    return 1 if stats.errors else 0
+
+def connect_main(socket_path, paths):
+    stdin = '' if sys.stdin.isatty() else sys.stdin.read()
+    for path in paths:
+        Server.request(socket_path, path, stdin)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Runs java .class files.")
+    parser.add_argument('paths', nargs='*', help="class files, or directories to search for class files")
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help="run the class files on this many worker processes")
+    parser.add_argument('--shared', action='store_true',
+                        help="parse the class files once and share them with the worker processes in shared memory")
+    parser.add_argument('--serve', metavar='SOCKET',
+                        help="keep parsed class files warm in a server listening on this UNIX socket")
+    parser.add_argument('--connect', metavar='SOCKET',
+                        help="run the class files on the server listening on this UNIX socket")
+    parser.add_argument('--profile', action='store_true',
+                        help="count and time every opcode and instruction, and print the top ones")
+    parser.add_argument('--profile-json', metavar='PATH', help="also write the profile to this JSON file")
+    parser.add_argument('--top', type=int, default=10, help="number of rows in each profile table")
+    parser.add_argument('--coverage', metavar='PATH',
+                        help="record the basic blocks each method runs, merged into this JSON file, and print a report")
+    parser.add_argument('--sample', metavar='PATH',
+                        help="sample the Java call stack while running and write collapsed stacks to this file")
+    parser.add_argument('--sample-interval', type=float, default=0.005, metavar='SECONDS',
+                        help="time between Java call stack samples")
+    parser.add_argument('--cache', metavar='DIR', nargs='?', const='',
+                        help="keep parsed class files in this cache directory (default $JVPM_CACHE_DIR or ~/.cache/jvpm)")
+    parser.add_argument('--scan', action='store_true',
+                        help="print the name, super class and members of every class as JSON lines without running")
+    parser.add_argument('--analyze', action='store_true',
+                        help="report opcode, method size and constant pool statistics over the class files")
+    parser.add_argument('--analyze-json', metavar='PATH', help="also write the statistics to this JSON file")
+    parser.add_argument('--classpath', '-cp', metavar='PATHS',
+                        help="directories and .jar files to load classes from; the paths are then class names")
+    args = parser.parse_args(argv)
+    if args.cache == '':
+        args.cache = default_directory()
+    if not args.paths and args.serve is None:
+        parser.error("A path to a java .class file is required. Try the format: python __main__.py <path>")
+    return args
+
 if '__main__' == __name__: #pragma: no cover
-    try:
-        main(sys.argv[1])
-    except:
-        print("A path to a java .class file is required. Try the format: python __main__.py <path>")
\ No newline at end of file
+    args = parse_args(sys.argv[1:])
+    if args.serve is not None:
+        Server.serve(args.serve)
+    elif args.connect is not None:
+        connect_main(args.connect, args.paths)
+    elif args.scan:
+        sys.exit(scan_main(args.paths))
+    elif args.analyze or args.analyze_json is not None:
+        sys.exit(analyze_main(args.paths, args.jobs, args.analyze_json, args.top))
+    elif args.profile or args.profile_json is not None:
+        for path in args.paths:
+            profile_main(path, args.profile_json, args.top)
+    elif args.coverage is not None:
+        sys.exit(coverage_main(args.paths, args.coverage))
+    elif args.sample is not None:
+        sample_main(args.paths, args.sample, args.sample_interval, args.cache)
+    elif args.jobs is None and not args.shared and len(args.paths) == 1:
+        try:
+            main(args.paths[0], args.cache, args.classpath)
+        except:
+            print("A path to a java .class file is required. Try the format: python __main__.py <path>")
+    else:
+        sys.exit(batch_main(args.paths, args.jobs or 1, args.shared))
@@ -0,0 +1,48 @@
+"""
+Runs the benchmarks and compares results against a stored baseline
+
+    python -m benchmarks run [--output results.json] [--filter 'parse.*']
+    python -m benchmarks compare baseline.json results.json [--threshold 0.1]
+    python -m benchmarks memory
+"""
+import argparse
+import sys
+from benchmarks import harness
+from benchmarks import memory
+from benchmarks import bench_opcodes, bench_parse, bench_run  # register the benchmarks
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Times the parser and interpreter.")
+    commands = parser.add_subparsers(dest='command')
+    run = commands.add_parser('run', help="run the benchmarks")
+    run.add_argument('--output', '-o', default='benchmark_results.json', help="JSON file to write the results to")
+    run.add_argument('--filter', '-k', action='append', help="only run benchmarks matching this glob pattern")
+    run.add_argument('--repeat', type=int, default=5, help="number of timed repeats of each benchmark")
+    compare = commands.add_parser('compare', help="flag regressions against a baseline")
+    compare.add_argument('baseline', help="JSON results to compare against")
+    compare.add_argument('current', help="JSON results to check")
+    compare.add_argument('--threshold', type=float, default=0.10,
+                         help="relative slowdown that counts as a regression")
+    commands.add_parser('memory', help="show the memory kept by each parsed class")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = harness.run(args.filter, args.repeat, out=sys.stdout)
+        harness.save(results, args.output)
+        print("Wrote %d results to %s" % (len(results['results']), args.output))
+        return 0
+    if args.command == 'compare':
+        rows = harness.compare(harness.load(args.baseline), harness.load(args.current), args.threshold)
+        for name, before, after, ratio, status in rows:
+            print('%-48s %12.3f us %12.3f us %7.2fx  %s' % (name, before * 1e6, after * 1e6, ratio, status))
+        regressions = [row for row in rows if row[4] == 'regression']
+        print("%d regressions in %d benchmarks" % (len(regressions), len(rows)))
+        return 1 if regressions else 0
+    if args.command == 'memory':
+        memory.run(sys.stdout)
+        return 0
+    parser.print_help()
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
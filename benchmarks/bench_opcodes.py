@@ -0,0 +1,59 @@
+"""
+Micro benchmarks for the OpCodes handlers, each timed through OpCodes.interpret
+"""
+from jvpm.ClassFile import ConstantInfo
+from jvpm.OpCodes import OpCodes
+from benchmarks.harness import benchmark
+
+def _constant(tag, info):
+    const = ConstantInfo()
+    const.tag = tag
+    const.info = list(info)
+    return const
+
+# opcode name, opcode, values pushed before each run, operands
+_CASES = [('iconst_1', 0x04, [], None), ('iadd', 0x60, [1, 2], None), ('isub', 0x64, [1, 2], None),
+          ('imul', 0x68, [3, 2], None), ('idiv', 0x6c, [6, 3], None), ('irem', 0x70, [7, 3], None),
+          ('ishl', 0x78, [1, 3], None), ('iushr', 0x7c, [-8, 1], None), ('ixor', 0x82, [5, 3], None),
+          ('iload', 0x15, [], [0]), ('iload_0', 0x1a, [], None), ('istore_0', 0x3b, [1], None),
+          ('fadd', 0x62, [1.5, 2.5], None), ('fmul', 0x6a, [1.5, 2.5], None), ('fdiv', 0x6e, [1.5, 2.5], None),
+          ('fstore_0', 0x43, [1.5], None), ('fload_0', 0x22, [], None),
+          ('ladd', 0x61, [0, 1, 0, 2], None), ('lmul', 0x69, [0, 3, 0, 2], None), ('lstore_0', 0x3f, [0, 1], None),
+          ('i2f', 0x86, [3], None), ('l2i', 0x88, [0, 3], None)]
+
+def _case(value, pushed, operands):
+    ops = OpCodes()
+    ops._lva = [1, 2]
+    interpret = ops.interpret
+    stack = ops._op_stack
+    def run():
+        del stack[:]
+        stack.extend(pushed)
+        if operands is None:
+            interpret(value)
+        else:
+            interpret(value, list(operands))
+    return run
+
+for _name, _value, _pushed, _operands in _CASES:
+    benchmark('opcode.%s' % _name)(lambda value=_value, pushed=_pushed, operands=_operands:
+                                   _case(value, pushed, operands))
+
+@benchmark('opcode.ldc')
+def ldc():
+    ops = OpCodes()
+    c_pool = [_constant(1, b'Hello World')]
+    def run():
+        ops.interpret(0x12, [1], c_pool)
+        ops._op_stack.pop()
+    return run
+
+@benchmark('opcode.execute_iadd')
+def execute_iadd():
+    ops = OpCodes()
+    code = [0x60]
+    def run():
+        ops._op_stack.extend((1, 2))
+        ops.execute(code, 0)
+        ops._op_stack.pop()
+    return run
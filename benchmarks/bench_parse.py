@@ -0,0 +1,39 @@
+"""
+Benchmarks for parsing class files
+"""
+import atexit
+import os
+import shutil
+import tempfile
+from jvpm.ClassFile import ClassFile
+from benchmarks.harness import benchmark
+from benchmarks.synthetic import synthetic_class
+
+CLASS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'jvpm')
+_TEMP = tempfile.mkdtemp(prefix='jvpm-bench-')
+atexit.register(shutil.rmtree, _TEMP, True)
+
+def _synthetic_path(name, constants, code_length):
+    path = os.path.join(_TEMP, name + '.class')
+    if not os.path.exists(path):
+        with open(path, 'wb') as class_file:
+            class_file.write(synthetic_class(constants, code_length))
+    return path
+
+def _parse(path):
+    return lambda: ClassFile(path)
+
+for _name in ('Add', 'AddTwo', 'Foo', 'test'):
+    benchmark('parse.%s' % _name)(lambda name=_name: _parse(os.path.join(CLASS_DIRECTORY, name + '.class')))
+
+@benchmark('parse.synthetic_pool_10k')
+def parse_large_pool():
+    return _parse(_synthetic_path('pool_10k', 10000, 100))
+
+@benchmark('parse.synthetic_pool_65k')
+def parse_full_pool():
+    return _parse(_synthetic_path('pool_65k', 65000, 100))
+
+@benchmark('parse.synthetic_code_64k')
+def parse_large_code():
+    return _parse(_synthetic_path('code_64k', 100, 65532))
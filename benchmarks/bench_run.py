@@ -0,0 +1,23 @@
+"""
+End to end benchmarks of ClassFile.run_opcodes
+"""
+import contextlib
+import io
+import os
+from jvpm.ClassFile import ClassFile
+from benchmarks.harness import benchmark
+from benchmarks.bench_parse import CLASS_DIRECTORY, _synthetic_path
+
+def _run(path):
+    java = ClassFile(path)
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            java.run_opcodes()
+    return run
+
+for _name in ('Add', 'Foo', 'test'):
+    benchmark('run.%s' % _name)(lambda name=_name: _run(os.path.join(CLASS_DIRECTORY, name + '.class')))
+
+@benchmark('run.synthetic_arithmetic_10k')
+def run_arithmetic():
+    return _run(_synthetic_path('code_10k', 100, 10000))
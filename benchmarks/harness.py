@@ -0,0 +1,91 @@
+"""
+Module that registers, times and compares benchmarks
+"""
+import fnmatch
+import json
+import platform
+import sys
+import time
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    """
+    Registers a benchmark under name. The decorated function does any setup and returns the
+    zero-argument callable that is timed.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+def measure(func, repeat=5, min_time=0.02):
+    """
+    Returns (best seconds per call, calls per repeat). The number of calls is raised until one repeat
+    takes at least min_time, and the best of repeat runs is kept.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / loops, loops
+
+def run(patterns=None, repeat=5, min_time=0.02, out=None):
+    """
+    Runs every registered benchmark whose name matches one of the glob patterns and returns the results
+    """
+    results = {}
+    for name in sorted(BENCHMARKS):
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        seconds, loops = measure(BENCHMARKS[name](), repeat, min_time)
+        results[name] = {'seconds': seconds, 'loops': loops}
+        if out is not None:
+            out.write('%-48s %14.3f us\n' % (name, seconds * 1e6))
+    return {'python': sys.version.split()[0], 'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+
+def save(results, path):
+    """
+    Writes benchmark results to path as JSON
+    """
+    with open(path, 'w') as json_file:
+        json.dump(results, json_file, indent=2, sort_keys=True)
+
+def load(path):
+    """
+    Reads benchmark results written by save
+    """
+    with open(path) as json_file:
+        return json.load(json_file)
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Compares two sets of results. Returns (name, baseline seconds, current seconds, ratio, status) for every
+    benchmark in both, where status is 'regression' or 'improvement' when the time changed by more than
+    threshold, and 'ok' otherwise.
+    """
+    rows = []
+    for name in sorted(set(baseline['results']) & set(current['results'])):
+        before = baseline['results'][name]['seconds']
+        after = current['results'][name]['seconds']
+        ratio = after / before if before else float('inf')
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 - threshold:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append((name, before, after, ratio, status))
+    return rows
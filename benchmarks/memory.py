@@ -0,0 +1,51 @@
+"""
+Measures how much memory a parsed class file keeps alive
+"""
+import gc
+import os
+import tracemalloc
+from jvpm.ClassFile import ClassFile
+from benchmarks.synthetic import synthetic_class
+
+CLASS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'jvpm')
+
+def footprint(data, copies=10):
+    """
+    Returns the bytes allocated and still alive per ClassFile parsed from data, averaged over copies
+    parses. The class bytes are shared by every copy and so are not counted.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [ClassFile.from_bytes(data) for _ in range(copies)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return (after - before) / copies
+
+def corpus():
+    """
+    Returns (name, class bytes) for the bundled class files and the synthetic ones used by the parse benchmarks
+    """
+    classes = []
+    for name in ('Add', 'AddTwo', 'Foo', 'test'):
+        with open(os.path.join(CLASS_DIRECTORY, name + '.class'), 'rb') as class_file:
+            classes.append((name, class_file.read()))
+    classes.append(('synthetic_pool_10k', synthetic_class(10000, 100)))
+    classes.append(('synthetic_code_64k', synthetic_class(100, 65532)))
+    return classes
+
+def run(out=None):
+    """
+    Returns {name: {'bytes': class file size, 'footprint': bytes kept per parsed class on top of the
+    class bytes}} for the corpus
+    """
+    results = {}
+    for name, data in corpus():
+        results[name] = {'bytes': len(data), 'footprint': footprint(data, 3 if len(data) > 10000 else 10)}
+        if out is not None:
+            out.write('%-24s %10d bytes %12.0f bytes kept %7.2fx\n' %
+                      (name, len(data), results[name]['footprint'], results[name]['footprint'] / len(data)))
+    return results
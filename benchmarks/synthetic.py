@@ -0,0 +1,16 @@
+"""
+Module that builds synthetic class files of any size for the benchmarks
+"""
+from jvpm.Assembler import ClassAssembler, MAX_CODE_LENGTH
+
+def synthetic_class(constants=1000, code_length=10000):
+    """
+    Returns the bytes of a class with about constants UTF-8 constants and one static method whose code
+    is code_length bytes of simple int arithmetic followed by a return
+    """
+    asm = ClassAssembler('Synthetic')
+    for i in range(max(constants - asm.pool.count, 0)):
+        asm.pool.utf8('constant%d' % i)
+    body = ['iconst_1', 'iconst_2', 'iadd', 'istore_0'] * (min(code_length, MAX_CODE_LENGTH - 1) // 4)
+    asm.method('main', '([Ljava/lang/String;)V', body + ['return'])
+    return asm.assemble()
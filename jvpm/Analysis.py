@@ -0,0 +1,189 @@
+"""
+Module that gathers opcode, method size and constant pool statistics over a corpus of class files
+"""
+import json
+import os
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import groupby
+from jvpm.Assembler import MNEMONICS
+from jvpm.ClassFile import ClassFile
+from jvpm.ClassPath import JarEntry
+from jvpm.OpCodes import instruction_starts
+from jvpm.Runner import find_class_files
+
+OPCODE_NAMES = {value: name for name, value in MNEMONICS.items()}
+CONSTANT_TAG_NAMES = {1: 'Utf8', 3: 'Integer', 4: 'Float', 5: 'Long', 6: 'Double', 7: 'Class', 8: 'String',
+                      9: 'Fieldref', 10: 'Methodref', 11: 'InterfaceMethodref', 12: 'NameAndType',
+                      15: 'MethodHandle', 16: 'MethodType', 18: 'InvokeDynamic'}
+
+class Statistics():
+    """
+    Object containing counters gathered from class files. Statistics from different workers are
+    combined with merge, and their size does not grow with the number of classes.
+    """
+    def __init__(self):
+        self.classes = 0
+        self.methods = 0
+        self.instructions = 0
+        self.opcodes = Counter()
+        self.method_sizes = Counter()
+        self.constant_tags = Counter()
+        self.errors = Counter()
+
+    def add_class(self, data):
+        """
+        Adds the class file bytes data to the statistics
+        """
+        java = ClassFile.from_bytes(data)
+        self.classes += 1
+        self.constant_tags.update(constant.tag for constant in java.c_pool_table if constant.tag != 0)
+        for attribute in java.attribute_table:
+            code = attribute.code
+            starts = instruction_starts(code)
+            self.methods += 1
+            self.instructions += len(starts)
+            self.method_sizes[len(code)] += 1
+            self.opcodes.update(code[pc] for pc in starts)
+
+    def merge(self, other):
+        """
+        Adds the counts of the Statistics other to these, returning self
+        """
+        self.classes += other.classes
+        self.methods += other.methods
+        self.instructions += other.instructions
+        self.opcodes.update(other.opcodes)
+        self.method_sizes.update(other.method_sizes)
+        self.constant_tags.update(other.constant_tags)
+        self.errors.update(other.errors)
+        return self
+
+    def size_histogram(self):
+        """
+        Returns the number of methods whose code length falls in each power of two bucket, keyed
+        by the bucket's upper bound
+        """
+        buckets = Counter()
+        for size, count in self.method_sizes.items():
+            buckets[1 << size.bit_length()] += count
+        return dict(sorted(buckets.items()))
+
+    def report(self, count=10):
+        """
+        Returns the most common opcodes, the method size histogram and the constant pool make-up as text
+        """
+        lines = ['Classes: %d  Methods: %d  Instructions: %d  Errors: %d' %
+                 (self.classes, self.methods, self.instructions, sum(self.errors.values())), '',
+                 '%-16s %10s %8s' % ('Opcode', 'Count', 'Share')]
+        for value, seen in self.opcodes.most_common(count):
+            lines.append('%-16s %10d %7.2f%%' % (opcode_name(value), seen, 100.0 * seen / self.instructions))
+        lines += ['', '%-16s %10s' % ('Code bytes <', 'Methods')]
+        for bound, seen in self.size_histogram().items():
+            lines.append('%-16d %10d' % (bound, seen))
+        lines += ['', '%-20s %10s' % ('Constant', 'Count')]
+        for tag, seen in self.constant_tags.most_common():
+            lines.append('%-20s %10d' % (CONSTANT_TAG_NAMES.get(tag, str(tag)), seen))
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self):
+        """
+        Returns the statistics as a dictionary that can be written out as JSON
+        """
+        return {
+            'classes': self.classes, 'methods': self.methods, 'instructions': self.instructions,
+            'opcodes': {opcode_name(value): seen for value, seen in self.opcodes.most_common()},
+            'method_sizes': {str(bound): seen for bound, seen in self.size_histogram().items()},
+            'constant_tags': {CONSTANT_TAG_NAMES.get(tag, str(tag)): seen
+                              for tag, seen in self.constant_tags.most_common()},
+            'errors': dict(self.errors)
+        }
+
+    def save_json(self, path):
+        """
+        Writes the statistics to path as JSON
+        """
+        with open(path, 'w') as json_file:
+            json.dump(self.to_json(), json_file, indent=2)
+
+def opcode_name(value):
+    """
+    Returns the mnemonic of an opcode value, or its hex value if it is not a known opcode
+    """
+    return OPCODE_NAMES.get(value, hex(value))
+
+def find_sources(paths):
+    """
+    Expands files, directories and .jar or .zip archives into (archive, class path) pairs, where
+    archive is None for a loose class file
+    """
+    for path in paths:
+        if path.endswith(('.jar', '.zip')):
+            entry = JarEntry(path)
+            try:
+                for key in entry.names():
+                    yield path, key
+            finally:
+                entry.close()
+        else:
+            for class_path in find_class_files([path]):
+                yield None, class_path
+
+def analyze_sources(sources):
+    """
+    Returns the Statistics of a list of (archive, class path) pairs. Each archive is opened once.
+    """
+    stats = Statistics()
+    for archive, group in groupby(sources, key=lambda source: source[0]):
+        entry = None if archive is None else JarEntry(archive)
+        try:
+            for _, path in group:
+                try:
+                    if entry is None:
+                        with open(path, 'rb') as class_file:
+                            data = class_file.read()
+                    else:
+                        data = entry.read(path)
+                    stats.add_class(data)
+                except Exception as exc:
+                    stats.errors[type(exc).__name__] += 1
+        finally:
+            if entry is not None:
+                entry.close()
+    return stats
+
+def _chunks(sources, size):
+    chunk = []
+    for source in sources:
+        chunk.append(source)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def analyze(paths, jobs=1, chunk_size=64):
+    """
+    Returns the Statistics of every class file found under paths. The classes are sent to a pool of
+    jobs worker processes in chunks of chunk_size; each worker reads its own classes and sends back
+    only its counters, which are merged as they arrive. At most two chunks per worker are waiting at
+    any time, so memory stays flat however large the corpus is.
+    """
+    total = Statistics()
+    chunks = _chunks(find_sources(paths), chunk_size)
+    if jobs is None or jobs <= 1:
+        for chunk in chunks:
+            total.merge(analyze_sources(chunk))
+        return total
+    jobs = min(jobs, os.cpu_count() or jobs)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = set()
+        for chunk in chunks:
+            if len(pending) >= 2 * jobs:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    total.merge(future.result())
+            pending.add(executor.submit(analyze_sources, chunk))
+        for future in pending:
+            total.merge(future.result())
+    return total
@@ -0,0 +1,296 @@
+"""
+Module that assembles java class files from a small Python description, without needing javac
+"""
+import struct
+from jvpm.OpCodes import OPERAND_LENGTHS
+
+ACC_PUBLIC = 0x0001
+ACC_STATIC = 0x0008
+ACC_FINAL = 0x0010
+ACC_SUPER = 0x0020
+
+MAX_CONSTANT_POOL_COUNT = 0xffff
+MAX_CODE_LENGTH = 0xffff
+
+MNEMONICS = {
+    'nop': 0x00, 'aconst_null': 0x01, 'iconst_m1': 0x02, 'iconst_0': 0x03, 'iconst_1': 0x04, 'iconst_2': 0x05,
+    'iconst_3': 0x06, 'iconst_4': 0x07, 'iconst_5': 0x08, 'lconst_0': 0x09, 'lconst_1': 0x0a, 'fconst_0': 0x0b,
+    'fconst_1': 0x0c, 'fconst_2': 0x0d, 'dconst_0': 0x0e, 'dconst_1': 0x0f, 'bipush': 0x10, 'sipush': 0x11,
+    'ldc': 0x12, 'ldc_w': 0x13, 'ldc2_w': 0x14, 'iload': 0x15, 'lload': 0x16, 'fload': 0x17, 'dload': 0x18,
+    'aload': 0x19, 'iload_0': 0x1a, 'iload_1': 0x1b, 'iload_2': 0x1c, 'iload_3': 0x1d, 'lload_0': 0x1e,
+    'lload_1': 0x1f, 'lload_2': 0x20, 'lload_3': 0x21, 'fload_0': 0x22, 'fload_1': 0x23, 'fload_2': 0x24,
+    'fload_3': 0x25, 'dload_0': 0x26, 'dload_1': 0x27, 'dload_2': 0x28, 'dload_3': 0x29, 'aload_0': 0x2a,
+    'aload_1': 0x2b, 'aload_2': 0x2c, 'aload_3': 0x2d, 'iaload': 0x2e, 'laload': 0x2f, 'faload': 0x30,
+    'daload': 0x31, 'aaload': 0x32, 'baload': 0x33, 'caload': 0x34, 'saload': 0x35, 'istore': 0x36,
+    'lstore': 0x37, 'fstore': 0x38, 'dstore': 0x39, 'astore': 0x3a, 'istore_0': 0x3b, 'istore_1': 0x3c,
+    'istore_2': 0x3d, 'istore_3': 0x3e, 'lstore_0': 0x3f, 'lstore_1': 0x40, 'lstore_2': 0x41, 'lstore_3': 0x42,
+    'fstore_0': 0x43, 'fstore_1': 0x44, 'fstore_2': 0x45, 'fstore_3': 0x46, 'dstore_0': 0x47, 'dstore_1': 0x48,
+    'dstore_2': 0x49, 'dstore_3': 0x4a, 'astore_0': 0x4b, 'astore_1': 0x4c, 'astore_2': 0x4d, 'astore_3': 0x4e,
+    'iastore': 0x4f, 'lastore': 0x50, 'fastore': 0x51, 'dastore': 0x52, 'aastore': 0x53, 'bastore': 0x54,
+    'castore': 0x55, 'sastore': 0x56, 'pop': 0x57, 'pop2': 0x58, 'dup': 0x59, 'dup_x1': 0x5a, 'dup_x2': 0x5b,
+    'dup2': 0x5c, 'dup2_x1': 0x5d, 'dup2_x2': 0x5e, 'swap': 0x5f, 'iadd': 0x60, 'ladd': 0x61, 'fadd': 0x62,
+    'dadd': 0x63, 'isub': 0x64, 'lsub': 0x65, 'fsub': 0x66, 'dsub': 0x67, 'imul': 0x68, 'lmul': 0x69,
+    'fmul': 0x6a, 'dmul': 0x6b, 'idiv': 0x6c, 'ldiv': 0x6d, 'fdiv': 0x6e, 'ddiv': 0x6f, 'irem': 0x70,
+    'lrem': 0x71, 'frem': 0x72, 'drem': 0x73, 'ineg': 0x74, 'lneg': 0x75, 'fneg': 0x76, 'dneg': 0x77,
+    'ishl': 0x78, 'lshl': 0x79, 'ishr': 0x7a, 'lshr': 0x7b, 'iushr': 0x7c, 'lushr': 0x7d, 'iand': 0x7e,
+    'land': 0x7f, 'ior': 0x80, 'lor': 0x81, 'ixor': 0x82, 'lxor': 0x83, 'iinc': 0x84, 'i2l': 0x85, 'i2f': 0x86,
+    'i2d': 0x87, 'l2i': 0x88, 'l2f': 0x89, 'l2d': 0x8a, 'f2i': 0x8b, 'f2l': 0x8c, 'f2d': 0x8d, 'd2i': 0x8e,
+    'd2l': 0x8f, 'd2f': 0x90, 'i2b': 0x91, 'i2c': 0x92, 'i2s': 0x93, 'lcmp': 0x94, 'fcmpl': 0x95, 'fcmpg': 0x96,
+    'dcmpl': 0x97, 'dcmpg': 0x98, 'ifeq': 0x99, 'ifne': 0x9a, 'iflt': 0x9b, 'ifge': 0x9c, 'ifgt': 0x9d,
+    'ifle': 0x9e, 'if_icmpeq': 0x9f, 'if_icmpne': 0xa0, 'if_icmplt': 0xa1, 'if_icmpge': 0xa2, 'if_icmpgt': 0xa3,
+    'if_icmple': 0xa4, 'if_acmpeq': 0xa5, 'if_acmpne': 0xa6, 'goto': 0xa7, 'jsr': 0xa8, 'ret': 0xa9,
+    'ireturn': 0xac, 'lreturn': 0xad, 'freturn': 0xae, 'dreturn': 0xaf, 'areturn': 0xb0, 'return': 0xb1,
+    'getstatic': 0xb2, 'putstatic': 0xb3, 'getfield': 0xb4, 'putfield': 0xb5, 'invokevirtual': 0xb6,
+    'invokespecial': 0xb7, 'invokestatic': 0xb8, 'invokeinterface': 0xb9, 'new': 0xbb, 'newarray': 0xbc,
+    'anewarray': 0xbd, 'arraylength': 0xbe, 'athrow': 0xbf, 'checkcast': 0xc0, 'instanceof': 0xc1,
+    'monitorenter': 0xc2, 'monitorexit': 0xc3, 'multianewarray': 0xc5, 'ifnull': 0xc6, 'ifnonnull': 0xc7,
+    'goto_w': 0xc8}
+
+_LOCAL_OPCODES = frozenset(range(0x15, 0x1a)) | frozenset(range(0x36, 0x3b)) | frozenset((0xa9,))
+_BRANCH_OPCODES = frozenset(range(0x99, 0xa9)) | frozenset((0xc6, 0xc7))
+_FIELD_OPCODES = frozenset((0xb2, 0xb3, 0xb4, 0xb5))
+_METHOD_OPCODES = frozenset((0xb6, 0xb7, 0xb8))
+_CLASS_OPCODES = frozenset((0xbb, 0xbd, 0xc0, 0xc1))
+
+class ConstantPoolBuilder():
+    """
+    Builds a constant pool, adding each distinct constant only once
+    """
+    def __init__(self):
+        self.entries = []
+        self._indexes = {}
+        self.count = 1
+
+    def _add(self, key, tag, info, slots=1):
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+        if self.count + slots > MAX_CONSTANT_POOL_COUNT:
+            raise ValueError('Constant pool is limited to %d entries' % (MAX_CONSTANT_POOL_COUNT - 1))
+        index = self._indexes[key] = self.count
+        self.entries.append(bytes([tag]) + info)
+        self.count += slots
+        return index
+
+    def utf8(self, value):
+        data = value.encode('utf-8')
+        return self._add(('utf8', value), 1, struct.pack('>H', len(data)) + data)
+
+    def integer(self, value):
+        return self._add(('int', value), 3, struct.pack('>i', value))
+
+    def float(self, value):
+        data = struct.pack('>f', value)
+        return self._add(('float', data), 4, data)
+
+    def long(self, value):
+        return self._add(('long', value), 5, struct.pack('>q', value), 2)
+
+    def double(self, value):
+        data = struct.pack('>d', value)
+        return self._add(('double', data), 6, data, 2)
+
+    def class_ref(self, name):
+        return self._add(('class', name), 7, struct.pack('>H', self.utf8(name)))
+
+    def string(self, value):
+        return self._add(('string', value), 8, struct.pack('>H', self.utf8(value)))
+
+    def name_and_type(self, name, descriptor):
+        return self._add(('nat', name, descriptor), 12,
+                         struct.pack('>HH', self.utf8(name), self.utf8(descriptor)))
+
+    def field_ref(self, class_name, name, descriptor):
+        return self._add(('field', class_name, name, descriptor), 9,
+                         struct.pack('>HH', self.class_ref(class_name), self.name_and_type(name, descriptor)))
+
+    def method_ref(self, class_name, name, descriptor):
+        return self._add(('method', class_name, name, descriptor), 10,
+                         struct.pack('>HH', self.class_ref(class_name), self.name_and_type(name, descriptor)))
+
+    def interface_method_ref(self, class_name, name, descriptor):
+        return self._add(('imethod', class_name, name, descriptor), 11,
+                         struct.pack('>HH', self.class_ref(class_name), self.name_and_type(name, descriptor)))
+
+    def assemble(self):
+        """
+        Returns the constant_pool_count followed by the constant pool entries
+        """
+        return struct.pack('>H', self.count) + b''.join(self.entries)
+
+def argument_slots(descriptor):
+    """
+    Returns the number of local variable slots taken by the arguments of a method descriptor
+    """
+    slots = 0
+    index = 1
+    while descriptor[index] != ')':
+        if descriptor[index] in 'JD':
+            slots += 2
+        else:
+            slots += 1
+            while descriptor[index] == '[':
+                index += 1
+            if descriptor[index] == 'L':
+                index = descriptor.index(';', index)
+        index += 1
+    return slots
+
+class ClassAssembler():
+    """
+    Assembles a class file. Method code is a list of instructions, where each instruction is a
+    mnemonic or opcode on its own or a tuple of the mnemonic and its operands:
+
+        ('bipush', 10), ('iload', 1), ('iinc', 1, -1), ('ldc', 'Hello'), ('ldc', 3), ('ldc2_w', 5),
+        ('getstatic', 'java/lang/System', 'out', 'Ljava/io/PrintStream;'),
+        ('invokevirtual', 'java/io/PrintStream', 'println', '(I)V'), ('new', 'java/lang/Object'),
+        ('label', 'loop'), ('goto', 'loop')
+
+    Branches take a label name or a relative offset.
+    """
+    def __init__(self, name, super_name='java/lang/Object', access_flags=ACC_PUBLIC | ACC_SUPER,
+                 major=52, minor=0, source_file=None):
+        self.pool = ConstantPoolBuilder()
+        self.name = name
+        self.access_flags = access_flags
+        self.major = major
+        self.minor = minor
+        self.this_class = self.pool.class_ref(name)
+        self.super_class = self.pool.class_ref(super_name) if super_name is not None else 0
+        self.interfaces = []
+        self.fields = []
+        self.methods = []
+        self.attributes = []
+        if source_file is not None:
+            self.attributes.append((self.pool.utf8('SourceFile'), struct.pack('>H', self.pool.utf8(source_file))))
+
+    def interface(self, name):
+        self.interfaces.append(self.pool.class_ref(name))
+
+    def field(self, name, descriptor, access_flags=ACC_PUBLIC):
+        self.fields.append(struct.pack('>HHHH', access_flags, self.pool.utf8(name), self.pool.utf8(descriptor), 0))
+
+    def method(self, name, descriptor, code, access_flags=ACC_PUBLIC | ACC_STATIC, max_stack=16,
+               max_locals=None, line_numbers=None):
+        """
+        Adds a method whose Code attribute holds the assembled instructions. max_locals defaults to
+        enough slots for the arguments and every local the code uses. line_numbers is a list of
+        (start_pc, line) pairs for a LineNumberTable.
+        """
+        body, used_locals = self.assemble_code(code)
+        if max_locals is None:
+            max_locals = max(argument_slots(descriptor) + (0 if access_flags & ACC_STATIC else 1), used_locals)
+        attributes = b''
+        attribute_count = 0
+        if line_numbers:
+            table = struct.pack('>H', len(line_numbers)) + \
+                b''.join(struct.pack('>HH', start_pc, line) for start_pc, line in line_numbers)
+            attributes += struct.pack('>HI', self.pool.utf8('LineNumberTable'), len(table)) + table
+            attribute_count += 1
+        info = struct.pack('>HHI', max_stack, max_locals, len(body)) + body + struct.pack('>HH', 0, attribute_count) + \
+            attributes
+        self.methods.append(struct.pack('>HHHH', access_flags, self.pool.utf8(name), self.pool.utf8(descriptor), 1) +
+                            struct.pack('>HI', self.pool.utf8('Code'), len(info)) + info)
+
+    def assemble_code(self, code):
+        """
+        Returns the code bytes for a list of instructions and the number of local variable slots they use
+        """
+        instructions = []
+        labels = {}
+        pc = 0
+        for instruction in code:
+            if not isinstance(instruction, tuple):
+                instruction = (instruction,)
+            if instruction[0] == 'label':
+                labels[instruction[1]] = pc
+                continue
+            value = MNEMONICS[instruction[0]] if isinstance(instruction[0], str) else instruction[0]
+            if value == 0x12 and len(instruction) > 1 and self._constant(instruction[1]) > 0xff:
+                value = 0x13
+            instructions.append((pc, value, instruction[1:]))
+            pc += 1 + OPERAND_LENGTHS.get(value, 0)
+        body = bytearray()
+        used_locals = 0
+        for pc, value, operands in instructions:
+            body.append(value)
+            body += self._operands(pc, value, operands, labels)
+            used_locals = max(used_locals, _local_slots(value, operands))
+        if len(body) > MAX_CODE_LENGTH:
+            raise ValueError('Code is limited to %d bytes' % MAX_CODE_LENGTH)
+        return bytes(body), used_locals
+
+    def _constant(self, value):
+        if isinstance(value, str):
+            return self.pool.string(value)
+        if isinstance(value, float):
+            return self.pool.float(value)
+        if isinstance(value, tuple) and value[0] == 'class':
+            return self.pool.class_ref(value[1])
+        return self.pool.integer(value)
+
+    def _operands(self, pc, value, operands, labels):
+        if value in _LOCAL_OPCODES or value == 0xbc:
+            return struct.pack('>B', operands[0])
+        if value == 0x10:
+            return struct.pack('>b', operands[0])
+        if value == 0x11:
+            return struct.pack('>h', operands[0])
+        if value == 0x12:
+            return struct.pack('>B', self._constant(operands[0]))
+        if value == 0x13:
+            return struct.pack('>H', self._constant(operands[0]))
+        if value == 0x14:
+            constant = operands[0]
+            return struct.pack('>H', self.pool.double(constant) if isinstance(constant, float)
+                               else self.pool.long(constant))
+        if value == 0x84:
+            return struct.pack('>Bb', operands[0], operands[1])
+        if value in _BRANCH_OPCODES or value in (0xc8, 0xc9):
+            target = operands[0]
+            offset = labels[target] - pc if isinstance(target, str) else target
+            return struct.pack('>h' if value in _BRANCH_OPCODES else '>i', offset)
+        if value in _FIELD_OPCODES:
+            return struct.pack('>H', self.pool.field_ref(*operands))
+        if value in _METHOD_OPCODES:
+            return struct.pack('>H', self.pool.method_ref(*operands))
+        if value == 0xb9:
+            count = argument_slots(operands[2]) + 1
+            return struct.pack('>HBB', self.pool.interface_method_ref(*operands), count, 0)
+        if value in _CLASS_OPCODES:
+            return struct.pack('>H', self.pool.class_ref(operands[0]))
+        if value == 0xc5:
+            return struct.pack('>HB', self.pool.class_ref(operands[0]), operands[1])
+        if value in OPERAND_LENGTHS:
+            raise ValueError('Opcode %s cannot be assembled' % hex(value))
+        return b''
+
+    def assemble(self):
+        """
+        Returns the bytes of the class file
+        """
+        return b'\xca\xfe\xba\xbe' + struct.pack('>HH', self.minor, self.major) + self.pool.assemble() + \
+            struct.pack('>HHHH', self.access_flags, self.this_class, self.super_class, len(self.interfaces)) + \
+            b''.join(struct.pack('>H', index) for index in self.interfaces) + \
+            struct.pack('>H', len(self.fields)) + b''.join(self.fields) + \
+            struct.pack('>H', len(self.methods)) + b''.join(self.methods) + \
+            struct.pack('>H', len(self.attributes)) + \
+            b''.join(struct.pack('>HI', name, len(info)) + info for name, info in self.attributes)
+
+    def write(self, path):
+        """
+        Writes the class file to path
+        """
+        with open(path, 'wb') as class_file:
+            class_file.write(self.assemble())
+
+def _local_slots(value, operands):
+    if value in _LOCAL_OPCODES or value == 0x84:
+        return operands[0] + (2 if value in (0x16, 0x18, 0x37, 0x39) else 1)
+    if 0x1a <= value <= 0x2d:
+        index = (value - 0x1a) % 4
+        return index + (2 if 0x1e <= value <= 0x21 or 0x26 <= value <= 0x29 else 1)
+    if 0x3b <= value <= 0x4e:
+        index = (value - 0x3b) % 4
+        return index + (2 if 0x3f <= value <= 0x42 or 0x47 <= value <= 0x4a else 1)
+    return 0
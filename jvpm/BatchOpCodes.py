@@ -0,0 +1,372 @@
+"""
+Module that runs one method over many input tuples at once, one NumPy lane per tuple
+"""
+import numpy as np
+
+_INT_MIN = -0x80000000
+_INT_MAX = 0x7fffffff
+
+class BatchOpCodes():
+    """
+    Interprets a method once with every stack and local slot holding an array of lane values.
+    Branches are handled by masking: lanes that take a branch are parked until execution reaches
+    the branch target, and stores and returns only touch the lanes that are currently active.
+    """
+    def __init__(self, inputs):
+        inputs = np.asarray(inputs)
+        if inputs.ndim == 1:
+            inputs = inputs.reshape(-1, 1)
+        dtype = np.float32 if inputs.dtype.kind == 'f' else np.int32
+        self.lanes = inputs.shape[0]
+        self._op_stack = []
+        self._lva = [inputs[:, i].astype(dtype) for i in range(inputs.shape[1])]
+        self._mask = np.ones(self.lanes, dtype=bool)
+        self._pending = {}
+        self._result = None
+        self._pc = 0
+        self._table = {0x02: self._iconst_m1, 0x03: self._iconst_0, 0x04: self._iconst_1,
+                       0x05: self._iconst_2, 0x06: self._iconst_3, 0x07: self._iconst_4, 0x08: self._iconst_5,
+                       0x0b: self._fconst_0, 0x0c: self._fconst_1, 0x0d: self._fconst_2,
+                       0x10: self._bipush, 0x11: self._sipush,
+                       0x15: self._load, 0x17: self._load, 0x1a: self._load_0, 0x1b: self._load_1,
+                       0x1c: self._load_2, 0x1d: self._load_3, 0x22: self._load_0, 0x23: self._load_1,
+                       0x24: self._load_2, 0x25: self._load_3,
+                       0x36: self._store, 0x38: self._store, 0x3b: self._store_0, 0x3c: self._store_1,
+                       0x3d: self._store_2, 0x3e: self._store_3, 0x43: self._store_0, 0x44: self._store_1,
+                       0x45: self._store_2, 0x46: self._store_3,
+                       0x57: self._pop, 0x59: self._dup, 0x5f: self._swap,
+                       0x60: self._iadd, 0x64: self._isub, 0x68: self._imul, 0x6c: self._idiv, 0x70: self._irem,
+                       0x74: self._ineg, 0x78: self._ishl, 0x7a: self._ishr, 0x7c: self._iushr,
+                       0x7e: self._iand, 0x80: self._ior, 0x82: self._ixor,
+                       0x62: self._fadd, 0x66: self._fsub, 0x6a: self._fmul, 0x6e: self._fdiv, 0x72: self._frem,
+                       0x76: self._fneg, 0x84: self._iinc, 0x86: self._i2f, 0x8b: self._f2i,
+                       0x95: self._fcmpl, 0x96: self._fcmpg,
+                       0x99: self._ifeq, 0x9a: self._ifne, 0x9b: self._iflt, 0x9c: self._ifge,
+                       0x9d: self._ifgt, 0x9e: self._ifle, 0x9f: self._if_icmpeq, 0xa0: self._if_icmpne,
+                       0xa1: self._if_icmplt, 0xa2: self._if_icmpge, 0xa3: self._if_icmpgt,
+                       0xa4: self._if_icmple, 0xa7: self._goto,
+                       0xac: self._return_value, 0xae: self._return_value, 0xb1: self._return}
+        self._operand_count = {0x10: 1, 0x11: 2, 0x15: 1, 0x17: 1, 0x36: 1, 0x38: 1, 0x84: 2}
+        for value in range(0x99, 0xa8):
+            self._operand_count[value] = 2
+
+    def run(self, method):
+        """
+        Runs the code of method (a CodeAttribute or a list of code bytes) for every lane and returns
+        the array of values returned by the lanes, or None if the method returns void.
+        """
+        code = getattr(method, 'code', method)
+        self._pc = 0
+        while self._pc < len(code):
+            self._merge_pending()
+            if not self._mask.any():
+                if not self._pending:
+                    break
+                self._pc = min(self._pending)
+                continue
+            value = code[self._pc]
+            if value not in self._table:
+                raise NotImplementedError('Opcode %s is not supported in batch mode' % hex(value))
+            count = self._operand_count.get(value, 0)
+            operands = list(code[self._pc + 1:self._pc + 1 + count])
+            next_pc = self._table[value](operands) if count else self._table[value]()
+            self._pc = self._pc + 1 + count if next_pc is None else next_pc
+        return self._result
+
+    def _merge_pending(self):
+        if self._pc not in self._pending:
+            return
+        mask, stack = self._pending.pop(self._pc)
+        if not self._mask.any():
+            self._mask, self._op_stack = mask, stack
+            return
+        self._op_stack = self._merge_stacks(mask, stack, self._op_stack)
+        self._mask = self._mask | mask
+
+    def _merge_stacks(self, mask, taken, other):
+        if len(taken) != len(other):
+            raise ValueError('Operand stack depth differs at pc %d' % self._pc)
+        return [np.where(mask, a, b) for a, b in zip(taken, other)]
+
+    def _defer(self, target, mask):
+        if target in self._pending:
+            old_mask, old_stack = self._pending[target]
+            self._pending[target] = (old_mask | mask, self._merge_stacks(mask, self._op_stack, old_stack))
+        else:
+            self._pending[target] = (mask, list(self._op_stack))
+
+    def _branch(self, taken, operands):
+        offset = (operands[0] << 8) | operands[1]
+        if offset & 0x8000:
+            offset -= 0x10000
+        target = self._pc + offset
+        fallthrough = self._pc + 3
+        taken = taken & self._mask
+        stay = self._mask & ~taken
+        if target > self._pc:
+            if taken.any():
+                self._defer(target, taken)
+            self._mask = stay
+            return fallthrough
+        if stay.any():
+            self._defer(fallthrough, stay)
+        self._mask = taken
+        return target
+
+    def _full(self, value, dtype=np.int32):
+        return np.full(self.lanes, value, dtype=dtype)
+
+    def _push_int(self, value):
+        self._op_stack.append(np.asarray(value).astype(np.int32))
+
+    def _push_float(self, value):
+        self._op_stack.append(np.asarray(value).astype(np.float32))
+
+    def _pop2(self):
+        value2 = self._op_stack.pop()
+        value1 = self._op_stack.pop()
+        return value1, value2
+
+    def _iconst_m1(self):
+        self._op_stack.append(self._full(-1))
+
+    def _iconst_0(self):
+        self._op_stack.append(self._full(0))
+
+    def _iconst_1(self):
+        self._op_stack.append(self._full(1))
+
+    def _iconst_2(self):
+        self._op_stack.append(self._full(2))
+
+    def _iconst_3(self):
+        self._op_stack.append(self._full(3))
+
+    def _iconst_4(self):
+        self._op_stack.append(self._full(4))
+
+    def _iconst_5(self):
+        self._op_stack.append(self._full(5))
+
+    def _fconst_0(self):
+        self._op_stack.append(self._full(0.0, np.float32))
+
+    def _fconst_1(self):
+        self._op_stack.append(self._full(1.0, np.float32))
+
+    def _fconst_2(self):
+        self._op_stack.append(self._full(2.0, np.float32))
+
+    def _bipush(self, operands):
+        value = operands[0] - 0x100 if operands[0] & 0x80 else operands[0]
+        self._op_stack.append(self._full(value))
+
+    def _sipush(self, operands):
+        value = (operands[0] << 8) | operands[1]
+        self._op_stack.append(self._full(value - 0x10000 if value & 0x8000 else value))
+
+    def _load(self, operands):
+        self._op_stack.append(self._lva[operands[0]])
+
+    def _load_0(self):
+        self._op_stack.append(self._lva[0])
+
+    def _load_1(self):
+        self._op_stack.append(self._lva[1])
+
+    def _load_2(self):
+        self._op_stack.append(self._lva[2])
+
+    def _load_3(self):
+        self._op_stack.append(self._lva[3])
+
+    def _store_at(self, index):
+        value = self._op_stack.pop()
+        while len(self._lva) <= index:
+            self._lva.append(np.zeros(self.lanes, dtype=value.dtype))
+        self._lva[index] = np.where(self._mask, value, self._lva[index]).astype(value.dtype)
+
+    def _store(self, operands):
+        self._store_at(operands[0])
+
+    def _store_0(self):
+        self._store_at(0)
+
+    def _store_1(self):
+        self._store_at(1)
+
+    def _store_2(self):
+        self._store_at(2)
+
+    def _store_3(self):
+        self._store_at(3)
+
+    def _pop(self):
+        self._op_stack.pop()
+
+    def _dup(self):
+        self._op_stack.append(self._op_stack[-1])
+
+    def _swap(self):
+        value1, value2 = self._pop2()
+        self._op_stack.append(value2)
+        self._op_stack.append(value1)
+
+    def _iadd(self):
+        value1, value2 = self._pop2()
+        self._push_int(value1 + value2)
+
+    def _isub(self):
+        value1, value2 = self._pop2()
+        self._push_int(value1 - value2)
+
+    def _imul(self):
+        value1, value2 = self._pop2()
+        self._push_int(value1 * value2)
+
+    def _quotient(self, value1, value2):
+        if (self._mask & (value2 == 0)).any():
+            raise ZeroDivisionError('Error: Divides by Zero')
+        value1 = value1.astype(np.int64)
+        value2 = np.where(value2 == 0, 1, value2).astype(np.int64)
+        return value1, value2, np.abs(value1) // np.abs(value2) * np.sign(value1 * value2)
+
+    def _idiv(self):
+        value1, value2, quotient = self._quotient(*self._pop2())
+        self._push_int(quotient)
+
+    def _irem(self):
+        value1, value2, quotient = self._quotient(*self._pop2())
+        self._push_int(value1 - quotient * value2)
+
+    def _ineg(self):
+        self._push_int(-self._op_stack.pop().astype(np.int64))
+
+    def _ishl(self):
+        value1, value2 = self._pop2()
+        self._push_int(np.left_shift(value1, value2 & 0x1f))
+
+    def _ishr(self):
+        value1, value2 = self._pop2()
+        self._push_int(np.right_shift(value1, value2 & 0x1f))
+
+    def _iushr(self):
+        value1, value2 = self._pop2()
+        shifted = np.right_shift(value1.view(np.uint32), (value2 & 0x1f).astype(np.uint32))
+        self._op_stack.append(shifted.view(np.int32))
+
+    def _iand(self):
+        value1, value2 = self._pop2()
+        self._push_int(value1 & value2)
+
+    def _ior(self):
+        value1, value2 = self._pop2()
+        self._push_int(value1 | value2)
+
+    def _ixor(self):
+        value1, value2 = self._pop2()
+        self._push_int(value1 ^ value2)
+
+    def _fadd(self):
+        value1, value2 = self._pop2()
+        self._push_float(value1 + value2)
+
+    def _fsub(self):
+        value1, value2 = self._pop2()
+        self._push_float(value1 - value2)
+
+    def _fmul(self):
+        value1, value2 = self._pop2()
+        self._push_float(value1 * value2)
+
+    def _fdiv(self):
+        value1, value2 = self._pop2()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._push_float(value1 / value2)
+
+    def _frem(self):
+        value1, value2 = self._pop2()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._push_float(np.fmod(value1, value2))
+
+    def _fneg(self):
+        self._push_float(-self._op_stack.pop())
+
+    def _iinc(self, operands):
+        index = operands[0]
+        const = operands[1] - 0x100 if operands[1] & 0x80 else operands[1]
+        self._lva[index] = np.where(self._mask, self._lva[index] + np.int32(const),
+                                    self._lva[index]).astype(np.int32)
+
+    def _i2f(self):
+        self._push_float(self._op_stack.pop())
+
+    def _f2i(self):
+        value = np.nan_to_num(self._op_stack.pop().astype(np.float64), nan=0.0)
+        self._push_int(np.trunc(np.clip(value, _INT_MIN, _INT_MAX)))
+
+    def _fcmp(self, nan_result):
+        value1, value2 = self._pop2()
+        result = np.where(value1 > value2, 1, np.where(value1 < value2, -1, 0))
+        self._push_int(np.where(np.isnan(value1) | np.isnan(value2), nan_result, result))
+
+    def _fcmpl(self):
+        self._fcmp(-1)
+
+    def _fcmpg(self):
+        self._fcmp(1)
+
+    def _ifeq(self, operands):
+        return self._branch(self._op_stack.pop() == 0, operands)
+
+    def _ifne(self, operands):
+        return self._branch(self._op_stack.pop() != 0, operands)
+
+    def _iflt(self, operands):
+        return self._branch(self._op_stack.pop() < 0, operands)
+
+    def _ifge(self, operands):
+        return self._branch(self._op_stack.pop() >= 0, operands)
+
+    def _ifgt(self, operands):
+        return self._branch(self._op_stack.pop() > 0, operands)
+
+    def _ifle(self, operands):
+        return self._branch(self._op_stack.pop() <= 0, operands)
+
+    def _if_icmpeq(self, operands):
+        value1, value2 = self._pop2()
+        return self._branch(value1 == value2, operands)
+
+    def _if_icmpne(self, operands):
+        value1, value2 = self._pop2()
+        return self._branch(value1 != value2, operands)
+
+    def _if_icmplt(self, operands):
+        value1, value2 = self._pop2()
+        return self._branch(value1 < value2, operands)
+
+    def _if_icmpge(self, operands):
+        value1, value2 = self._pop2()
+        return self._branch(value1 >= value2, operands)
+
+    def _if_icmpgt(self, operands):
+        value1, value2 = self._pop2()
+        return self._branch(value1 > value2, operands)
+
+    def _if_icmple(self, operands):
+        value1, value2 = self._pop2()
+        return self._branch(value1 <= value2, operands)
+
+    def _goto(self, operands):
+        return self._branch(np.ones(self.lanes, dtype=bool), operands)
+
+    def _return_value(self):
+        value = self._op_stack.pop()
+        if self._result is None:
+            self._result = np.zeros(self.lanes, dtype=value.dtype)
+        self._result = np.where(self._mask, value, self._result).astype(value.dtype)
+        self._mask = np.zeros(self.lanes, dtype=bool)
+
+    def _return(self):
+        self._mask = np.zeros(self.lanes, dtype=bool)
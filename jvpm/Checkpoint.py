@@ -0,0 +1,186 @@
+"""
+Module that saves the state of a running class file to a snapshot and resumes it later, in any process
+"""
+import hashlib
+import marshal
+import struct
+import sys
+import numpy as np
+from jvpm.ClassFile import ClassFile
+from jvpm.Isolate import Isolate
+from jvpm.OpCodes import OpCodes
+from jvpm.Sampler import interpreter_loop, class_frame
+
+MAGIC = b'JVCP'
+FORMAT_VERSION = 2
+# the marshal format can change between Python versions, so a snapshot records the one that wrote it
+_HEADER = struct.Struct('>4sHBB')
+_KEYS = ('class_hash', 'class', 'position', 'op_stack', 'lva', 'monitors', 'resolved', 'notified', 'yielding')
+
+class SnapshotError(Exception):
+    """
+    Raised when a snapshot is damaged, was written by an incompatible interpreter or belongs to another class
+    """
+
+class Execution():
+    """
+    Run of a class file that can be stopped after any instruction: the Code attribute and pc it is
+    at, its OpCodes, and the Isolate holding its monitors
+    """
+    def __init__(self, java, isolate=None):
+        self.java = java
+        self.isolate = Isolate() if isolate is None else isolate
+        self.ops = OpCodes()
+        self.ops.monitors = self.isolate.monitors
+        self.method = 0
+        self.index = 0
+        self.instructions = 0
+
+    def finished(self):
+        """
+        Returns True once every Code attribute has run to its end
+        """
+        return self.method >= len(self.java.attribute_table)
+
+    @interpreter_loop(lambda local_vars: local_vars['self']._frame())
+    def step(self, budget=None):
+        """
+        Runs at most budget instructions, or until the end if budget is None. Returns the number run.
+        """
+        count = 0
+        constants = self.java.c_pool_table
+        while self.method < len(self.java.attribute_table) and (budget is None or count < budget):
+            code = self.java.attribute_table[self.method].code
+            if self.index >= len(code):
+                self.method += 1
+                self.index = 0
+                continue
+            self.index = self.ops.execute(code, self.index, constants)
+            count += 1
+        self.instructions += count
+        return count
+
+    def _frame(self):
+        if self.method >= len(self.java.attribute_table):
+            return None
+        return class_frame(self.java, self.java.attribute_table[self.method], self.index)
+
+    def run(self):
+        """
+        Runs to the end and returns the OpCodes
+        """
+        self.step()
+        return self.ops
+
+def _encode(value):
+    if isinstance(value, np.generic):
+        return ('numpy', value.dtype.str, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, [_encode(item) for item in value])
+    if isinstance(value, dict):
+        return ('dict', [(_encode(key), _encode(item)) for key, item in value.items()])
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return ('value', value)
+    raise SnapshotError('cannot save a %s in a snapshot' % type(value).__name__)
+
+def _decode(encoded):
+    kind, value = encoded[0], encoded[1]
+    if kind == 'numpy':
+        return np.frombuffer(encoded[2], dtype=value)[0]
+    if kind == 'list':
+        return [_decode(item) for item in value]
+    if kind == 'tuple':
+        return tuple(_decode(item) for item in value)
+    if kind == 'dict':
+        return {_decode(key): _decode(item) for key, item in value}
+    return value
+
+def checkpoint(execution, include_class=True):
+    """
+    Returns the snapshot bytes of execution: where it is, its operand stack and local variables, the
+    monitors it holds, whether it is waiting or yielding and which constant pool entries it has
+    resolved. With include_class the class bytes are stored too, so the snapshot can be restored
+    without the class file.
+    """
+    ops = execution.ops
+    if ops.pending_monitor is not None:
+        raise SnapshotError('cannot save a run that is blocked on a monitor')
+    java = execution.java
+    isolate = execution.isolate
+    held = [(obj, count) for obj, (owner, count) in isolate.monitors._owners.items() if owner is ops]
+    state = {
+        'class_hash': hashlib.sha256(java.data).digest(),
+        'class': java.data if include_class else None,
+        'position': (execution.method, execution.index, execution.instructions),
+        'op_stack': _encode(ops._op_stack),
+        'lva': _encode(ops._lva),
+        'monitors': _encode(held),
+        'resolved': sorted(java.c_pool_table._strings),
+        'notified': ops.notified,
+        'yielding': ops.yielding,
+    }
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, *sys.version_info[:2]) + marshal.dumps(state)
+
+def restore(snapshot, java=None, isolate=None):
+    """
+    Returns an Execution that carries on exactly where the run saved in snapshot stopped. java is the
+    ClassFile to run, and must be the same class the snapshot was taken from; it can be left out if
+    the snapshot holds the class bytes.
+    """
+    if len(snapshot) < _HEADER.size:
+        raise SnapshotError('snapshot is truncated')
+    magic, version, major, minor = _HEADER.unpack_from(snapshot)
+    if magic != MAGIC:
+        raise SnapshotError('not a snapshot')
+    if version != FORMAT_VERSION:
+        raise SnapshotError('snapshot format %d is not supported, expected %d' % (version, FORMAT_VERSION))
+    if (major, minor) != sys.version_info[:2]:
+        raise SnapshotError('snapshot was written by Python %d.%d, this is %d.%d' % ((major, minor) + sys.version_info[:2]))
+    try:
+        state = marshal.loads(snapshot[_HEADER.size:])
+    except (EOFError, ValueError, TypeError) as exc:
+        raise SnapshotError('snapshot is damaged: %s' % exc)
+    if not isinstance(state, dict) or any(key not in state for key in _KEYS):
+        raise SnapshotError('snapshot is damaged: it does not hold the state of a run')
+    if java is None:
+        if state['class'] is None:
+            raise SnapshotError('snapshot does not hold its class, pass the ClassFile')
+        java = ClassFile.from_bytes(state['class'])
+    elif hashlib.sha256(java.data).digest() != state['class_hash']:
+        raise SnapshotError('snapshot was taken from a different class')
+    execution = Execution(java, isolate)
+    try:
+        execution.method, execution.index, execution.instructions = state['position']
+        execution.ops._op_stack = _decode(state['op_stack'])
+        execution.ops._lva = _decode(state['lva'])
+        execution.ops.notified = bool(state['notified'])
+        execution.ops.yielding = bool(state['yielding'])
+        monitors = [(obj, count) for obj, count in _decode(state['monitors'])]
+        for index in state['resolved']:
+            java.c_pool_table.resolve(index)
+    except (IndexError, KeyError, TypeError, ValueError, struct.error) as exc:
+        raise SnapshotError('snapshot is damaged: %s' % exc)
+    acquired = []
+    for obj, count in monitors:
+        if not execution.isolate.monitors.acquire(obj, execution.ops, count):
+            # give back what this run took, so the isolate is left as it was
+            for taken, times in acquired:
+                for _ in range(times):
+                    execution.isolate.monitors.release(taken, execution.ops)
+            raise SnapshotError('monitor %r held by the snapshot is owned by another run' % (obj,))
+        acquired.append((obj, count))
+    return execution
+
+def save(execution, path, include_class=True):
+    """
+    Writes the snapshot of execution to path
+    """
+    with open(path, 'wb') as snapshot_file:
+        snapshot_file.write(checkpoint(execution, include_class))
+
+def load(path, java=None, isolate=None):
+    """
+    Returns the Execution restored from the snapshot at path
+    """
+    with open(path, 'rb') as snapshot_file:
+        return restore(snapshot_file.read(), java, isolate)
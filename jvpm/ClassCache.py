@@ -0,0 +1,192 @@
+"""
+Module that keeps parsed and decoded class files in an on-disk cache so that later runs skip parsing
+"""
+import hashlib
+import marshal
+import os
+import struct
+import tempfile
+from array import array
+from jvpm import __version__
+from jvpm.ClassFile import AttributeInfo, ClassFile, CodeAttribute, ConstantPool, FieldInfo, MethodInfo
+
+MAGIC = b'JVPC'
+FORMAT_VERSION = 2
+_HEADER = struct.Struct('>4sH32s')
+
+def default_directory():
+    """
+    Returns the cache directory named by JVPM_CACHE_DIR, or ~/.cache/jvpm
+    """
+    return os.environ.get('JVPM_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'jvpm')
+
+class ClassCache():
+    """
+    Cache of ClassFile objects keyed by a SHA-256 of the interpreter version and the class bytes. An
+    entry holds the decoded constant pool, the field and method tables and every Code attribute with
+    its instruction starts already decoded, written with marshal behind a header that carries a
+    checksum. An entry that is corrupt or was written by another format is parsed again and rewritten.
+    """
+    def __init__(self, directory=None):
+        self.directory = default_directory() if directory is None else directory
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    @staticmethod
+    def key(data):
+        """
+        Returns the cache key of the class file bytes data
+        """
+        return hashlib.sha256(__version__.encode('ascii') + b'\0' + bytes(data)).hexdigest()
+
+    def entry_path(self, key):
+        """
+        Returns the path of the cache entry for key
+        """
+        return os.path.join(self.directory, key[:2], key + '.jvpc')
+
+    def load(self, path):
+        """
+        Returns the ClassFile for the class file at path, from the cache when it is there
+        """
+        with open(path, 'rb') as binary_file:
+            return self.load_bytes(binary_file.read())
+
+    def load_bytes(self, data):
+        """
+        Returns the ClassFile for the class file bytes data, from the cache when it is there
+        """
+        data = bytes(data)
+        entry = self.entry_path(self.key(data))
+        try:
+            with open(entry, 'rb') as entry_file:
+                blob = entry_file.read()
+        except OSError:
+            self.misses += 1
+        else:
+            java = _read_entry(blob, data)
+            if java is not None:
+                self.hits += 1
+                return java
+            self.rebuilds += 1
+        java = ClassFile.from_bytes(data)
+        self.store(entry, java)
+        return java
+
+    def store(self, entry, java):
+        """
+        Writes the ClassFile java to the cache entry path entry. The entry is written to a temporary
+        file first and moved into place, so readers never see half of one. Returns False, leaving the
+        class uncached, when the cache directory cannot be written.
+        """
+        payload = marshal.dumps(_to_tuple(java))
+        blob = _HEADER.pack(MAGIC, FORMAT_VERSION, hashlib.sha256(payload).digest()) + payload
+        temp_path = None
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(entry), suffix='.tmp')
+            with os.fdopen(handle, 'wb') as temp_file:
+                temp_file.write(blob)
+            os.replace(temp_path, entry)
+        except OSError:
+            if temp_path is not None and os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return False
+        return True
+
+    def clear(self):
+        """
+        Removes every entry from the cache directory
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.jvpc'):
+                    os.unlink(os.path.join(root, name))
+
+def _attributes_to_tuple(attributes):
+    return [(attribute.attribute_name_index, bytes(attribute.info)) for attribute in attributes]
+
+def _to_tuple(java):
+    codes = []
+    methods = []
+    for method in java.method_table:
+        code_index = -1
+        if method.code is not None:
+            code = method.code
+            code_index = len(codes)
+            codes.append((code.attribute_name_index, code.attribute_length, code.max_stack, code.max_locals,
+                          bytes(code.code), [tuple(entry) for entry in code.exception_table],
+                          _attributes_to_tuple(code.attributes), [tuple(entry) for entry in code.line_number_table],
+                          code.get_instructions().tobytes()))
+        methods.append((method.access_flags, method.name_index, method.descriptor_index,
+                        _attributes_to_tuple(method.attributes), code_index))
+    fields = [(field.access_flags, field.name_index, field.descriptor_index, _attributes_to_tuple(field.attributes))
+              for field in java.field_table]
+    pool = java.c_pool_table
+    return (java.cpoolsize, bytes(pool.tags), pool.offsets.tobytes(), fields, methods, codes,
+            _attributes_to_tuple(java.attributes))
+
+def _read_entry(blob, data):
+    if len(blob) < _HEADER.size:
+        return None
+    magic, version, digest = _HEADER.unpack_from(blob)
+    payload = blob[_HEADER.size:]
+    if magic != MAGIC or version != FORMAT_VERSION or hashlib.sha256(payload).digest() != digest:
+        return None
+    try:
+        return _from_tuple(marshal.loads(payload), data)
+    except (EOFError, ValueError, TypeError):
+        return None
+
+def _attributes_from_tuple(attributes):
+    result = []
+    for name_index, info in attributes:
+        attribute = AttributeInfo()
+        attribute.attribute_name_index = name_index
+        attribute.attribute_length = len(info)
+        attribute.info = info
+        result.append(attribute)
+    return result
+
+def _from_tuple(entry, data):
+    cpoolsize, tags, offsets, fields, methods, codes, attributes = entry
+    java = ClassFile.__new__(ClassFile)
+    java.data = data
+    java.cpoolsize = cpoolsize
+    java.c_pool_table = ConstantPool(data)
+    java.c_pool_table.tags[:] = tags
+    java.c_pool_table.offsets.frombytes(offsets)
+    java.field_table = []
+    for access_flags, name_index, descriptor_index, field_attributes in fields:
+        field = FieldInfo()
+        field.access_flags, field.name_index, field.descriptor_index = access_flags, name_index, descriptor_index
+        field.attributes = _attributes_from_tuple(field_attributes)
+        java.field_table.append(field)
+    java.attribute_table = []
+    for name_index, length, max_stack, max_locals, code, exceptions, code_attributes, lines, starts in codes:
+        code_att = CodeAttribute()
+        code_att.attribute_name_index = name_index
+        code_att.attribute_length = length
+        code_att.max_stack = max_stack
+        code_att.max_locals = max_locals
+        code_att.code_length = len(code)
+        code_att.code = code
+        code_att.exception_table = exceptions
+        code_att.attributes = _attributes_from_tuple(code_attributes)
+        code_att.line_number_table = lines
+        code_att.instructions = array('I')
+        code_att.instructions.frombytes(starts)
+        java.attribute_table.append(code_att)
+    java.method_table = []
+    for access_flags, name_index, descriptor_index, method_attributes, code_index in methods:
+        method = MethodInfo()
+        method.access_flags, method.name_index, method.descriptor_index = access_flags, name_index, descriptor_index
+        method.attributes = _attributes_from_tuple(method_attributes)
+        if code_index >= 0:
+            method.code = java.attribute_table[code_index]
+        java.method_table.append(method)
+    java.attributes = _attributes_from_tuple(attributes)
+    return java
@@ -1,37 +1,224 @@
 """
 Module that reads and runs a java class file
 """
-from jvpm.OpCodes import OpCodes
+import asyncio
+from array import array
+import struct
+import sys
+import threading
+from jvpm.OpCodes import OpCodes, instruction_starts, resolve_symbol
+from jvpm.Symbols import intern
+from jvpm.Embedding import JavaMethod, NoSuchMethodError
+from jvpm.Sampler import interpreter_loop, class_frame
+
+# held while a method's Code attribute is decoded, so threads sharing a ClassFile decode it once
+_DECODE_LOCK = threading.RLock()
+
+# bytes after the tag of every constant pool entry except CONSTANT_Utf8, whose length comes first
+CONSTANT_SIZES = {
+    3: 4,
+    4: 4,
+    5: 8,
+    6: 8,
+    7: 2,
+    8: 2,
+    9: 4,
+    10: 4,
+    11: 4,
+    12: 4,
+    15: 3,
+    16: 2,
+    17: 4,
+    18: 4,
+    19: 2,
+    20: 2
+}
 
 class ConstantInfo():
     """
     Object containing Constant Info
     """
+    __slots__ = ('tag', 'info', 'name_index')
+
     def __init__(self):
         self.tag = 0
         self.info = []
         self.name_index = 0
 
+class ConstantPool():
+    """
+    Constant pool kept as parallel arrays: one tag byte and one offset into the class bytes for each
+    entry. ConstantInfo objects and decoded strings are only made for the entries that are used, and
+    are kept once made. Strings come from the shared symbol table.
+    """
+    __slots__ = ('data', 'tags', 'offsets', '_entries', '_strings')
+
+    def __init__(self, data=b''):
+        self.data = data
+        self.tags = bytearray()
+        self.offsets = array('I')
+        self._entries = {}
+        self._strings = {}
+
+    def append_entry(self, tag, offset):
+        """
+        Adds an entry whose info starts at offset in data
+        """
+        self.tags.append(tag)
+        self.offsets.append(offset)
+
+    def __len__(self):
+        return len(self.tags)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.tags)
+        entry = self._entries.get(index)
+        if entry is None:
+            if not 0 <= index < len(self.tags):
+                raise IndexError('constant pool index out of range')
+            entry = ConstantInfo()
+            entry.tag = self.tags[index]
+            entry.info = self.info(index)
+            self._entries[index] = entry
+        return entry
+
+    def __iter__(self):
+        for index in range(len(self.tags)):
+            yield self[index]
+
+    def info(self, index):
+        """
+        Returns the info bytes of the entry at index, counting from 0
+        """
+        start = self.offsets[index]
+        tag = self.tags[index]
+        if tag == 1:
+            length = (self.data[start - 2] << 8) | self.data[start - 1]
+        else:
+            length = CONSTANT_SIZES.get(tag, 0)
+        return bytes(self.data[start:start + length])
+
+    def utf8(self, index):
+        """
+        Returns the decoded CONSTANT_Utf8 entry at index, counting from 0
+        """
+        string = self._strings.get(index)
+        if string is None:
+            string = self._strings[index] = intern(self.info(index).decode('utf-8'))
+        return string
+
+    def invalidate(self):
+        """
+        Drops every ConstantInfo and resolved string made so far, so they are made again when next used
+        """
+        self._entries = {}
+        self._strings = {}
+
+    def resolve(self, index):
+        """
+        Returns the interned string for the entry at index, counting from 0: the text of a Utf8 entry
+        or the class, name and descriptor of a reference entry
+        """
+        symbol = self._strings.get(index)
+        if symbol is None:
+            symbol = self._strings[index] = resolve_symbol(self, index)
+        return symbol
+
+class AttributeInfo():
+    """
+    Object containing an attribute that is kept as raw bytes
+    """
+    __slots__ = ('attribute_name_index', 'attribute_length', 'info')
+
+    def __init__(self):
+        self.attribute_name_index = 0
+        self.attribute_length = 0
+        self.info = b''
+
+class FieldInfo():
+    """
+    Object containing Field Info
+    """
+    __slots__ = ('access_flags', 'name_index', 'descriptor_index', 'attributes')
+
+    def __init__(self):
+        self.access_flags = 0
+        self.name_index = 0
+        self.descriptor_index = 0
+        self.attributes = []
+
 class MethodInfo():
     """
     Object containing Method Info
     """
+    __slots__ = ('access_flags', 'name_index', 'descriptor_index', 'attributes', '_code', '_pending')
+
     def __init__(self):
         self.access_flags = 0
         self.name_index = 0
         self.descriptor_index = 0
+        self.attributes = []
+        self._code = None
+        self._pending = None  # ClassFile that still has to decode the Code attribute
+
+    @property
+    def code(self):
+        """
+        The CodeAttribute of the method, or None if it has no code. It is decoded the first time it is used.
+        """
+        java = self._pending
+        if java is not None:
+            with _DECODE_LOCK:
+                if self._pending is not None:
+                    # _pending is only cleared once _code is set, so a thread that sees it cleared sees the code
+                    self._code = java._create_method_code(self)
+                    self._pending = None
+        return self._code
+
+    @code.setter
+    def code(self, code):
+        self._pending = None
+        self._code = code
 
 class CodeAttribute():
     """
-    Object containg Code Attribute
+    Object containg Code Attribute. The code is kept as bytes.
     """
+    __slots__ = ('attribute_name_index', 'attribute_length', 'max_stack', 'max_locals', 'code_length', 'code',
+                 'exception_table', 'attributes', 'line_number_table', 'instructions')
+
     def __init__(self):
         self.attribute_name_index = 0
         self.attribute_length = 0
         self.max_stack = 0
         self.max_locals = 0
         self.code_length = 0
-        self.code = []
+        self.code = b''
+        self.exception_table = []
+        self.attributes = []
+        self.line_number_table = []
+        self.instructions = None
+
+    def get_instructions(self):
+        """
+        Returns an array holding the index of every instruction in the code, decoding it the first time
+        """
+        if self.instructions is None:
+            self.instructions = array('I', instruction_starts(self.code))
+        return self.instructions
+
+    def get_line_number(self, pc):
+        """
+        Returns the source line of the instruction at pc from the LineNumberTable, or None if there is none
+        """
+        line = None
+        for start_pc, line_number in self.line_number_table:
+            if start_pc <= pc:
+                line = line_number
+            else:
+                break
+        return line
 
 class ClassFile():
     """
@@ -39,19 +226,58 @@ class ClassFile():
     """
     def __init__(self, path):
         with open(path, 'rb') as binary_file:
-            self.data = binary_file.read()
-        self.c_pool_table = []
-        self.cpoolsize = 0
+            self._load(binary_file.read())
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Returns a ClassFile parsed from the bytes of a class file instead of from a path
+        """
+        java = cls.__new__(cls)
+        java._load(bytes(data))
+        return java
+
+    @classmethod
+    def from_stream(cls, stream):
+        """
+        Returns a ClassFile read from a binary file object such as a pipe or socket file. The constant
+        pool is decoded as its bytes arrive, and nothing past the end of the class is read, so several
+        classes can be read back to back from one stream.
+        """
+        parser = ClassParser()
+        while not parser.done:
+            chunk = stream.read(parser.needed())
+            if not chunk:
+                raise EOFError('class file ended after %d bytes' % len(parser.buffer))
+            parser.feed(chunk)
+        return parser.result()
+
+    def _load(self, data, c_pool_table=None, cpoolsize=0):
+        self.data = data
+        self.c_pool_table = ConstantPool(data) if c_pool_table is None else c_pool_table
+        self.cpoolsize = cpoolsize
+        self.field_table = []
         self.method_table = []
-        self.attribute_table = []
+        self._attribute_table = None
+        self.attributes = []
         self._parse_class_file()
 
     def _parse_class_file(self):
         if self._get_magic() != 'CAFEBABE':
             raise Exception()
         self._create_c_pool()
+        self._create_field_table()
         self._create_method_table()
-        self._create_attribute_table()
+        self._create_class_attributes()
+
+    def _u2(self, offset):
+        return (self.data[offset] << 8) | self.data[offset + 1]
+
+    def _u4(self, offset):
+        return struct.unpack_from('>I', self.data, offset)[0]
+
+    def _get_utf8(self, index):
+        return self.c_pool_table.utf8(index - 1)
 
     def _get_magic(self):
         magic = ""
@@ -60,48 +286,37 @@ class ClassFile():
         return magic
 
     def _get_minor(self):
-        return self.data[4] + self.data[5]
+        return self._u2(4)
 
     def _get_major(self):
-        return self.data[6] + self.data[7]
+        return self._u2(6)
 
     def _get_constant_pool_count(self):
-        return self.data[8] + self.data[9]
+        return self._u2(8)
 
     def _create_c_pool(self):
         if self.c_pool_table.__len__() > 0:
             return self.c_pool_table
 
         index_offset = 10
-        switch = {
-            3: 4,
-            4: 4,
-            5: 8,
-            6: 8,
-            7: 2,
-            8: 2,
-            9: 4,
-            10: 4,
-            11: 4,
-            12: 4,
-            15: 3,
-            16: 2,
-            18: 4
-        }
         max_count = int(self._get_constant_pool_count()) - 1
-        for _ in range(0, max_count):
-            thing = ConstantInfo()
-            thing.tag = self.data[index_offset]
+        pool = ConstantPool(self.data)
+        while len(pool) < max_count:
+            tag = self.data[index_offset]
             index_offset += 1
-            if thing.tag == 1:
-                bytes_needed = self.data[index_offset] + self.data[index_offset + 1]
+            if tag == 1:
+                bytes_needed = self._u2(index_offset)
                 index_offset += 2
+            elif tag in CONSTANT_SIZES:
+                bytes_needed = CONSTANT_SIZES[tag]
             else:
-                bytes_needed = switch.get(thing.tag)
-            for i in range(0, bytes_needed):
-                thing.info.append(self.data[i + index_offset])
+                raise Exception('Unknown constant pool tag %d' % tag)
+            pool.append_entry(tag, index_offset)
             index_offset += bytes_needed
-            self.c_pool_table.append(thing)
+            if tag in (5, 6):
+                # longs and doubles take up two entries in the constant pool
+                pool.append_entry(0, index_offset)
+        self.c_pool_table = pool
         self.cpoolsize = index_offset - 10
         return index_offset - 10
 
@@ -111,98 +326,322 @@ class ClassFile():
         return self.cpoolsize
 
     def _get_flags(self):
-        return self.data[10+self._get_constant_pool_size()] + \
-            self.data[self._get_constant_pool_size()+11]
+        return self._u2(10 + self._get_constant_pool_size())
 
     def _get_this_class(self):
-        return self.data[self._get_constant_pool_size()+12] + \
-            self.data[self._get_constant_pool_size()+13]
+        return self._u2(12 + self._get_constant_pool_size())
 
     def _get_super_class(self):
-        return self.data[self._get_constant_pool_size()+14] + \
-            self.data[self._get_constant_pool_size()+15]
+        return self._u2(14 + self._get_constant_pool_size())
 
     def _get_interface_count(self):
-        return self.data[self._get_constant_pool_size()+16] + \
-            self.data[self._get_constant_pool_size()+17]
+        return self._u2(16 + self._get_constant_pool_size())
+
+    def _get_interfaces(self):
+        offset = 18 + self._get_constant_pool_size()
+        return [self._u2(offset + 2 * i) for i in range(self._get_interface_count())]
 
     def _get_field_count(self):
-        return self.data[18+self._get_constant_pool_size()+self._get_interface_count()] + \
-            self.data[19+self._get_constant_pool_size()+self._get_interface_count()]
+        return self._u2(18 + self._get_constant_pool_size() + 2 * self._get_interface_count())
 
     def _get_field_size(self):
-        return self._get_field_count()*2
+        start = 20 + self._get_constant_pool_size() + 2 * self._get_interface_count()
+        return self._read_members(start - 2, FieldInfo)[1] - start
 
     def _get_method_count(self):
-        return self.data[20+self._get_constant_pool_size() + \
-            self._get_interface_count() + self._get_field_size()] + \
-            self.data[21+self._get_constant_pool_size() + \
-            self._get_interface_count() + self._get_field_size()]
+        return self._u2(20 + self._get_constant_pool_size() + 2 * self._get_interface_count() + \
+            self._get_field_size())
+
+    def _get_methods_offset(self):
+        return 20 + self._get_constant_pool_size() + 2 * self._get_interface_count() + \
+            self._get_field_size()
+
+    def _read_attributes(self, offset):
+        attributes = []
+        for _ in range(self._u2(offset)):
+            attribute = AttributeInfo()
+            attribute.attribute_name_index = self._u2(offset + 2)
+            attribute.attribute_length = self._u4(offset + 4)
+            attribute.info = memoryview(self.data)[offset + 8:offset + 8 + attribute.attribute_length]
+            attributes.append(attribute)
+            offset += 6 + attribute.attribute_length
+        return attributes, offset + 2
+
+    def _read_members(self, offset, member_class):
+        members = []
+        count = self._u2(offset)
+        offset += 2
+        for _ in range(count):
+            member = member_class()
+            member.access_flags = self._u2(offset)
+            member.name_index = self._u2(offset + 2)
+            member.descriptor_index = self._u2(offset + 4)
+            member.attributes, offset = self._read_attributes(offset + 6)
+            members.append(member)
+        return members, offset
+
+    def _create_field_table(self):
+        if self.field_table.__len__() > 0:
+            return self.field_table
+
+        offset = 18 + self._get_constant_pool_size() + 2 * self._get_interface_count()
+        self.field_table = self._read_members(offset, FieldInfo)[0]
+        return self.field_table
 
     def _create_method_table(self):
         if self.method_table.__len__() > 0:
             return self.method_table
 
-        count = 22+self._get_constant_pool_size() + self._get_interface_count() + \
-            self._get_field_size()
-        for _ in range(0, self._get_method_count()):
-            mtable = MethodInfo()
-            mtable.access_flags = self.data[count] + self.data[1+count]
-            mtable.name_index = self.data[2+count] + self.data[3 + count]
-            mtable.descriptor_index = self.data[4+count] + self.data[5 + count]
-            self.method_table.append(mtable)
+        self.method_table = self._read_members(self._get_methods_offset(), MethodInfo)[0]
+        for method in self.method_table:
+            method._pending = self
         return self.method_table
 
     def _get_attribute_count(self):
-        count = 28 + self._get_constant_pool_size() + self._get_interface_count() + \
-            self._get_field_size()
-        return self.data[count] + self.data[1 + count]
+        return self._u2(self._get_methods_offset() + 8)
+
+    def _create_code_attribute(self, attribute):
+        info = attribute.info
+        code_att = CodeAttribute()
+        code_att.attribute_name_index = attribute.attribute_name_index
+        code_att.attribute_length = attribute.attribute_length
+        code_att.max_stack, code_att.max_locals, code_att.code_length = struct.unpack_from('>HHI', info)
+        code_att.code = bytes(info[8:8 + code_att.code_length])
+        offset = 8 + code_att.code_length
+        # tolerate class files that end right after the last code array
+        if offset + 2 > len(info):
+            return code_att
+        count = struct.unpack_from('>H', info, offset)[0]
+        code_att.exception_table = [struct.unpack_from('>HHHH', info, offset + 2 + 8 * i) for i in range(count)]
+        offset += 2 + 8 * count
+        for _ in range(struct.unpack_from('>H', info, offset)[0]):
+            sub = AttributeInfo()
+            sub.attribute_name_index, sub.attribute_length = struct.unpack_from('>HI', info, offset + 2)
+            sub.info = info[offset + 8:offset + 8 + sub.attribute_length]
+            code_att.attributes.append(sub)
+            if self._get_utf8(sub.attribute_name_index) == 'LineNumberTable':
+                code_att.line_number_table.extend(sorted(
+                    struct.unpack_from('>HH', sub.info, 2 + 4 * i)
+                    for i in range(struct.unpack_from('>H', sub.info)[0])))
+            offset += 6 + sub.attribute_length
+        return code_att
+
+    def _create_method_code(self, method):
+        for attribute in method.attributes:
+            if self._get_utf8(attribute.attribute_name_index) == 'Code':
+                return self._create_code_attribute(attribute)
+        return None
 
     def _create_attribute_table(self):
-        if self.attribute_table.__len__() > 0:
-            return self.attribute_table
+        if self._attribute_table is None:
+            with _DECODE_LOCK:
+                if self._attribute_table is None:
+                    self._attribute_table = [method.code for method in self._create_method_table()
+                                             if method.code is not None]
+        return self._attribute_table
 
-        count = 30 + self._get_constant_pool_size() + self._get_interface_count() + \
-            self._get_field_size()
-        for _ in range(0, self._get_attribute_count()):
-            code_att = CodeAttribute()
-            code_att.attribute_name_index = self.data[count] + self.data[1 + count]
-            code_att.attribute_length = self.data[2 + count] + self.data[3 + count] + \
-                self.data[4 + count] + self.data[5 + count]
-            code_att.max_stack = self.data[6 + count] + self.data[7 + count]
-            code_att.max_locals = self.data[8 + count] + self.data[9 + count]
-            code_att.code_length = self.data[10 + count] + self.data[11 + count] + \
-                self.data[12 + count] + self.data[13 + count]
-            count = count + 13
-            for _ in range(0, code_att.code_length):
-                code_att.code.append(self.data[count + 1])
-                count += 1
-            self.attribute_table.append(code_att)
-        return self.attribute_table
+    @property
+    def attribute_table(self):
+        """
+        The CodeAttribute of every method that has code, in order. Building it decodes every method,
+        so code that only needs some methods should use their MethodInfo.code instead.
+        """
+        return self._create_attribute_table()
+
+    @attribute_table.setter
+    def attribute_table(self, table):
+        self._attribute_table = table
+
+    def _create_class_attributes(self):
+        offset = self._get_methods_offset()
+        offset = self._read_members(offset, MethodInfo)[1]
+        # tolerate class files that end right after the last code array
+        if offset + 2 <= len(self.data):
+            self.attributes = self._read_attributes(offset)[0]
+        return self.attributes
 
+    def get_class_name(self):
+        """
+        Returns the name of the class in this file, such as java/lang/Object
+        """
+        return self._get_utf8(self._u2_info(self._get_this_class()))
+
+    def get_method_name(self, method):
+        """
+        Returns the name and descriptor of a MethodInfo from this file, such as main([Ljava/lang/String;)V
+        """
+        return intern(self._get_utf8(method.name_index) + self._get_utf8(method.descriptor_index))
+
+    def _u2_info(self, index):
+        info = self.c_pool_table[index - 1].info
+        return (info[0] << 8) | info[1]
+
+    def find_method(self, name):
+        """
+        Returns the MethodInfo whose name and descriptor are name, such as main([Ljava/lang/String;)V,
+        or None if this class does not declare it
+        """
+        for method in self.method_table:
+            if self.get_method_name(method) == name:
+                return method
+        return None
+
+    def method(self, name, descriptor):
+        """
+        Returns a Python callable that runs the static method name with the given descriptor, such
+        as method('add', '(II)I')(2, 3)
+        """
+        method = self.find_method(name + descriptor)
+        if method is None:
+            raise NoSuchMethodError('%s has no method %s%s' % (self.get_class_name(), name, descriptor))
+        return JavaMethod(self, method)
+
+    def get_super_class_name(self):
+        """
+        Returns the name of the super class, or None for java/lang/Object
+        """
+        super_class = self._get_super_class()
+        return self._get_utf8(self._u2_info(super_class)) if super_class else None
+
+    @interpreter_loop(lambda local_vars: class_frame(local_vars['self'], local_vars.get('attribute'),
+                                                     local_vars.get('code_index', 0)))
     def run_opcodes(self):
         """
         Runs the opcodes in this file
         """
         ops = OpCodes()
-        table_index = 0
-        code_index = 0
-        while table_index < len(self.attribute_table):
-            while code_index < len(self.attribute_table[table_index].code):
-                value = self.attribute_table[table_index].code[code_index]
-                if value in (54, 21, 0x17):
-                    code_index += 1
-                    ops.interpret(value, [self.attribute_table[table_index].code[code_index]])
-                elif value == 0x12:
-                    code_index += 1
-                    ops.interpret(value, [self.attribute_table[table_index].code[code_index]], \
-                        self.c_pool_table)
-                elif value in (0xb6, 0xb2):
-                    code_index += 2
-                    ops.interpret(value, [self.attribute_table[table_index].code[code_index-1], \
-                        self.attribute_table[table_index].code[code_index]], self.c_pool_table)
+        for attribute in self.attribute_table:
+            code_index = 0
+            while code_index < len(attribute.code):
+                code_index = ops.execute(attribute.code, code_index, self.c_pool_table)
+        return ops
+
+    @interpreter_loop(lambda local_vars: class_frame(local_vars['self'], local_vars.get('attribute'),
+                                                     local_vars.get('code_index', 0)))
+    async def run_async(self, yield_every=1000, read_line=None):
+        """
+        Runs the opcodes in this file as a coroutine that gives control back to the event loop every
+        yield_every instructions. Scanner input is awaited from the coroutine function read_line, which
+        by default reads a line of stdin on the loop's executor.
+        """
+        if read_line is None:
+            read_line = _read_stdin_line
+        ops = OpCodes()
+        count = 0
+        for attribute in self.attribute_table:
+            code_index = 0
+            while code_index < len(attribute.code):
+                if ops.reads_input(attribute.code, code_index, self.c_pool_table):
+                    await ops.read_int_async(read_line)
+                    code_index += 3
                 else:
-                    ops.interpret(value)
-                code_index += 1
-            table_index += 1
+                    code_index = ops.execute(attribute.code, code_index, self.c_pool_table)
+                count += 1
+                if count % yield_every == 0:
+                    await asyncio.sleep(0)
         return ops
+
+class ClassParser():
+    """
+    Parses a class file from chunks of bytes as they arrive. Constant pool entries are decoded as
+    soon as each one is complete, and the rest of the file is checked as far as its bytes go, so
+    that done is set exactly when the last byte of the class has been fed.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+        self.c_pool_table = ConstantPool(self.buffer)
+        self.cpoolsize = 0
+        self.length = None
+        self.done = False
+        self._steps = self._parse()
+        self._need = next(self._steps)
+
+    def needed(self):
+        """
+        Returns how many more bytes the parser needs before it can go on, or 0 once it is done
+        """
+        return 0 if self.done else self._need - len(self.buffer)
+
+    def feed(self, chunk):
+        """
+        Adds a chunk of bytes and parses as far as they go. Returns the bytes of chunk that come
+        after the end of the class, which are not kept.
+        """
+        if self.done:
+            return bytes(chunk)
+        self.buffer += chunk
+        while len(self.buffer) >= self._need:
+            try:
+                self._need = self._steps.send(None)
+            except StopIteration:
+                self.done = True
+                extra = bytes(self.buffer[self.length:])
+                del self.buffer[self.length:]
+                return extra
+        return b''
+
+    def result(self):
+        """
+        Returns the ClassFile once every byte of the class has been fed, reusing the decoded constant pool
+        """
+        if not self.done:
+            raise EOFError('class file is incomplete, %d more bytes are needed' % self.needed())
+        data = bytes(self.buffer)
+        self.c_pool_table.data = data
+        java = ClassFile.__new__(ClassFile)
+        java._load(data, self.c_pool_table, self.cpoolsize)
+        return java
+
+    def _u2(self, offset):
+        return (self.buffer[offset] << 8) | self.buffer[offset + 1]
+
+    def _parse(self):
+        # each yield gives the total number of bytes needed before the next step can run
+        data = self.buffer
+        yield 10
+        if bytes(data[:4]) != b'\xca\xfe\xba\xbe':
+            raise Exception('Not a class file')
+        count = self._u2(8)
+        offset = 10
+        while len(self.c_pool_table) < count - 1:
+            yield offset + 3
+            tag = data[offset]
+            if tag == 1:
+                start = offset + 3
+                size = self._u2(offset + 1)
+            elif tag in CONSTANT_SIZES:
+                start = offset + 1
+                size = CONSTANT_SIZES[tag]
+            else:
+                raise Exception('Unknown constant pool tag %d' % tag)
+            offset = start + size
+            yield offset
+            self.c_pool_table.append_entry(tag, start)
+            if tag in (5, 6):
+                # longs and doubles take up two entries in the constant pool
+                self.c_pool_table.append_entry(0, offset)
+        self.cpoolsize = offset - 10
+        yield offset + 8
+        offset += 8 + 2 * self._u2(offset + 6)
+        for _ in range(2):
+            # fields, then methods
+            yield offset + 2
+            members = self._u2(offset)
+            offset += 2
+            for _ in range(members):
+                yield offset + 8
+                offset = yield from self._skip_attributes(offset + 6)
+        self.length = yield from self._skip_attributes(offset)
+
+    def _skip_attributes(self, offset):
+        yield offset + 2
+        count = self._u2(offset)
+        offset += 2
+        for _ in range(count):
+            yield offset + 6
+            offset += 6 + struct.unpack_from('>I', self.buffer, offset + 2)[0]
+        yield offset
+        return offset
+
+async def _read_stdin_line():
+    return await asyncio.get_running_loop().run_in_executor(None, sys.stdin.readline)
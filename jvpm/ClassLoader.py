@@ -0,0 +1,279 @@
+"""
+Module that resolves class names to parsed class files and keeps the most recently used ones loaded
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from jvpm.ClassFile import ClassFile
+from jvpm.ClassPath import ClassPath
+from jvpm.Isolate import ClassImage
+
+def estimate_size(java):
+    """
+    Returns a rough estimate in bytes of the memory held by the ClassFile java: its raw bytes, the
+    code arrays, the constant pool arrays and a fixed cost for each member and the class itself. The
+    code is measured from the Code attributes, so no method has to be decoded.
+    """
+    code = sum(len(attribute.info) for method in java.method_table for attribute in method.attributes
+               if java._get_utf8(attribute.attribute_name_index) == 'Code')
+    members = len(java.field_table) + len(java.method_table)
+    return 1024 + len(java.data) + code + 8 * len(java.c_pool_table) + 256 * members
+
+def class_file_name(name):
+    """
+    Returns the relative path of the class file for a class name given as java.lang.Object or java/lang/Object
+    """
+    name = name.replace('.', '/')
+    if name.endswith('/class'):
+        name = name[:-len('/class')]
+    return name + '.class'
+
+class ClassLoader():
+    """
+    Loads classes by name from a ClassPath, or a list of directories and archives, and keeps them in
+    a least recently used cache bounded by both the number of classes and their estimated size. When
+    several threads ask for the same class at once it is read and parsed only once, and every thread
+    gets the same ClassFile. reload swaps in new versions of class files that have changed.
+    """
+    def __init__(self, classpath=None, max_entries=256, max_bytes=64 * 1024 * 1024, cache=None):
+        self.classpath = classpath if isinstance(classpath, ClassPath) else ClassPath(classpath)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reloads = 0
+        self.size = 0
+        self._classes = OrderedDict()
+        self._loading = {}
+        self._stamps = {}
+        self._images = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._classes)
+
+    def __contains__(self, name):
+        return class_file_name(name) in self._classes
+
+    def load_class(self, name):
+        """
+        Returns the ClassFile for the class called name, loading it on a miss
+        """
+        key = class_file_name(name)
+        with self._lock:
+            entry = self._classes.get(key)
+            if entry is not None:
+                self._classes.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            future = self._loading.get(key)
+            leader = future is None
+            if leader:
+                future = self._loading[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if not leader:
+            return future.result()
+        try:
+            java = self._define(key)
+        except BaseException as exc:
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            del self._loading[key]
+            self._insert(key, java)
+        future.set_result(java)
+        return java
+
+    def load_image(self, name):
+        """
+        Returns the ClassImage of the class called name, made once and kept until the class is reloaded
+        """
+        key = class_file_name(name)
+        java = self.load_class(name)
+        image = self._images.get(key)
+        if image is None or image[0] is not java:
+            image = self._images[key] = (java, ClassImage.from_class(java))
+        return image[1]
+
+    def unload(self, name):
+        """
+        Drops the class called name from the loader, returning whether it was loaded
+        """
+        key = class_file_name(name)
+        with self._lock:
+            entry = self._classes.pop(key, None)
+            self._stamps.pop(key, None)
+            self._images.pop(key, None)
+            if entry is None:
+                return False
+            self.size -= entry[1]
+            return True
+
+    def clear(self):
+        """
+        Drops every loaded class
+        """
+        with self._lock:
+            self._classes.clear()
+            self._stamps.clear()
+            self._images.clear()
+            self.size = 0
+
+    def on_reload(self, listener):
+        """
+        Calls listener(changed, dependents) after every reload that changed something, with the names
+        of the classes that were reloaded or removed and of the loaded classes that refer to them
+        """
+        self._listeners.append(listener)
+
+    def reload(self):
+        """
+        Checks every loaded class against its class file and parses again only those whose content
+        changed. A class whose file was only touched keeps its ClassFile; a class whose file is gone
+        is unloaded. Listeners registered with on_reload are then told what changed, so that anything
+        built from the old classes can be dropped. Returns the names of the changed classes.
+        """
+        self.classpath.refresh()
+        changed = []
+        with self._lock:
+            keys = list(self._classes)
+        for key in keys:
+            with self._lock:
+                old = self._stamps.get(key)
+            stamp = self.classpath.stat(key)
+            if old is not None and stamp == old[0]:
+                continue
+            name = key[:-len('.class')]
+            if stamp is None:
+                self.unload(name)
+                changed.append(name)
+                continue
+            data = self.classpath.read(key)
+            digest = hashlib.sha256(data).digest()
+            if old is not None and digest == old[1]:
+                with self._lock:
+                    if key in self._classes:
+                        self._stamps[key] = (stamp, digest)
+                continue
+            java = self._parse(data)
+            with self._lock:
+                entry = self._classes.get(key)
+                if entry is None:
+                    continue
+                self.size -= entry[1]
+                size = estimate_size(java)
+                self._classes[key] = (java, size)
+                self.size += size
+                self._stamps[key] = (stamp, digest)
+                self._images.pop(key, None)
+                self.reloads += 1
+            changed.append(name)
+        if not changed:
+            return changed
+        dependents = self.dependents(changed)
+        for listener in self._listeners:
+            listener(changed, dependents)
+        return changed
+
+    def dependents(self, names):
+        """
+        Returns the names of the loaded classes, other than names themselves, whose constant pools
+        refer to any of the classes called names
+        """
+        names = set(name.replace('.', '/') for name in names)
+        with self._lock:
+            loaded = [(key[:-len('.class')], entry[0]) for key, entry in self._classes.items()]
+        return sorted(name for name, java in loaded
+                      if name not in names and not names.isdisjoint(referenced_classes(java)))
+
+    def watch(self, interval=1.0):
+        """
+        Returns a started Watcher that calls reload every interval seconds
+        """
+        return Watcher(self, interval).start()
+
+    def stats(self):
+        """
+        Returns the hit, miss and eviction counts and the number and estimated size of loaded classes
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._classes), 'bytes': self.size}
+
+    def _define(self, key):
+        stamp = self.classpath.stat(key)
+        data = self.classpath.read(key)
+        digest = hashlib.sha256(data).digest()
+        with self._lock:
+            self._stamps[key] = (stamp, digest)
+        return self._parse(data)
+
+    def _parse(self, data):
+        if self.cache is not None:
+            return self.cache.load_bytes(data)
+        return ClassFile.from_bytes(data)
+
+    def _insert(self, key, java):
+        size = estimate_size(java)
+        self._classes[key] = (java, size)
+        self.size += size
+        # the class just loaded always stays, even when it is larger than max_bytes by itself
+        while len(self._classes) > 1 and (len(self._classes) > self.max_entries or self.size > self.max_bytes):
+            evicted_key, (_, evicted) = self._classes.popitem(last=False)
+            self._stamps.pop(evicted_key, None)
+            self._images.pop(evicted_key, None)
+            self.size -= evicted
+            self.evictions += 1
+
+def referenced_classes(java):
+    """
+    Returns the names of the classes named by CONSTANT_Class entries in the constant pool of java
+    """
+    pool = java.c_pool_table
+    return set(java._get_utf8(java._u2_info(index + 1)) for index in range(len(pool)) if pool.tags[index] == 7)
+
+class Watcher():
+    """
+    Background thread that reloads changed classes of a ClassLoader every interval seconds
+    """
+    def __init__(self, loader, interval=1.0):
+        self.loader = loader
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts watching on a background thread
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='jvpm-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops watching and waits for the background thread to finish
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.loader.reload()
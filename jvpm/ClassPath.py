@@ -0,0 +1,185 @@
+"""
+Module that finds the bytes of class files in directories and in .jar and .zip archives
+"""
+import os
+import threading
+import zipfile
+
+class ClassNotFoundError(Exception):
+    """
+    Raised when no entry of the class path holds the requested class
+    """
+
+class DirectoryEntry():
+    """
+    Class path entry for a directory holding class files in package folders
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def read(self, key):
+        """
+        Returns the bytes of the class file key, such as java/lang/Object.class, or None if it is not here
+        """
+        try:
+            with open(os.path.join(self.path, key), 'rb') as class_file:
+                return class_file.read()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return None
+
+    def stat(self, key):
+        """
+        Returns the modification time and size of the class file key, or None if it is not here
+        """
+        try:
+            stat = os.stat(os.path.join(self.path, key))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """
+        Does nothing, a directory is looked at again on every read
+        """
+
+    def names(self):
+        """
+        Returns the key of every class file under the directory
+        """
+        keys = []
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                if name.endswith('.class'):
+                    keys.append(os.path.relpath(os.path.join(root, name), self.path).replace(os.sep, '/'))
+        return sorted(keys)
+
+    def close(self):
+        """
+        Does nothing, a directory holds nothing open
+        """
+
+class JarEntry():
+    """
+    Class path entry for a .jar or .zip archive. The central directory is read once when the entry is
+    made and indexed by name; a class is only decompressed when it is read.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        self.mtime_ns = os.stat(self.path).st_mtime_ns
+        self._zip = zipfile.ZipFile(self.path)
+        self.index = {info.filename: info for info in self._zip.infolist() if info.filename.endswith('.class')}
+
+    def read(self, key):
+        """
+        Returns the bytes of the class file key, such as java/lang/Object.class, or None if it is not here
+        """
+        info = self.index.get(key)
+        if info is None:
+            return None
+        with self._lock:
+            return self._zip.read(info)
+
+    def stat(self, key):
+        """
+        Returns the modification time of the archive and the CRC of the class file key, or None if it is not here
+        """
+        info = self.index.get(key)
+        return None if info is None else (self.mtime_ns, info.CRC)
+
+    def refresh(self):
+        """
+        Reads the central directory again if the archive has changed since it was read
+        """
+        if os.stat(self.path).st_mtime_ns != self.mtime_ns:
+            with self._lock:
+                self._zip.close()
+                self._open()
+
+    def names(self):
+        """
+        Returns the key of every class file in the archive
+        """
+        return sorted(self.index)
+
+    def close(self):
+        """
+        Closes the archive
+        """
+        self._zip.close()
+
+def open_entry(path):
+    """
+    Returns the class path entry for a directory or an archive
+    """
+    if os.path.isdir(path):
+        return DirectoryEntry(path)
+    return JarEntry(path)
+
+class ClassPath():
+    """
+    Ordered list of directories and archives searched for class files, like the java -cp option
+    """
+    def __init__(self, paths=None):
+        self.entries = [open_entry(path) for path in ([os.curdir] if paths is None else paths)]
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Returns the ClassPath for a list of paths joined with os.pathsep, such as lib/a.jar:classes
+        """
+        return cls([path for path in text.split(os.pathsep) if path])
+
+    def read(self, key):
+        """
+        Returns the bytes of the class file key from the first entry that has it
+        """
+        for entry in self.entries:
+            data = entry.read(key)
+            if data is not None:
+                return data
+        raise ClassNotFoundError(key[:-len('.class')].replace('/', '.'))
+
+    def stat(self, key):
+        """
+        Returns the stamp of the class file key from the first entry that has it, or None if none has it.
+        A stamp changes whenever the class file might have changed.
+        """
+        for entry in self.entries:
+            stamp = entry.stat(key)
+            if stamp is not None:
+                return stamp
+        return None
+
+    def refresh(self):
+        """
+        Reads the index of every archive that has changed again
+        """
+        for entry in self.entries:
+            entry.refresh()
+
+    def names(self):
+        """
+        Returns the key of every class file on the class path, keeping the first of any duplicates
+        """
+        keys = {}
+        for entry in self.entries:
+            for key in entry.names():
+                keys.setdefault(key, None)
+        return list(keys)
+
+    def close(self):
+        """
+        Closes every archive on the class path
+        """
+        for entry in self.entries:
+            entry.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
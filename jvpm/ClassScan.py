@@ -0,0 +1,142 @@
+"""
+Module that reads only the names, flags and member signatures of class files, for indexing large corpora
+"""
+import json
+import struct
+from jvpm.ClassFile import CONSTANT_SIZES
+from jvpm.ClassPath import JarEntry
+from jvpm.Runner import find_class_files
+
+_HEADER = struct.Struct('>IHHH')
+_CLASS_INFO = struct.Struct('>HHHH')
+_MEMBER = struct.Struct('>HHHH')
+_ATTRIBUTE = struct.Struct('>HI')
+
+class ClassRecord():
+    """
+    Object containing the metadata of one class file: its names, version, flags and the name and
+    descriptor of every field and method
+    """
+    def __init__(self, source=None):
+        self.source = source
+        self.name = None
+        self.super_name = None
+        self.interfaces = []
+        self.access_flags = 0
+        self.major = 0
+        self.minor = 0
+        self.fields = []
+        self.methods = []
+        self.error = None
+
+    def to_json(self):
+        """
+        Returns the record as a dictionary that can be written out as JSON
+        """
+        if self.error is not None:
+            return {'source': self.source, 'error': self.error}
+        return {'source': self.source, 'name': self.name, 'super': self.super_name,
+                'interfaces': self.interfaces, 'access_flags': self.access_flags,
+                'version': '%d.%d' % (self.major, self.minor),
+                'fields': [{'name': name, 'descriptor': descriptor, 'access_flags': flags}
+                           for name, descriptor, flags in self.fields],
+                'methods': [{'name': name, 'descriptor': descriptor, 'access_flags': flags}
+                            for name, descriptor, flags in self.methods]}
+
+def scan_bytes(data, source=None):
+    """
+    Returns the ClassRecord of the class file bytes data. The constant pool is walked without
+    building entries, only the strings that are named are decoded, and attribute bodies are
+    skipped by their length without being copied.
+    """
+    magic, minor, major, count = _HEADER.unpack_from(data)
+    if magic != 0xcafebabe:
+        raise ValueError('not a class file')
+    utf8 = {}
+    class_names = {}
+    offset = 10
+    index = 1
+    while index < count:
+        tag = data[offset]
+        if tag == 1:
+            length = (data[offset + 1] << 8) | data[offset + 2]
+            utf8[index] = (offset + 3, offset + 3 + length)
+            offset += 3 + length
+        elif tag == 7:
+            class_names[index] = (data[offset + 1] << 8) | data[offset + 2]
+            offset += 3
+        elif tag in CONSTANT_SIZES:
+            offset += 1 + CONSTANT_SIZES[tag]
+            if tag in (5, 6):
+                # longs and doubles take up two entries in the constant pool
+                index += 1
+        else:
+            raise ValueError('Unknown constant pool tag %d' % tag)
+        index += 1
+
+    def string(index):
+        start, end = utf8[index]
+        return bytes(data[start:end]).decode('utf-8')
+
+    record = ClassRecord(source)
+    record.minor, record.major = minor, major
+    record.access_flags, this_class, super_class, interface_count = _CLASS_INFO.unpack_from(data, offset)
+    record.name = string(class_names[this_class])
+    record.super_name = string(class_names[super_class]) if super_class else None
+    offset += 8
+    record.interfaces = [string(class_names[interface])
+                         for interface in struct.unpack_from('>%dH' % interface_count, data, offset)]
+    offset += 2 * interface_count
+    for members in (record.fields, record.methods):
+        member_count = (data[offset] << 8) | data[offset + 1]
+        offset += 2
+        for _ in range(member_count):
+            flags, name_index, descriptor_index, attribute_count = _MEMBER.unpack_from(data, offset)
+            offset += 8
+            for _ in range(attribute_count):
+                offset += 6 + _ATTRIBUTE.unpack_from(data, offset)[1]
+            members.append((string(name_index), string(descriptor_index), flags))
+    return record
+
+def scan_file(path):
+    """
+    Returns the ClassRecord of the class file at path
+    """
+    with open(path, 'rb') as class_file:
+        return scan_bytes(class_file.read(), path)
+
+def scan(paths):
+    """
+    Yields a ClassRecord for every class file in the given files, directories and .jar or .zip
+    archives. A class file that cannot be read gives a record holding the error instead.
+    """
+    for path in paths:
+        if path.endswith(('.jar', '.zip')):
+            entry = JarEntry(path)
+            try:
+                for key in entry.names():
+                    yield _scan_safely(lambda: scan_bytes(entry.read(key), '%s!/%s' % (path, key)),
+                                       '%s!/%s' % (path, key))
+            finally:
+                entry.close()
+        else:
+            for class_path in find_class_files([path]):
+                yield _scan_safely(lambda: scan_file(class_path), class_path)
+
+def _scan_safely(read, source):
+    try:
+        return read()
+    except (OSError, ValueError, KeyError, IndexError, struct.error, UnicodeDecodeError) as exc:
+        record = ClassRecord(source)
+        record.error = '%s: %s' % (type(exc).__name__, exc)
+        return record
+
+def write_records(records, out):
+    """
+    Writes each ClassRecord to out as one line of JSON, returning the number of records that hold an error
+    """
+    errors = 0
+    for record in records:
+        errors += record.error is not None
+        out.write(json.dumps(record.to_json()) + '\n')
+    return errors
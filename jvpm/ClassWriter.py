@@ -0,0 +1,90 @@
+"""
+Module that writes a parsed, and possibly rewritten, ClassFile back out as class file bytes
+"""
+import struct
+
+DEBUG_ATTRIBUTES = frozenset(('LineNumberTable', 'LocalVariableTable', 'LocalVariableTypeTable', 'SourceFile',
+                              'SourceDebugExtension'))
+# Code sub-attributes that hold code offsets, which go stale once the code changes length
+DEBUG_OFFSET_ATTRIBUTES = frozenset(('LineNumberTable', 'LocalVariableTable', 'LocalVariableTypeTable'))
+
+def write_class(java):
+    """
+    Returns the class file bytes for the ClassFile java. Code attributes are rebuilt from their
+    CodeAttribute so that edited code gets the right lengths; every other attribute is written as
+    it was read. A class that has not been changed comes out byte for byte the same.
+
+    When edited code is a different length from the code that was read, the offsets in its line
+    number and local variable tables no longer match, so those tables are left out. A StackMapTable
+    cannot be left out without making the class fail verification, so such code raises ValueError.
+    The exception table is written as it is, so code edits must keep its offsets right.
+    """
+    parts = [b'\xca\xfe\xba\xbe', struct.pack('>HHH', java._get_minor(), java._get_major(),
+                                              len(java.c_pool_table) + 1)]
+    for constant in java.c_pool_table:
+        if constant.tag == 0:
+            continue
+        parts.append(bytes([constant.tag]))
+        if constant.tag == 1:
+            parts.append(struct.pack('>H', len(constant.info)))
+        parts.append(bytes(constant.info))
+    interfaces = java._get_interfaces()
+    parts.append(struct.pack('>HHHH', java._get_flags(), java._get_this_class(), java._get_super_class(),
+                             len(interfaces)))
+    parts.extend(struct.pack('>H', index) for index in interfaces)
+    for members in (java.field_table, java.method_table):
+        parts.append(struct.pack('>H', len(members)))
+        for member in members:
+            parts.append(struct.pack('>HHH', member.access_flags, member.name_index, member.descriptor_index))
+            parts.append(_write_attributes(java, member.attributes, getattr(member, 'code', None)))
+    parts.append(_write_attributes(java, java.attributes))
+    return b''.join(parts)
+
+def save_class(java, path):
+    """
+    Writes the class file bytes for the ClassFile java to path
+    """
+    with open(path, 'wb') as class_file:
+        class_file.write(write_class(java))
+
+def strip_debug_attributes(java):
+    """
+    Removes line number, local variable and source file attributes from java, which makes the written
+    class smaller without changing what it does
+    """
+    for method in java.method_table:
+        if method.code is not None:
+            method.code.attributes = [attribute for attribute in method.code.attributes
+                                      if java._get_utf8(attribute.attribute_name_index) not in DEBUG_ATTRIBUTES]
+            method.code.line_number_table = []
+    java.attributes = [attribute for attribute in java.attributes
+                       if java._get_utf8(attribute.attribute_name_index) not in DEBUG_ATTRIBUTES]
+    return java
+
+def _write_attributes(java, attributes, code=None):
+    parts = [struct.pack('>H', len(attributes))]
+    for attribute in attributes:
+        if code is not None and java._get_utf8(attribute.attribute_name_index) == 'Code':
+            info = _write_code(java, code)
+        else:
+            info = bytes(attribute.info)
+        parts.append(struct.pack('>HI', attribute.attribute_name_index, len(info)))
+        parts.append(info)
+    return b''.join(parts)
+
+def _write_code(java, code):
+    attributes = code.attributes
+    if len(code.code) != code.code_length:
+        names = [java._get_utf8(attribute.attribute_name_index) for attribute in attributes]
+        if 'StackMapTable' in names:
+            raise ValueError('Cannot write a StackMapTable for code whose length changed from %d to %d' %
+                             (code.code_length, len(code.code)))
+        attributes = [attribute for attribute, name in zip(attributes, names) if name not in DEBUG_OFFSET_ATTRIBUTES]
+    parts = [struct.pack('>HHI', code.max_stack, code.max_locals, len(code.code)), bytes(code.code),
+             struct.pack('>H', len(code.exception_table))]
+    parts.extend(struct.pack('>HHHH', *entry) for entry in code.exception_table)
+    parts.append(struct.pack('>H', len(attributes)))
+    for attribute in attributes:
+        parts.append(struct.pack('>HI', attribute.attribute_name_index, len(attribute.info)))
+        parts.append(bytes(attribute.info))
+    return b''.join(parts)
@@ -0,0 +1,234 @@
+"""
+Module that records which basic blocks of each method are run, in one bitmap over the code offsets of each method
+"""
+import json
+import struct
+from jvpm.Embedding import add_probe, decode_steps, run_steps
+from jvpm.OpCodes import OpCodes, instruction_length, instruction_starts
+
+FORMAT_VERSION = 1
+
+# instructions that may jump, with the struct format of their offset
+_BRANCHES = {value: '>h' for value in range(0x99, 0xa9)}
+_BRANCHES.update({0xc6: '>h', 0xc7: '>h', 0xc8: '>i', 0xc9: '>i'})
+# instructions after which the next instruction starts a new block
+_BLOCK_ENDS = frozenset(_BRANCHES) | frozenset(range(0xa9, 0xb2)) | {0xbf}
+
+def basic_blocks(code, exception_table=()):
+    """
+    Returns the sorted code offsets at which basic blocks start: the first instruction, every branch,
+    switch and exception handler target, and every instruction that follows a jump, return or throw
+    """
+    leaders = {entry[2] for entry in exception_table}
+    if len(code):
+        leaders.add(0)
+    for index in instruction_starts(code):
+        value = code[index]
+        if value in _BRANCHES:
+            width = _BRANCHES[value]
+            leaders.add(index + struct.unpack_from(width, bytes(code[index + 1:index + 1 + struct.calcsize(width)]))[0])
+        elif value in (0xaa, 0xab):
+            leaders.update(_switch_targets(code, index))
+        if value in _BLOCK_ENDS:
+            leaders.add(index + instruction_length(code, index))
+    return sorted(leader for leader in leaders if leader < len(code))
+
+def _switch_targets(code, index):
+    offset = index + 1 + (3 - index % 4)
+    def words(start, count):
+        return struct.unpack('>%di' % count, bytes(code[start:start + 4 * count]))
+    if code[index] == 0xaa:
+        low, high = words(offset + 4, 2)
+        jumps = words(offset + 12, high - low + 1)
+    else:
+        jumps = words(offset + 8, 2 * words(offset + 4, 1)[0])[1::2]
+    return [index + jump for jump in words(offset, 1) + jumps]
+
+def method_key(java, attribute):
+    """
+    Returns the name coverage is kept under for a Code attribute, such as Add.main([Ljava/lang/String;)V
+    """
+    for method in java.method_table:
+        if method.code is attribute:
+            return java.get_class_name() + '.' + java.get_method_name(method)
+    return '%s.code%d' % (java.get_class_name(), java.attribute_table.index(attribute))
+
+class MethodCoverage():
+    """
+    Coverage of one method: the size of its code, the offsets where its basic blocks start, and a
+    bitmap with one bit for every code offset, which is set at the start of each block that has run
+    """
+    __slots__ = ('size', 'blocks', 'bitmap')
+
+    def __init__(self, size, blocks, bitmap=None):
+        self.size = size
+        self.blocks = list(blocks)
+        self.bitmap = bytearray((size + 7) // 8) if bitmap is None else bytearray(bitmap)
+
+    def mark(self, pc):
+        self.bitmap[pc >> 3] |= 1 << (pc & 7)
+
+    def covered(self, pc):
+        return bool(self.bitmap[pc >> 3] & (1 << (pc & 7)))
+
+    def covered_blocks(self):
+        return [pc for pc in self.blocks if self.covered(pc)]
+
+    def block_ranges(self):
+        """
+        Returns (start, end) code offsets of every basic block
+        """
+        return list(zip(self.blocks, self.blocks[1:] + [self.size]))
+
+    def covered_bytes(self):
+        return sum(end - start for start, end in self.block_ranges() if self.covered(start))
+
+    def missed_ranges(self):
+        """
+        Returns (start, end) code offsets of each run of blocks that never ran
+        """
+        ranges = []
+        for start, end in self.block_ranges():
+            if self.covered(start):
+                continue
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+    def merge(self, other):
+        if other.size != self.size or other.blocks != self.blocks:
+            raise ValueError('Coverage of different code cannot be merged')
+        for index, byte in enumerate(other.bitmap):
+            self.bitmap[index] |= byte
+
+    def to_json(self):
+        return {'size': self.size, 'blocks': self.blocks, 'bitmap': self.bitmap.hex()}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['size'], data['blocks'], bytes.fromhex(data['bitmap']))
+
+class Coverage():
+    """
+    Records which basic blocks run. The start of every block that has not run yet gets a probe, which
+    marks the block in its method's bitmap and then patches itself out, so code that has already
+    been covered runs the same way it does without coverage.
+    """
+    def __init__(self):
+        self.methods = {}
+
+    def method(self, key, code, exception_table=()):
+        """
+        Returns the MethodCoverage kept under key, starting an empty one for code if there is none
+        """
+        coverage = self.methods.get(key)
+        if coverage is None:
+            coverage = self.methods[key] = MethodCoverage(len(code), basic_blocks(code, exception_table))
+        return coverage
+
+    def run(self, java):
+        """
+        Runs every method of the ClassFile java in turn like ClassFile.run_opcodes, recording coverage.
+        The code is decoded into the steps embedded methods run, so branches go to their targets and
+        a block is only marked when it runs. Each method starts with zeroed local variables. A jump the
+        steps cannot follow, such as a switch or a throw, ends its method, so the blocks it would go
+        to stay uncovered. Returns the OpCodes object.
+        """
+        methods = []
+        for method in java.method_table:
+            attribute = method.code
+            if attribute is None:
+                continue
+            starts = instruction_starts(attribute.code)
+            steps = decode_steps(attribute.code, starts, strict=False)
+            coverage = self.method(method_key(java, attribute), attribute.code, attribute.exception_table)
+            step_of = {pc: step for step, pc in enumerate(starts)}
+            for pc in coverage.blocks:
+                if not coverage.covered(pc):
+                    add_probe(steps, step_of[pc], _marker(coverage, pc))
+            methods.append((java._get_utf8(method.name_index), attribute, starts, steps))
+        ops = OpCodes()
+        constants = java.c_pool_table
+        for name, attribute, starts, steps in methods:
+            ops._lva = [0] * attribute.max_locals
+            run_steps(ops, steps, constants, (java.get_class_name(), name, attribute, starts))
+        return ops
+
+    def instrument(self, method):
+        """
+        Records coverage of a JavaMethod from ClassFile.method each time it is called
+        """
+        coverage = self.method(method.class_name + '.' + method.name + method.descriptor, method.code.code,
+                               method.code.exception_table)
+        for pc in coverage.blocks:
+            if not coverage.covered(pc):
+                method.add_probe(pc, _marker(coverage, pc))
+        return method
+
+    def merge(self, other):
+        """
+        Adds the coverage recorded by other, such as a previous run loaded with load_json
+        """
+        for key, theirs in other.methods.items():
+            ours = self.methods.get(key)
+            if ours is None:
+                self.methods[key] = MethodCoverage(theirs.size, theirs.blocks, theirs.bitmap)
+            else:
+                ours.merge(theirs)
+        return self
+
+    def report(self):
+        """
+        Returns the blocks and code bytes covered in every method, and the code ranges that never ran, as text
+        """
+        lines = ['%-48s %13s %13s  %s' % ('Method', 'Blocks', 'Bytes', 'Missed')]
+        total_blocks = covered_blocks = total_bytes = covered_bytes = 0
+        for key in sorted(self.methods):
+            coverage = self.methods[key]
+            blocks = len(coverage.covered_blocks())
+            code_bytes = coverage.covered_bytes()
+            missed = ', '.join('%d-%d' % (start, end - 1) for start, end in coverage.missed_ranges())
+            lines.append(('%-48s %13s %13s  %s' % (key, _ratio(blocks, len(coverage.blocks)),
+                                                   _ratio(code_bytes, coverage.size), missed)).rstrip())
+            total_blocks += len(coverage.blocks)
+            covered_blocks += blocks
+            total_bytes += coverage.size
+            covered_bytes += code_bytes
+        lines.append('%-48s %13s %13s' % ('TOTAL', _ratio(covered_blocks, total_blocks),
+                                          _ratio(covered_bytes, total_bytes)))
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self):
+        return {'format': FORMAT_VERSION,
+                'methods': {key: self.methods[key].to_json() for key in sorted(self.methods)}}
+
+    @classmethod
+    def from_json(cls, data):
+        if data.get('format') != FORMAT_VERSION:
+            raise ValueError('Unknown coverage format %r' % data.get('format'))
+        coverage = cls()
+        coverage.methods = {key: MethodCoverage.from_json(method) for key, method in data['methods'].items()}
+        return coverage
+
+    def save_json(self, path):
+        """
+        Writes the coverage to path as JSON
+        """
+        with open(path, 'w') as json_file:
+            json.dump(self.to_json(), json_file, indent=2)
+
+    @classmethod
+    def load_json(cls, path):
+        """
+        Returns the coverage written to path by save_json
+        """
+        with open(path) as json_file:
+            return cls.from_json(json.load(json_file))
+
+def _marker(coverage, pc):
+    return lambda: coverage.mark(pc)
+
+def _ratio(part, whole):
+    return '%d/%d %3.0f%%' % (part, whole, 100.0 * part / whole if whole else 100.0)
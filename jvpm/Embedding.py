@@ -0,0 +1,221 @@
+"""
+Module that turns static methods of a class file into Python callables
+"""
+import operator
+import threading
+import numpy as np
+from jvpm.Assembler import ACC_STATIC
+from jvpm.OpCodes import OpCodes, OPERAND_LENGTHS, CONSTANT_OPCODES, instruction_starts
+from jvpm.Sampler import interpreter_loop
+
+class NoSuchMethodError(Exception):
+    """
+    Raised when a class does not declare the method asked for, or it is not a static method with code
+    """
+
+# how each step of a decoded method is run
+_PLAIN, _OPERANDS, _CONSTANTS, _IF, _IF_CMP, _GOTO, _RETURN_VALUE, _RETURN, _PROBE, _END = range(10)
+
+# jsr, ret, the switches, athrow and jsr_w, which go where the steps cannot follow
+_JUMPS = frozenset((0xa8, 0xa9, 0xaa, 0xab, 0xbf, 0xc9))
+
+_COMPARISONS = (operator.eq, operator.ne, operator.lt, operator.ge, operator.gt, operator.le)
+_REFERENCE_COMPARISONS = {0xa5: operator.is_, 0xa6: operator.is_not}
+_NULL_TESTS = {0xc6: lambda value, _: value is None, 0xc7: lambda value, _: value is not None}
+
+def _to_int(value):
+    return (int(value) + 0x80000000) % 0x100000000 - 0x80000000
+
+# Python values are turned into what the interpreter keeps for each descriptor type, and back
+_ARGUMENTS = {'I': _to_int, 'S': _to_int, 'B': _to_int, 'C': _to_int, 'Z': lambda value: 1 if value else 0,
+              'F': np.float32}
+_RESULTS = {'I': _to_int, 'S': _to_int, 'B': _to_int, 'C': _to_int, 'Z': bool, 'F': float, 'V': None}
+
+def parse_descriptor(descriptor):
+    """
+    Returns (argument descriptors, return descriptor) of a method descriptor, such as
+    (['I', 'Ljava/lang/String;'], 'V') for (ILjava/lang/String;)V
+    """
+    arguments = []
+    index = 1
+    while descriptor[index] != ')':
+        start = index
+        while descriptor[index] == '[':
+            index += 1
+        if descriptor[index] == 'L':
+            index = descriptor.index(';', index)
+        index += 1
+        arguments.append(descriptor[start:index])
+    return arguments, descriptor[index + 1:]
+
+class JavaMethod():
+    """
+    Python callable that runs one static method. The code is decoded once into a list of steps with
+    branch targets already resolved, and every call on a thread reuses that thread's frame, so a call
+    costs little more than running the instructions. Arguments and results are converted to and from
+    the values the interpreter uses for their descriptor types.
+    """
+    def __init__(self, java, method):
+        self.class_name = java.get_class_name()
+        self.name = java._get_utf8(method.name_index)
+        self.descriptor = java._get_utf8(method.descriptor_index)
+        if not method.access_flags & ACC_STATIC:
+            raise NoSuchMethodError('%s%s is not static' % (self.name, self.descriptor))
+        if method.code is None:
+            raise NoSuchMethodError('%s%s has no code' % (self.name, self.descriptor))
+        arguments, returns = parse_descriptor(self.descriptor)
+        if any(argument in ('J', 'D') for argument in arguments) or returns in ('J', 'D'):
+            raise NotImplementedError('long and double arguments and results are not supported')
+        self._arguments = [_ARGUMENTS.get(argument) for argument in arguments]
+        self._result = _RESULTS.get(returns)
+        self._returns_value = returns != 'V'
+        self._max_locals = max(method.code.max_locals, len(arguments))
+        self._unset = [0] * (self._max_locals - len(arguments))
+        self.code = method.code
+        self._constants = java.c_pool_table
+        self._pcs = instruction_starts(method.code.code)
+        self._steps = decode_steps(method.code.code, self._pcs)
+        self._where = (self.class_name, self.name, self.code, self._pcs)
+        self._frames = threading.local()
+
+    def __repr__(self):
+        return '<JavaMethod %s%s>' % (self.name, self.descriptor)
+
+    def add_probe(self, pc, callback):
+        """
+        Makes the instruction at code offset pc call callback() the first time it runs, after which the
+        instruction is put back the way it was
+        """
+        add_probe(self._steps, self._pcs.index(pc), callback)
+
+    def __call__(self, *args):
+        if len(args) != len(self._arguments):
+            raise TypeError('%s%s takes %d arguments, %d given' %
+                            (self.name, self.descriptor, len(self._arguments), len(args)))
+        ops = getattr(self._frames, 'ops', None)
+        if ops is None:
+            ops = self._frames.ops = OpCodes()
+            ops._lva = [0] * self._max_locals
+        del ops._op_stack[:]
+        lva = ops._lva
+        for index, (convert, value) in enumerate(zip(self._arguments, args)):
+            lva[index] = value if convert is None else convert(value)
+        lva[len(args):] = self._unset
+        result = run_steps(ops, self._steps, self._constants, self._where)
+        return result if result is None or self._result is None else self._result(result)
+
+def _step_frame(where, step):
+    # step is already past the instruction being run
+    class_name, name, attribute, pcs = where
+    pc = pcs[min(max(step - 1, 0), len(pcs) - 1)] if pcs else 0
+    return class_name, name, attribute, pc
+
+def add_probe(steps, step, callback):
+    """
+    Makes the step at index step of a list from decode_steps call callback() the first time it runs,
+    after which the step is put back the way it was
+    """
+    original = steps[step]
+    def probe():
+        steps[step] = original
+        callback()
+    steps[step] = (_PROBE, probe, None, None)
+
+@interpreter_loop(lambda local_vars: _step_frame(local_vars['where'], local_vars.get('step', 0)))
+def run_steps(ops, steps, constants, where):
+    """
+    Runs steps from decode_steps on ops until one returns, and returns the value it returned or None.
+    where is (class name, method name, CodeAttribute, instruction starts) for the Sampler.
+    """
+    stack = ops._op_stack
+    step = 0
+    while True:
+        kind, handler, operands, target = steps[step]
+        step += 1
+        if kind == _PLAIN:
+            handler(ops)
+        elif kind == _OPERANDS:
+            handler(ops, operands)
+        elif kind == _CONSTANTS:
+            handler(ops, operands, constants)
+        elif kind == _IF:
+            if handler(stack.pop(), 0):
+                step = target
+        elif kind == _IF_CMP:
+            value2 = stack.pop()
+            if handler(stack.pop(), value2):
+                step = target
+        elif kind == _GOTO:
+            step = target
+        elif kind == _RETURN_VALUE:
+            return stack.pop()
+        elif kind == _RETURN:
+            return None
+        elif kind == _END:
+            handler(ops)
+            return None
+        else:
+            handler()
+            step -= 1
+
+def _interpret(value):
+    # OpCodes.interpret reports an opcode it cannot run and skips it, like ClassFile.run_opcodes does
+    return lambda ops, operands: ops.interpret(value)
+
+def _end(value):
+    return lambda ops: print("Opcode ", value, " jumps where it cannot be followed, ending the method.")
+
+def decode_steps(code, starts, strict=True):
+    """
+    Decodes a code array, whose instructions start at the offsets starts, into a list of steps for
+    run_steps, one for each instruction plus a final return, with branch targets turned into step
+    indexes. Opcodes the steps cannot run raise NotImplementedError. Unless strict, nothing is
+    refused: an opcode that OpCodes does not implement is reported and skipped when it runs, and one
+    that jumps where the steps cannot follow, such as a switch or a throw, is reported and ends the
+    method when it runs.
+    """
+    step_of = {pc: step for step, pc in enumerate(starts)}
+    table = OpCodes()._table
+    steps = []
+    for pc in starts:
+        value = code[pc]
+        length = OPERAND_LENGTHS.get(value, 0)
+        operands = list(code[pc + 1:pc + 1 + length])
+        target = None
+        if 0x99 <= value <= 0xa7 or 0xc6 <= value <= 0xc8:
+            target = step_of[pc + int.from_bytes(bytes(operands), 'big', signed=True)]
+        if 0x99 <= value <= 0x9e:
+            steps.append((_IF, _COMPARISONS[value - 0x99], operands, target))
+        elif value in _NULL_TESTS:
+            steps.append((_IF, _NULL_TESTS[value], operands, target))
+        elif 0x9f <= value <= 0xa4:
+            steps.append((_IF_CMP, _COMPARISONS[value - 0x9f], operands, target))
+        elif value in _REFERENCE_COMPARISONS:
+            steps.append((_IF_CMP, _REFERENCE_COMPARISONS[value], operands, target))
+        elif value in (0xa7, 0xc8):
+            steps.append((_GOTO, None, operands, target))
+        elif value in (0xac, 0xae, 0xb0) or not strict and value in (0xad, 0xaf):
+            steps.append((_RETURN_VALUE, None, operands, None))
+        elif value == 0xb1:
+            steps.append((_RETURN, None, operands, None))
+        elif value in _JUMPS:
+            if strict:
+                raise NotImplementedError('Opcode %s jumps where embedded methods cannot follow' % hex(value))
+            steps.append((_END, _end(value), operands, None))
+        else:
+            handler = table.get(value)
+            if handler is None or handler.__name__ == '_not_implemented' or 0xa5 <= value <= 0xb0:
+                if strict:
+                    raise NotImplementedError('Opcode %s is not supported in embedded methods' % hex(value))
+                steps.append((_OPERANDS, _interpret(value), operands, None))
+                continue
+            function = getattr(OpCodes, handler.__name__)
+            if length == 0:
+                steps.append((_PLAIN, function, operands, None))
+            elif value in CONSTANT_OPCODES:
+                steps.append((_CONSTANTS, function, operands, None))
+            else:
+                steps.append((_OPERANDS, function, operands, None))
+    # running off the end of the code returns, like the rest of the interpreter does
+    steps.append((_RETURN, None, [], None))
+    return steps
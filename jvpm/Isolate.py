@@ -0,0 +1,154 @@
+"""
+Module that runs many programs in one process, sharing parsed classes and keeping each program's state apart
+"""
+from collections import namedtuple
+from types import MappingProxyType
+from jvpm.ClassFile import ClassFile, CONSTANT_SIZES
+from jvpm.Monitors import Monitors
+from jvpm.OpCodes import OpCodes, resolve_symbol
+from jvpm.Runner import capture
+from jvpm.Sampler import interpreter_loop
+
+# constant pool entry of an ImagePool, made fresh on every lookup so there is nothing to change
+Constant = namedtuple('Constant', ('tag', 'info'))
+
+# tags of the entries resolve_symbol turns into strings
+_SYMBOL_TAGS = frozenset((1, 7, 8, 9, 10, 11, 12))
+
+class ImagePool():
+    """
+    Read-only constant pool of a ClassImage. Every symbol is resolved when the image is built and
+    entries are read straight from the class bytes, so the pool has no caches for isolates to fill
+    and nothing that one isolate could change under another.
+    """
+    __slots__ = ('data', 'tags', 'offsets', 'symbols')
+
+    def __init__(self, pool):
+        set_slot = object.__setattr__
+        set_slot(self, 'data', memoryview(pool.data).toreadonly())
+        set_slot(self, 'tags', bytes(pool.tags))
+        set_slot(self, 'offsets', memoryview(pool.offsets).toreadonly())
+        set_slot(self, 'symbols', tuple(resolve_symbol(pool, index) if tag in _SYMBOL_TAGS else None
+                                        for index, tag in enumerate(self.tags)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ImagePool is read-only')
+
+    def __len__(self):
+        return len(self.tags)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.tags)
+        if not 0 <= index < len(self.tags):
+            raise IndexError('constant pool index out of range')
+        return Constant(self.tags[index], self.info(index))
+
+    def __iter__(self):
+        for index in range(len(self.tags)):
+            yield self[index]
+
+    def info(self, index):
+        """
+        Returns the info bytes of the entry at index, counting from 0
+        """
+        start = self.offsets[index]
+        tag = self.tags[index]
+        if tag == 1:
+            length = (self.data[start - 2] << 8) | self.data[start - 1]
+        else:
+            length = CONSTANT_SIZES.get(tag, 0)
+        return bytes(self.data[start:start + length])
+
+    def utf8(self, index):
+        return self.symbols[index]
+
+    def resolve(self, index):
+        return self.symbols[index]
+
+class ClassImage():
+    """
+    Read-only view of a parsed class: its name, constant pool and the code of each method. One image
+    is shared by every isolate that runs the class, so the class is parsed and stored only once. The
+    constant pool is frozen into an ImagePool when the image is built.
+    """
+    __slots__ = ('name', 'constants', 'methods', 'codes')
+
+    def __init__(self, name, constants, methods):
+        set_slot = object.__setattr__
+        set_slot(self, 'name', name)
+        set_slot(self, 'constants', constants if isinstance(constants, ImagePool) else ImagePool(constants))
+        methods = [(method, _read_only(code)) for method, code in methods]
+        set_slot(self, 'methods', MappingProxyType(dict(methods)))
+        set_slot(self, 'codes', tuple(code for _, code in methods))
+
+    @classmethod
+    def from_class(cls, java):
+        """
+        Returns the ClassImage of a parsed ClassFile. Methods with code keep their order in the file.
+        """
+        return cls(java.get_class_name(), java.c_pool_table,
+                   [(java.get_method_name(method), method.code.code)
+                    for method in java.method_table if method.code is not None])
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Returns the ClassImage of the class file bytes data
+        """
+        return cls.from_class(ClassFile.from_bytes(data))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ClassImage is read-only')
+
+    def __delattr__(self, name):
+        raise AttributeError('ClassImage is read-only')
+
+def _read_only(code):
+    return code.toreadonly() if isinstance(code, memoryview) else bytes(code)
+
+class Isolate():
+    """
+    State of one program run on shared ClassImages: its monitors, the frames it is running, and the
+    streams its input and output go to. Isolates never see each other's state.
+    """
+    def __init__(self, name=None, stdout=None, stdin=None):
+        self.name = name
+        self.stdout = stdout
+        self.stdin = stdin
+        self.monitors = Monitors()
+        self.frames = []
+
+    def run(self, image, method=None):
+        """
+        Runs the code of every method of image, in order, or only method, given as its name and
+        descriptor such as main([Ljava/lang/String;)V. Returns the OpCodes of the run.
+        """
+        codes = image.codes if method is None else (image.methods[method],)
+        if self.stdout is None:
+            return self._run(image, codes)
+        with capture(self.stdout, self.stdin):
+            return self._run(image, codes)
+
+    @interpreter_loop(lambda local_vars: _image_frame(local_vars['image'], local_vars.get('code'),
+                                                      local_vars.get('code_index', 0)))
+    def _run(self, image, codes):
+        ops = OpCodes()
+        ops.monitors = self.monitors
+        self.frames.append(ops)
+        try:
+            for code in codes:
+                code_index = 0
+                while code_index < len(code):
+                    code_index = ops.execute(code, code_index, image.constants)
+        finally:
+            self.frames.pop()
+        return ops
+
+def _image_frame(image, code, pc):
+    if code is None:
+        return None
+    for name, method_code in image.methods.items():
+        if method_code is code:
+            return image.name, name[:name.index('(')], None, pc
+    return image.name, None, None, pc
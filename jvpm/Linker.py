@@ -0,0 +1,180 @@
+"""
+Module that links only the methods and classes a program can reach from its entry method
+"""
+import struct
+import threading
+from collections import deque
+from jvpm.Assembler import argument_slots
+from jvpm.ClassLoader import ClassLoader
+from jvpm.ClassPath import ClassNotFoundError
+from jvpm.OpCodes import OpCodes
+from jvpm.Sampler import interpreter_loop, class_frame
+
+MAIN = 'main([Ljava/lang/String;)V'
+
+# invokevirtual, invokespecial, invokestatic and invokeinterface
+INVOKE_OPCODES = frozenset((0xb6, 0xb7, 0xb8, 0xb9))
+# ireturn through areturn, and return
+RETURN_OPCODES = frozenset(range(0xac, 0xb2))
+
+def method_ref(java, index):
+    """
+    Returns (class name, method name, descriptor) of the Methodref or InterfaceMethodref at index
+    in the constant pool of java, counting from 1
+    """
+    class_index, name_and_type = struct.unpack('>HH', java.c_pool_table.info(index - 1))
+    name_index, descriptor_index = struct.unpack('>HH', java.c_pool_table.info(name_and_type - 1))
+    return (java._get_utf8(java._u2_info(class_index)), java._get_utf8(name_index),
+            java._get_utf8(descriptor_index))
+
+class Linker():
+    """
+    Starts at an entry method and follows invoke instructions to find every method the program can
+    call. Only those methods have their code decoded, and a class is only loaded when a reachable
+    instruction first refers to it. Methods of classes that are not on the class path, such as the
+    Java library, are recorded as external. When the loader reloads a class, the methods linked from
+    it, and every method that reached them, are unlinked so that the next link sees the new code.
+    Reloads can come from another thread, such as a Watcher, so linking, unlinking and the lookups
+    made while running share one lock.
+    """
+    def __init__(self, loader=None):
+        self.loader = ClassLoader() if loader is None else loader
+        self.linked = {}
+        self.external = set()
+        self.classes = []
+        self._owners = {}  # class each linked method was found in, which may be a super class
+        self._callers = {}  # linked methods that invoke each method
+        self._lock = threading.RLock()
+        self.loader.on_reload(self._unlink)
+
+    def link(self, class_name, method=MAIN):
+        """
+        Links the method of class_name and everything reachable from it. Returns the linked methods
+        as a dictionary from (class name, method name and descriptor) to CodeAttribute.
+        """
+        queue = deque([(class_name.replace('.', '/'), method)])
+        with self._lock:
+            while queue:
+                owner, name = queue.popleft()
+                if (owner, name) in self.linked or (owner, name) in self.external:
+                    continue
+                found = self._find_method(owner, name)
+                if found is None:
+                    self.external.add((owner, name))
+                    continue
+                java, method_info = found
+                code = method_info.code
+                self.linked[(owner, name)] = code
+                self._owners[(owner, name)] = java.get_class_name()
+                if code is None:
+                    continue
+                for pc in code.get_instructions():
+                    if code.code[pc] in INVOKE_OPCODES:
+                        target_class, target_name, descriptor = method_ref(java, (code.code[pc + 1] << 8) |
+                                                                           code.code[pc + 2])
+                        target = (target_class, target_name + descriptor)
+                        self._callers.setdefault(target, set()).add((owner, name))
+                        queue.append(target)
+            return self.linked
+
+    def _unlink(self, changed, dependents):
+        # drop what was linked from the changed classes, and the methods that reached it, so that
+        # linking again walks down to the new code
+        changed = set(changed)
+        with self._lock:
+            stale = [key for key, owner in self._owners.items() if owner in changed or key[0] in changed]
+            stale += [key for key in self.external if key[0] in changed]
+            seen = set()
+            while stale:
+                key = stale.pop()
+                if key in seen:
+                    continue
+                seen.add(key)
+                self.linked.pop(key, None)
+                self._owners.pop(key, None)
+                self.external.discard(key)
+                stale.extend(self._callers.get(key, ()))
+            for callers in self._callers.values():
+                callers.difference_update(seen)
+            self.classes = [name for name in self.classes if name not in changed]
+
+    def _find_method(self, owner, name):
+        # look in the class and then up its super classes, loading each only when it is needed
+        while owner is not None:
+            try:
+                java = self.loader.load_class(owner)
+            except ClassNotFoundError:
+                return None
+            if owner not in self.classes:
+                self.classes.append(owner)
+            method = java.find_method(name)
+            if method is not None:
+                return java, method
+            owner = java.get_super_class_name()
+        return None
+
+    def unlinked(self):
+        """
+        Returns (class name, method name and descriptor) for every method of a loaded class that was not linked
+        """
+        skipped = []
+        with self._lock:
+            for owner in self.classes:
+                java = self.loader.load_class(owner)
+                for method in java.method_table:
+                    name = java.get_method_name(method)
+                    if (owner, name) not in self.linked:
+                        skipped.append((owner, name))
+        return skipped
+
+    def run(self, class_name, method=MAIN):
+        """
+        Links the method of class_name and runs its code. Calls to linked static methods run their
+        code in a frame of their own. Returns the OpCodes of the entry method.
+        """
+        class_name = class_name.replace('.', '/')
+        return self._call(self._lookup((class_name, method)), OpCodes())[0]
+
+    def _lookup(self, key):
+        # the defining class and code linked for key, linking it again if a reload unlinked it, or
+        # None for external methods and methods without code
+        with self._lock:
+            if key not in self.linked and key not in self.external:
+                self.link(*key)
+            code = self.linked.get(key)
+            return None if code is None else (self._owners[key], code)
+
+    @interpreter_loop(lambda local_vars: class_frame(local_vars.get('java'), local_vars.get('attribute'),
+                                                     local_vars.get('code_index', 0)))
+    def _call(self, linked, ops):
+        # runs linked code on ops, and returns ops with the value it returned, or None
+        owner, attribute = linked
+        java = self.loader.load_class(owner)
+        code = attribute.code
+        code_index = 0
+        while code_index < len(code):
+            value = code[code_index]
+            if value == 0xb8:
+                target_class, target_name, descriptor = method_ref(java, (code[code_index + 1] << 8) | code[code_index + 2])
+                target = self._lookup((target_class, target_name + descriptor))
+                if target is not None:
+                    self._invoke(target, descriptor, ops)
+                    code_index += 3
+                    continue
+            elif value in RETURN_OPCODES:
+                return ops, ops._op_stack.pop() if value != 0xb1 else None
+            code_index = ops.execute(code, code_index, java.c_pool_table)
+        return ops, None
+
+    def _invoke(self, target, descriptor, ops):
+        # pops the arguments into the local variables of a new frame, and pushes what the call returns
+        slots = argument_slots(descriptor)
+        stack = ops._op_stack
+        arguments = stack[len(stack) - slots:] if slots else []
+        del stack[len(stack) - slots:]
+        frame = OpCodes()
+        frame.monitors = ops.monitors
+        frame._lva = arguments + [0] * (target[1].max_locals - len(arguments))
+        result = self._call(target, frame)[1]
+        if not descriptor.endswith(')V'):
+            stack.append(result)
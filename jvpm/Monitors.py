@@ -0,0 +1,71 @@
+"""
+Module that keeps track of Java monitors for monitorenter, monitorexit, wait and notify
+"""
+
+class IllegalMonitorStateError(Exception):
+    """
+    Raised when a thread releases, waits on or notifies a monitor it does not own
+    """
+
+class Monitors():
+    """
+    Object containing the owner, entry count and wait set of every monitor in use.
+    Owners are the OpCodes objects of the threads, and monitors are keyed by the object value.
+    """
+    def __init__(self):
+        self._owners = {}
+        self._wait_sets = {}
+
+    def owner(self, obj):
+        """
+        Returns the owner of the monitor for obj, or None if it is free
+        """
+        return self._owners.get(obj, (None, 0))[0]
+
+    def acquire(self, obj, owner, count=1):
+        """
+        Enters the monitor for obj count times. Returns False without entering if another owner holds it.
+        """
+        held_by, held = self._owners.get(obj, (owner, 0))
+        if held_by is not owner:
+            return False
+        self._owners[obj] = (owner, held + count)
+        return True
+
+    def release(self, obj, owner):
+        """
+        Exits the monitor for obj once
+        """
+        held_by, held = self._check_owner(obj, owner)
+        if held == 1:
+            del self._owners[obj]
+        else:
+            self._owners[obj] = (held_by, held - 1)
+
+    def wait(self, obj, owner):
+        """
+        Fully releases the monitor for obj and adds owner to its wait set.
+        Returns the entry count the owner has to reacquire once it is notified.
+        """
+        held = self._check_owner(obj, owner)[1]
+        del self._owners[obj]
+        self._wait_sets.setdefault(obj, []).append(owner)
+        return held
+
+    def notify(self, obj, owner, notify_all=False):
+        """
+        Removes one waiter, or all of them, from the wait set of obj and returns the removed waiters
+        """
+        self._check_owner(obj, owner)
+        waiters = self._wait_sets.get(obj, [])
+        woken = waiters[:] if notify_all else waiters[:1]
+        del waiters[:len(woken)]
+        if not waiters:
+            self._wait_sets.pop(obj, None)
+        return woken
+
+    def _check_owner(self, obj, owner):
+        held_by, held = self._owners.get(obj, (None, 0))
+        if held_by is not owner:
+            raise IllegalMonitorStateError('Monitor for %r is not owned by this thread' % (obj,))
+        return held_by, held
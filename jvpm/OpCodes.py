@@ -1,11 +1,99 @@
 import numpy as np
 import struct
 import re
+import sys
+from jvpm.BatchOpCodes import BatchOpCodes
+from jvpm.Monitors import Monitors, IllegalMonitorStateError
+from jvpm.Symbols import intern
+
+# number of operand bytes that follow each opcode in a code array
+OPERAND_LENGTHS = {0x10: 1, 0x11: 2, 0x12: 1, 0x13: 2, 0x14: 2, 0x84: 2, 0xa9: 1, 0xb9: 4, 0xba: 4, 0xbc: 1,
+                   0xc5: 3, 0xc8: 4, 0xc9: 4}
+OPERAND_LENGTHS.update({value: 1 for value in range(0x15, 0x1a)})
+OPERAND_LENGTHS.update({value: 1 for value in range(0x36, 0x3b)})
+OPERAND_LENGTHS.update({value: 2 for value in range(0x99, 0xa9)})
+OPERAND_LENGTHS.update({value: 2 for value in (0xb2, 0xb3, 0xb4, 0xb5, 0xb6, 0xb7, 0xb8, 0xbb, 0xbd, 0xc0, 0xc1,
+                                               0xc6, 0xc7)})
+
+# opcodes whose operands index the constant pool
+CONSTANT_OPCODES = frozenset((0x12, 0x13, 0x14, 0xb2, 0xb3, 0xb4, 0xb5, 0xb6, 0xb7, 0xb8, 0xb9, 0xba, 0xbb,
+                              0xbd, 0xc0, 0xc1, 0xc5))
+
+def instruction_length(code, index):
+    """
+    Returns the length in bytes of the instruction that starts at code[index], including the
+    variable length tableswitch, lookupswitch and wide instructions
+    """
+    value = code[index]
+    if value in (0xaa, 0xab):
+        offset = index + 1 + (3 - index % 4)
+        if value == 0xaa:
+            low = struct.unpack('>i', bytes(code[offset + 4:offset + 8]))[0]
+            high = struct.unpack('>i', bytes(code[offset + 8:offset + 12]))[0]
+            return offset - index + 12 + 4 * (high - low + 1)
+        pairs = struct.unpack('>i', bytes(code[offset + 4:offset + 8]))[0]
+        return offset - index + 8 + 8 * pairs
+    if value == 0xc4:
+        return 6 if code[index + 1] == 0x84 else 4
+    return 1 + OPERAND_LENGTHS.get(value, 0)
+
+def instruction_starts(code):
+    """
+    Returns the index of every instruction in a code array, in order
+    """
+    starts = []
+    index = 0
+    while index < len(code):
+        starts.append(index)
+        index += instruction_length(code, index)
+    return starts
+
+def resolve_symbol(c_pool, index):
+    """
+    Returns the interned string for a constant pool entry: the text of a Utf8 entry, or the class,
+    name and descriptor a reference entry points to, such as java/io/PrintStream.println:(I)V
+    """
+    const_ref = c_pool[index]
+
+    if const_ref.tag != 1:
+        class_index = ((const_ref.info[0] << 8) | const_ref.info[1]) - 1
+        val = resolve_symbol(c_pool, class_index)
+
+        if const_ref.tag == 10:
+            val += '.'
+        elif const_ref.tag == 12:
+            val += ':'
+
+        if const_ref.info.__len__() > 2:
+            name_type_index = ((const_ref.info[2] << 8) | const_ref.info[3]) - 1
+            val += resolve_symbol(c_pool, name_type_index)
+
+        return intern(val)
+
+    else:
+        return intern(bytes(const_ref.info).decode("utf-8"))
+
+# natives that block waiting for input, and the prompt they show
+SCANNER_NEXT_INT = intern('java/util/Scanner.nextInt:()I')
+INPUT_PROMPT = "Enter a number: "
+
+# natives run by invokevirtual. They are interned, so a resolved reference usually is the same object and
+# == returns at its identity check, but dispatch does not rely on that.
+PRINTLN_INT = intern('java/io/PrintStream.println:(I)V')
+PRINTLN_STRING = intern('java/io/PrintStream.println:(Ljava/lang/String;)V')
+OBJECT_WAIT = intern('java/lang/Object.wait:()V')
+OBJECT_NOTIFY = intern('java/lang/Object.notify:()V')
+OBJECT_NOTIFY_ALL = intern('java/lang/Object.notifyAll:()V')
+THREAD_YIELD = intern('java/lang/Thread.yield:()V')
 
 class OpCodes():
     def __init__(self):
         self._op_stack = []  # operand stack for the opcodes
         self._lva = []  # local variable array initialized
+        self.monitors = Monitors()  # shared between threads that run under the same Scheduler
+        self.pending_monitor = None  # (object, count) this thread has to reacquire before it can run on
+        self.notified = True  # False while this thread is in the wait set of a monitor
+        self.yielding = False  # set when this thread asks the Scheduler to switch threads
         self._table = {0x00: self._not_implemented, 0x02: self._iconst_m1, 0x03: self._iconst_0, 0x04: self._iconst_1,
                       0x05: self._iconst_2, 0x06: self._iconst_3, 0x07: self._iconst_4, 0x08: self._iconst_5,
                       0x60: self._iadd, 0x7e: self._iand, 0x6c: self._idiv, 0x68: self._imul, 0x74: self._ineg,
@@ -18,6 +106,7 @@ class OpCodes():
                       0x3c: self._istore_1, 0x3d: self._istore_2, 0x3e: self._istore_3, 0x91: self._i2b, 0x92: self._i2c,
                       0x87: self._i2d, 0x86: self._i2f,
                       0x85: self._i2l, 0x93: self._i2s, 0xb6: self._invokevirtual, 0xb2: self._getstatic, 0x12: self._ldc,
+                      0x13: self._ldc_w,
                       0x8b: self._f2i, 0x8c: self._f2l, 0x8d: self._f2d, 0xb1: self._ret, 0xb: self._fconst_0,
                       0xc: self._fconst_1, 0xd: self._fconst_2, 0x17: self._fload, 0x22: self._fload_0, 0x23: self._fload_1,
                       0x24: self._fload_2, 0x25: self._fload_3,
@@ -26,7 +115,18 @@ class OpCodes():
                       0x41: self._lstore_2, 0x42: self._lstore_3, 0x37: self._lstore, 0x61: self._ladd, 0x65: self._lsub,
                       0x69: self._lmul, 0x6d: self._ldiv, 0x71: self._lrem, 0x75: self._lneg, 0x7d: self._lushr,
                       0x7f: self._land, 0x81: self._lor, 0x83: self._lxor, 0x88: self._l2i, 0x89: self._l2f, 0x8a: self._l2d, 
-                      0x79: self._lshl, 0x7b: self._lshr}
+                      0x79: self._lshl, 0x7b: self._lshr, 0xc2: self._monitorenter, 0xc3: self._monitorexit}
+
+    @staticmethod
+    def run_batch(method, inputs):
+        """
+        Runs a method once over a whole array of input tuples instead of once per tuple.
+
+        The method is a CodeAttribute or a list of code bytes. Each row of inputs is one tuple of arguments,
+        loaded into the local variable array starting at index 0. Returns an array holding the value each
+        row returned, or None for void methods.
+        """
+        return BatchOpCodes(inputs).run(method)
 
     def _not_implemented(self):
         return 'not implemented'
@@ -47,9 +147,52 @@ class OpCodes():
                 return self._table[value](operands)
             else:
                 return self._table[value]()
+        except IllegalMonitorStateError:
+            # a thread that does not own the monitor has to fail, not skip the instruction
+            raise
         except:
             print("Opcode ", value, " not implemented, skipping it.")
 
+    def execute(self, code, index, constants=None):
+        """
+        Executes the instruction that starts at code[index], passing it the operand bytes that follow the opcode
+        and the constant pool if it needs one. Returns the index of the next instruction.
+        """
+        value = code[index]
+        length = OPERAND_LENGTHS.get(value, 0)
+        if length == 0:
+            self.interpret(value)
+        elif value in CONSTANT_OPCODES:
+            self.interpret(value, list(code[index + 1:index + 1 + length]), constants)
+        else:
+            self.interpret(value, list(code[index + 1:index + 1 + length]))
+        return index + 1 + length
+
+    def reads_input(self, code, index, constants):
+        """
+        Returns True if the instruction that starts at code[index] calls a native that blocks waiting for input
+        """
+        if code[index] != 0xb6:
+            return False
+        return self._get_str_from_cpool(((code[index + 1] << 8) | code[index + 2]) - 1, constants) == SCANNER_NEXT_INT
+
+    async def read_int_async(self, read_line):
+        """
+        Does what Scanner.nextInt does, but awaits each line from the coroutine function read_line
+        instead of blocking on input(). Pushes the integer that was read onto the operand stack.
+        """
+        while True:
+            sys.stdout.write(INPUT_PROMPT)
+            sys.stdout.flush()
+            data = await read_line()
+            if not data:
+                raise EOFError('EOF when reading a line')
+            data = data.rstrip('\n')
+            if re.match(r"[-+]?\d+$", data) is not None:
+                break
+            print("Invalid input")
+        self._op_stack.append(int(data))
+
     def _iconst_m1(self):
         self._op_stack.append(-1)
 
@@ -140,7 +283,7 @@ class OpCodes():
         self._op_stack.append(value1 ^ value2)
 
     def _iload(self, operands):
-        index = operands.pop()
+        index = operands[-1]
         self._op_stack.append(self._lva[index])
 
     def _iload_0(self):
@@ -156,7 +299,7 @@ class OpCodes():
         self._op_stack.append(self._lva[3])
 
     def _istore(self, operands):
-        index = operands.pop()
+        index = operands[-1]
         if len(self._lva) <= index:
             self._lva.append(self._op_stack.pop())
         else:
@@ -235,7 +378,7 @@ class OpCodes():
         self._op_stack.append(frag2)
 
     def _lload(self, operands):
-        index = operands.pop()
+        index = operands[-1]
         frag1 = self._lva[index]
         frag2 = self._lva[index+1]
         self._op_stack.append(frag1)
@@ -302,7 +445,7 @@ class OpCodes():
                 self._lva[4] = frag2
 
     def _lstore(self, operands):
-        index = operands.pop()
+        index = operands[-1]
         frag2 = self._op_stack.pop()
         frag1 = self._op_stack.pop()
         if len(self._lva) == index:
@@ -448,7 +591,7 @@ class OpCodes():
         self._op_stack.append(float(valuea))
 
     def _fstore(self, operands):
-        index = operands.pop()
+        index = operands[-1]
         if len(self._lva) <= index:
             self._lva.append(np.float32(self._op_stack.pop()))
         else:
@@ -524,50 +667,65 @@ class OpCodes():
         self._op_stack.append(np.float32(- value))
 
     def _get_str_from_cpool(self, index, c_pool):
-        const_ref = c_pool[index]
-
-        if const_ref.tag != 1:
-            class_index = const_ref.info[0] + const_ref.info[1] - 1
-            val = self._get_str_from_cpool(class_index, c_pool)
-
-            if const_ref.tag == 10:
-                val += '.'
-            elif const_ref.tag == 12:
-                val += ':'
-
-            if const_ref.info.__len__() > 2:
-                name_type_index = const_ref.info[2] + const_ref.info[3] - 1
-                val += self._get_str_from_cpool(name_type_index, c_pool)
-
-            return val
-
-        else:
-            return bytes(const_ref.info).decode("utf-8")
+        resolve = getattr(c_pool, 'resolve', None)
+        if resolve is not None:
+            return resolve(index)
+        return resolve_symbol(c_pool, index)
 
     def _invokevirtual(self, operands, c_pool):
-        num1 = operands.pop()
-        num2 = operands.pop()
-        method = self._get_str_from_cpool(num1 + num2 - 1, c_pool)
-        if method == 'java/io/PrintStream.println:(I)V':
+        num1 = operands[-1]
+        num2 = operands[-2]
+        method = self._get_str_from_cpool(((num2 << 8) | num1) - 1, c_pool)
+        if method == PRINTLN_INT:
             print(self._op_stack.pop())
-        elif method == 'java/io/PrintStream.println:(Ljava/lang/String;)V':
+        elif method == PRINTLN_STRING:
             print(self._op_stack.pop())
-        elif method == 'java/util/Scanner.nextInt:()I':
-            data = input("Enter a number: ")
+        elif method == SCANNER_NEXT_INT:
+            data = input(INPUT_PROMPT)
             while re.match(r"[-+]?\d+$", data) is None:
                 print("Invalid input")
-                data = input("Enter a number: ")
+                data = input(INPUT_PROMPT)
             int1 = int(data)
             self._op_stack.append(int1)
+        elif method == OBJECT_WAIT:
+            obj = self._op_stack.pop()
+            self.pending_monitor = (obj, self.monitors.wait(obj, self))
+            self.notified = False
+        elif method == OBJECT_NOTIFY or method == OBJECT_NOTIFY_ALL:
+            for waiter in self.monitors.notify(self._op_stack.pop(), self, method == OBJECT_NOTIFY_ALL):
+                waiter.notified = True
+        elif method == THREAD_YIELD:
+            self.yielding = True
+
+    def _monitorenter(self):
+        obj = self._op_stack.pop()
+        if not self.monitors.acquire(obj, self):
+            self.pending_monitor = (obj, 1)
+
+    def _monitorexit(self):
+        self.monitors.release(self._op_stack.pop(), self)
 
     def _getstatic(self, operands, c_pool):
-        value1 = operands.pop()
-        value2 = operands.pop()
-        return self._get_str_from_cpool(value1 + value2 - 1, c_pool)
+        value1 = operands[-1]
+        value2 = operands[-2]
+        return self._get_str_from_cpool(((value2 << 8) | value1) - 1, c_pool)
 
     def _ldc(self, operands, c_pool):
-        value = operands.pop()
-        self._op_stack.append(self._get_str_from_cpool(value - 1, c_pool))
+        value = operands[-1]
+        self._op_stack.append(self._get_constant(value - 1, c_pool))
+
+    def _ldc_w(self, operands, c_pool):
+        value2 = operands[-1]
+        value1 = operands[-2]
+        self._op_stack.append(self._get_constant(((value1 << 8) | value2) - 1, c_pool))
+
+    def _get_constant(self, index, c_pool):
+        const_ref = c_pool[index]
+        if const_ref.tag == 3:
+            return struct.unpack('>i', bytes(const_ref.info))[0]
+        if const_ref.tag == 4:
+            return np.float32(struct.unpack('>f', bytes(const_ref.info))[0])
+        return self._get_str_from_cpool(index, c_pool)
 
     def _longsplit(self, val):    # Splits long in half and returns first and second frag as int32
         val = np.int64(val)
@@ -590,7 +748,7 @@ class OpCodes():
         self._op_stack.append(np.float32(2.0))
 
     def _fload(self, operands):
-        index = operands.pop()
+        index = operands[-1]
         self._op_stack.append(self._lva[index])
 
     def _fload_0(self):
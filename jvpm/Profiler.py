@@ -0,0 +1,133 @@
+"""
+Module that profiles which opcodes and which instructions of a java class file take the most time
+"""
+import json
+import time
+from collections import Counter, defaultdict
+from jvpm.OpCodes import OpCodes
+from jvpm.Sampler import interpreter_loop, class_frame
+
+class Profiler():
+    """
+    Runs a class file in its own dispatch loop that counts and times every instruction, so that
+    ClassFile.run_opcodes pays nothing for profiling when it is not used
+    """
+    def __init__(self):
+        self.opcode_counts = Counter()
+        self.opcode_times = defaultdict(float)
+        self.opcode_histograms = defaultdict(Counter)
+        self.pc_counts = Counter()
+        self.pc_times = defaultdict(float)
+        self.pair_counts = Counter()
+        self.total_time = 0.0
+
+    @interpreter_loop(lambda local_vars: class_frame(local_vars['java'], local_vars.get('attribute'),
+                                                     local_vars.get('code_index', 0)))
+    def run(self, java):
+        """
+        Runs the opcodes of the ClassFile java, recording a profile of the run. Returns the OpCodes object.
+        """
+        ops = OpCodes()
+        clock = time.perf_counter
+        names = {}
+        start_run = clock()
+        for attribute in java.attribute_table:
+            method = _method_name(java, attribute)
+            code = attribute.code
+            previous = None
+            code_index = 0
+            while code_index < len(code):
+                value = code[code_index]
+                start = clock()
+                next_index = ops.execute(code, code_index, java.c_pool_table)
+                elapsed = clock() - start
+                name = names.get(value)
+                if name is None:
+                    name = names[value] = opcode_name(ops, value)
+                self.opcode_counts[name] += 1
+                self.opcode_times[name] += elapsed
+                self.opcode_histograms[name][int(elapsed * 1e9).bit_length()] += 1
+                self.pc_counts[(method, code_index)] += 1
+                self.pc_times[(method, code_index)] += elapsed
+                if previous is not None:
+                    self.pair_counts[(previous, name)] += 1
+                previous = name
+                code_index = next_index
+        self.total_time += clock() - start_run
+        return ops
+
+    def top_opcodes(self, count=10):
+        """
+        Returns (opcode name, executions, seconds) for the count opcodes that took the most time
+        """
+        names = sorted(self.opcode_times, key=lambda name: (-self.opcode_times[name], name))[:count]
+        return [(name, self.opcode_counts[name], self.opcode_times[name]) for name in names]
+
+    def top_pcs(self, count=10):
+        """
+        Returns (method, pc, executions, seconds) for the count instructions that took the most time
+        """
+        keys = sorted(self.pc_times, key=lambda key: (-self.pc_times[key], key))[:count]
+        return [(key[0], key[1], self.pc_counts[key], self.pc_times[key]) for key in keys]
+
+    def top_pairs(self, count=10):
+        """
+        Returns (first opcode, second opcode, times seen) for the count most frequent opcode pairs
+        """
+        pairs = sorted(self.pair_counts.items(), key=lambda item: (-item[1], item[0]))[:count]
+        return [(first, second, seen) for (first, second), seen in pairs]
+
+    def report(self, count=10):
+        """
+        Returns the top count tables of opcodes, instructions and opcode pairs as text
+        """
+        lines = ['Total time: %.6fs' % self.total_time, '',
+                 '%-16s %10s %12s %12s' % ('Opcode', 'Count', 'Seconds', 'Mean ns')]
+        for name, executed, seconds in self.top_opcodes(count):
+            lines.append('%-16s %10d %12.6f %12.0f' % (name, executed, seconds, seconds * 1e9 / executed))
+        lines += ['', '%-32s %6s %10s %12s' % ('Method', 'PC', 'Count', 'Seconds')]
+        for method, pc, executed, seconds in self.top_pcs(count):
+            lines.append('%-32s %6d %10d %12.6f' % (method, pc, executed, seconds))
+        lines += ['', '%-16s %-16s %10s' % ('First', 'Second', 'Count')]
+        for first, second, seen in self.top_pairs(count):
+            lines.append('%-16s %-16s %10d' % (first, second, seen))
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self):
+        """
+        Returns the whole profile as a dictionary that can be written out as JSON. Time histograms
+        map the bit length of the instruction time in nanoseconds to the number of executions.
+        """
+        return {
+            'total_time': self.total_time,
+            'opcodes': {name: {'count': self.opcode_counts[name], 'time': self.opcode_times[name],
+                               'histogram': {str(bucket): seen for bucket, seen in
+                                             sorted(self.opcode_histograms[name].items())}}
+                        for name in sorted(self.opcode_counts)},
+            'pcs': [{'method': method, 'pc': pc, 'count': self.pc_counts[(method, pc)],
+                     'time': self.pc_times[(method, pc)]} for method, pc in sorted(self.pc_counts)],
+            'pairs': [{'first': first, 'second': second, 'count': seen}
+                      for (first, second), seen in sorted(self.pair_counts.items())]
+        }
+
+    def save_json(self, path):
+        """
+        Writes the profile to path as JSON
+        """
+        with open(path, 'w') as json_file:
+            json.dump(self.to_json(), json_file, indent=2)
+
+def opcode_name(ops, value):
+    """
+    Returns the mnemonic of an opcode, taken from the name of its handler in OpCodes
+    """
+    handler = ops._table.get(value)
+    if handler is None or handler.__name__ == '_not_implemented':
+        return hex(value)
+    return handler.__name__.lstrip('_')
+
+def _method_name(java, attribute):
+    for method in java.method_table:
+        if method.code is attribute:
+            return java.get_method_name(method)
+    return 'code%d' % java.attribute_table.index(attribute)
@@ -0,0 +1,123 @@
+"""
+Module that runs many java class files, each with its output captured separately
+"""
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from jvpm.ClassFile import ClassFile
+
+class RunResult():
+    """
+    Object containing the captured output and timing of one class file run
+    """
+    def __init__(self, path, output='', seconds=0.0, error=None):
+        self.path = path
+        self.output = output
+        self.seconds = seconds
+        self.error = error
+
+class _LocalStream():
+    """
+    Stands in for sys.stdout or sys.stdin and forwards to the stream set for the current thread,
+    so that class files run on different threads do not see each other's input and output
+    """
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        stream = getattr(self._local, 'stream', None)
+        return getattr(self._default if stream is None else stream, name)
+
+_install_lock = threading.Lock()
+
+def _local_stream(name):
+    with _install_lock:
+        stream = getattr(sys, name)
+        if not isinstance(stream, _LocalStream):
+            stream = _LocalStream(stream)
+            setattr(sys, name, stream)
+        return stream
+
+@contextlib.contextmanager
+def capture(stdout, stdin=None):
+    """
+    Sends everything printed on the current thread to stdout, and reads input from stdin if given,
+    for the duration of the with block. Other threads keep their own streams.
+    """
+    streams = [(_local_stream('stdout'), stdout)]
+    if stdin is not None:
+        streams.append((_local_stream('stdin'), stdin))
+    previous = [getattr(proxy._local, 'stream', None) for proxy, _ in streams]
+    for proxy, stream in streams:
+        proxy._local.stream = stream
+    try:
+        yield stdout
+    finally:
+        for (proxy, _), stream in zip(streams, previous):
+            proxy._local.stream = stream
+
+def find_class_files(paths):
+    """
+    Expands the given files and directories into a list of class file paths. Directories are
+    searched recursively and their class files are returned in sorted order.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                found.extend(os.path.join(root, name) for name in sorted(files) if name.endswith('.class'))
+        else:
+            found.append(path)
+    return found
+
+def run_class(java, stdout, stdin=None):
+    """
+    Runs an already parsed ClassFile with its output sent to stdout. Returns an error message,
+    or None if the run finished normally.
+    """
+    with capture(stdout, stdin):
+        try:
+            java.run_opcodes()
+        except Exception as exc:
+            return '%s: %s' % (type(exc).__name__, exc)
+    return None
+
+def run_file(path, stdin=None):
+    """
+    Runs one class file and returns a RunResult holding everything it printed
+    """
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        error = run_class(ClassFile(path), output, stdin)
+    except Exception as exc:
+        error = '%s: %s' % (type(exc).__name__, exc)
+    return RunResult(path, output.getvalue(), time.perf_counter() - start, error)
+
+def run_files(paths, jobs=1):
+    """
+    Runs every class file found under paths on a pool of jobs worker processes. The results come
+    back in the same order as the paths, whatever order the jobs finish in.
+    """
+    files = find_class_files(paths)
+    if jobs <= 1 or len(files) <= 1:
+        return [run_file(path) for path in files]
+    # send the files to the workers in batches, so that large runs do not pay a round trip per file
+    chunksize = max(1, len(files) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(run_file, files, chunksize=chunksize))
+
+def format_result(result):
+    """
+    Formats a RunResult as a header line with the path and timing followed by the captured output
+    """
+    text = '==> %s (%.3fs)\n%s' % (result.path, result.seconds, result.output)
+    if result.error is not None:
+        text += 'Error: %s\n' % result.error
+    return text
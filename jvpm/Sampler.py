@@ -0,0 +1,114 @@
+"""
+Module that samples the Java call stack of a running interpreter and writes collapsed stacks for flamegraphs
+"""
+import sys
+import threading
+from collections import Counter
+
+# code objects of the interpreter loops, each mapped to the function that reads the Java frame it is running
+_LOOPS = {}
+
+def interpreter_loop(read_frame):
+    """
+    Decorator that marks a function as an interpreter loop for the Sampler. read_frame is called with
+    the loop's locals and returns (class name, method name, CodeAttribute, pc) for the instruction
+    being run, or None before the loop has started. The method name and CodeAttribute may be None
+    when the loop does not know them. The function itself is returned unchanged.
+    """
+    def mark(function):
+        _LOOPS[function.__code__] = read_frame
+        return function
+    return mark
+
+def class_frame(java, attribute, pc):
+    """
+    Returns the frame tuple for read_frame functions of loops that run the CodeAttribute attribute of
+    the ClassFile java
+    """
+    if java is None or attribute is None:
+        return None
+    for method in java.method_table:
+        if method.code is attribute:
+            return java.get_class_name(), java._get_utf8(method.name_index), attribute, pc
+    return java.get_class_name(), None, attribute, pc
+
+class Sampler():
+    """
+    Periodically records the Java frames being run by one Python thread. Nothing is added to the
+    interpreter's dispatch loop: a background thread reads the loop's locals from the Python frame
+    stack, so the cost is one short stack walk per interval.
+    """
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts sampling on a background thread
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='jvpm-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops sampling and waits for the background thread to finish
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """
+        Records the Java frames the sampled thread is running right now, outermost first
+        """
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            read_frame = _LOOPS.get(frame.f_code)
+            if read_frame is not None:
+                java_frame = _java_frame(read_frame(frame.f_locals))
+                if java_frame is not None:
+                    stack.append(java_frame)
+            frame = frame.f_back
+        if stack:
+            stack.reverse()
+            self.samples[tuple(stack)] += 1
+
+    def collapsed(self):
+        """
+        Returns the samples in the collapsed stack format read by flamegraph tools
+        """
+        return ''.join('%s %d\n' % (';'.join(stack), count) for stack, count in sorted(self.samples.items()))
+
+    def save(self, path):
+        """
+        Writes the collapsed stacks to path
+        """
+        with open(path, 'w') as collapsed_file:
+            collapsed_file.write(self.collapsed())
+
+def _java_frame(frame):
+    if frame is None:
+        return None
+    class_name, method_name, attribute, pc = frame
+    name = class_name.replace('/', '.')
+    if method_name is not None:
+        name += '.' + method_name
+    line = None if attribute is None else attribute.get_line_number(pc)
+    return name if line is None else '%s:%d' % (name, line)
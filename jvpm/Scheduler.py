@@ -0,0 +1,102 @@
+"""
+Module that multiplexes several Java threads inside one interpreter
+"""
+from collections import deque
+from jvpm.Monitors import Monitors
+from jvpm.OpCodes import OpCodes
+
+class DeadlockError(Exception):
+    """
+    Raised when every remaining thread is blocked on a monitor or waiting to be notified
+    """
+
+class JavaThread():
+    """
+    Object containing the execution context of one green thread: its own operand stack and
+    local variable array, the code it runs and where it is in that code
+    """
+    def __init__(self, code, constants=None, monitors=None, name=None):
+        self.ops = OpCodes()
+        self.ops.monitors = Monitors() if monitors is None else monitors
+        self.code = getattr(code, 'code', code)
+        self.constants = constants
+        self.index = 0
+        self.name = name
+
+    def finished(self):
+        """
+        Returns True once the thread has run off the end of its code
+        """
+        return self.index >= len(self.code)
+
+    def runnable(self):
+        """
+        Returns True if the thread can run, reacquiring the monitor it is blocked on if that is now possible
+        """
+        if self.ops.pending_monitor is None:
+            return True
+        if not self.ops.notified:
+            return False
+        obj, count = self.ops.pending_monitor
+        if not self.ops.monitors.acquire(obj, self.ops, count):
+            return False
+        self.ops.pending_monitor = None
+        return True
+
+    def run(self, budget):
+        """
+        Runs at most budget instructions, stopping early when the thread blocks, yields or finishes.
+        Returns the number of instructions run.
+        """
+        ops = self.ops
+        count = 0
+        while count < budget and self.index < len(self.code):
+            self.index = ops.execute(self.code, self.index, self.constants)
+            count += 1
+            if ops.pending_monitor is not None or ops.yielding:
+                break
+        ops.yielding = False
+        return count
+
+class Scheduler():
+    """
+    Round-robin scheduler that switches threads after a fixed instruction budget, or sooner when the
+    running thread blocks on a monitor, waits, or yields. Runs are deterministic for a given budget.
+    """
+    def __init__(self, budget=100):
+        self.budget = budget
+        self.monitors = Monitors()
+        self.threads = []
+        self.switches = 0
+        self.instructions = 0
+
+    def spawn(self, code, constants=None, lva=None, name=None):
+        """
+        Creates a thread that runs code (a CodeAttribute or a list of code bytes) and returns it.
+        The thread starts with a copy of lva as its local variable array.
+        """
+        thread = JavaThread(code, constants, self.monitors, name)
+        thread.ops._lva = list(lva or [])
+        self.threads.append(thread)
+        return thread
+
+    def run(self):
+        """
+        Runs every spawned thread until all of them have finished
+        """
+        ready = deque(thread for thread in self.threads if not thread.finished())
+        blocked = 0
+        while ready:
+            thread = ready.popleft()
+            if not thread.runnable():
+                ready.append(thread)
+                blocked += 1
+                if blocked > len(ready):
+                    raise DeadlockError('All %d remaining threads are blocked' % len(ready))
+                continue
+            blocked = 0
+            self.instructions += thread.run(self.budget)
+            if not thread.finished():
+                ready.append(thread)
+            self.switches += 1
+        return self.threads
@@ -0,0 +1,123 @@
+"""
+Module that keeps parsed class files warm in a long running server on a local UNIX socket
+"""
+import codecs
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from jvpm.ClassFile import ClassFile
+from jvpm import Runner
+
+class _SocketWriter():
+    """
+    Text stream that sends everything written to it straight back to the client
+    """
+    def __init__(self, wfile):
+        self._wfile = wfile
+
+    def write(self, text):
+        self._wfile.write(text.encode('utf-8'))
+        return len(text)
+
+    def flush(self):
+        self._wfile.flush()
+
+class _RunHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one run request: a JSON line holding the class path and the stdin payload
+    """
+    def handle(self):
+        writer = _SocketWriter(self.wfile)
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            java = self.server.load(request['path'])
+        except Exception as exc:
+            writer.write('Error: %s: %s\n' % (type(exc).__name__, exc))
+            return
+        error = Runner.run_class(java, writer, io.StringIO(request.get('stdin', '')))
+        if error is not None:
+            writer.write('Error: %s\n' % error)
+
+class ClassServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Server that runs class files on request, each on its own thread with its own input and output,
+    and caches the parsed ClassFile objects until the file on disk changes
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        if os.path.lexists(socket_path):
+            if not _is_socket(socket_path):
+                raise FileExistsError('%s exists and is not a socket' % socket_path)
+            os.unlink(socket_path)
+        socketserver.UnixStreamServer.__init__(self, socket_path, _RunHandler)
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        """
+        Returns the parsed ClassFile for path, parsing it only if it is not cached or has changed
+        """
+        info = os.stat(path)
+        key = (info.st_mtime_ns, info.st_size)
+        with self._lock:
+            cached = self.cache.get(path)
+            if cached is not None and cached[0] == key:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        java = ClassFile(path)
+        with self._lock:
+            self.cache[path] = (key, java)
+        return java
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if _is_socket(self.server_address):
+            os.unlink(self.server_address)
+
+def _is_socket(path):
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except OSError:
+        return False
+
+def serve(socket_path):
+    """
+    Runs a ClassServer on socket_path until interrupted
+    """
+    server = ClassServer(socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def request(socket_path, path, stdin='', out=None):
+    """
+    Asks the server on socket_path to run the class file at path, copying its output to out as it
+    arrives. Returns everything the class file printed.
+    """
+    out = sys.stdout if out is None else out
+    received = []
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        message = {'path': os.path.abspath(path), 'stdin': stdin}
+        client.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            text = decoder.decode(chunk)
+            received.append(text)
+            out.write(text)
+    return ''.join(received)
@@ -0,0 +1,155 @@
+"""
+Module that places parsed classes in shared memory so that worker processes can run them without parsing
+"""
+import io
+import marshal
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from jvpm.ClassFile import ClassFile, ConstantPool
+from jvpm.Isolate import ClassImage, Isolate
+from jvpm.Runner import RunResult, find_class_files
+
+MAGIC = b'JVSI'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('>4sHI')
+
+def _align(offset, size=8):
+    return (offset + size - 1) // size * size
+
+def layout(classes):
+    """
+    Returns the bytes of a shared image holding the parsed ClassFiles classes. After a header and a
+    small marshalled index come, for each class, its class file bytes, its constant pool tags, its
+    constant pool offsets and the code of each of its methods, each at an 8 byte aligned offset
+    given in the index.
+    """
+    blobs = []
+    index = []
+    position = 0
+
+    def place(blob):
+        nonlocal position
+        position = _align(position)
+        blobs.append((position, blob))
+        position += len(blob)
+        return position - len(blob), len(blob)
+
+    for java in classes:
+        pool = java.c_pool_table
+        methods = [(java.get_method_name(method), place(bytes(method.code.code)))
+                   for method in java.method_table if method.code is not None]
+        index.append((java.get_class_name(), place(java.data), place(bytes(pool.tags)),
+                      place(pool.offsets.tobytes()), methods))
+    index_bytes = marshal.dumps(index)
+    base = _align(_HEADER.size + len(index_bytes))
+    image = bytearray(base + position)
+    _HEADER.pack_into(image, 0, MAGIC, FORMAT_VERSION, len(index_bytes))
+    image[_HEADER.size:_HEADER.size + len(index_bytes)] = index_bytes
+    for offset, blob in blobs:
+        image[base + offset:base + offset + len(blob)] = blob
+    return image
+
+def read_images(buffer):
+    """
+    Returns the ClassImages, in order, of a shared image laid out by layout. Class bytes, constant
+    pool arrays and code are memoryviews into buffer, so nothing but the small index is copied.
+    """
+    view = memoryview(buffer)
+    magic, version, index_length = _HEADER.unpack_from(view)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError('not a shared class image')
+    index = marshal.loads(view[_HEADER.size:_HEADER.size + index_length])
+    base = _align(_HEADER.size + index_length)
+
+    def blob(placed):
+        offset, length = placed
+        return view[base + offset:base + offset + length]
+
+    images = []
+    for name, data, tags, offsets, methods in index:
+        pool = ConstantPool(blob(data))
+        pool.tags = blob(tags)
+        pool.offsets = blob(offsets).cast('I')
+        images.append(ClassImage(name, pool, [(method, blob(code)) for method, code in methods]))
+    return images
+
+class SharedImage():
+    """
+    Shared memory segment holding parsed classes for worker processes. The process that publishes
+    it must call unlink once no worker needs it any more.
+    """
+    def __init__(self, classes):
+        image = layout(classes)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(len(image), 1))
+        self.shm.buf[:len(image)] = image
+        self.name = self.shm.name
+        self.size = len(image)
+
+    def unlink(self):
+        """
+        Closes and removes the segment
+        """
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.unlink()
+
+def attach(name):
+    """
+    Returns (segment, ClassImages) for the shared image published under name. The segment has to
+    stay open while the images are used.
+    """
+    try:
+        # the publishing process owns the segment, so this process must not remove it at exit
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before Python 3.13 workers share the publisher's resource tracker, which already knows the segment
+        shm = shared_memory.SharedMemory(name=name)
+    return shm, read_images(shm.buf)
+
+_worker_images = None
+
+def _attach_worker(name):
+    global _worker_images
+    _worker_images = attach(name)
+
+def _run_image(task):
+    path, position = task
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        Isolate(stdout=output).run(_worker_images[1][position])
+        error = None
+    except Exception as exc:
+        error = '%s: %s' % (type(exc).__name__, exc)
+    return RunResult(path, output.getvalue(), time.perf_counter() - start, error)
+
+def run_files_shared(paths, jobs=1):
+    """
+    Parses every class file found under paths once, publishes them in a SharedImage and runs them
+    on a pool of jobs worker processes that attach to it instead of parsing. The results come back
+    in the same order as the paths.
+    """
+    files = find_class_files(paths)
+    results = [None] * len(files)
+    classes = []
+    tasks = []
+    for position, path in enumerate(files):
+        try:
+            classes.append(ClassFile(path))
+            tasks.append((path, len(classes) - 1, position))
+        except Exception as exc:
+            results[position] = RunResult(path, error='%s: %s' % (type(exc).__name__, exc))
+    with SharedImage(classes) as image:
+        with ProcessPoolExecutor(max_workers=max(jobs, 1), initializer=_attach_worker,
+                                 initargs=(image.name,)) as executor:
+            for (_, _, position), result in zip(tasks, executor.map(
+                    _run_image, [(path, index) for path, index, _ in tasks])):
+                results[position] = result
+    return results
@@ -0,0 +1,40 @@
+"""
+Module that keeps one shared copy of every constant pool string and resolved member reference
+"""
+import threading
+
+class SymbolTable():
+    """
+    Interns symbols so that equal strings from any loaded class are the same object, and every class
+    that names java/lang/Object shares a single str for it. Symbols are never removed, so the table
+    grows with every distinct name, descriptor and string constant the process loads, including the
+    new ones in classes that are reloaded. Each is kept once however many classes use it.
+    """
+    def __init__(self):
+        self._symbols = {}
+        self._lock = threading.Lock()
+
+    def intern(self, text):
+        """
+        Returns the shared copy of text, adding text as that copy if it is new
+        """
+        symbol = self._symbols.get(text)
+        if symbol is None:
+            with self._lock:
+                symbol = self._symbols.setdefault(text, text)
+        return symbol
+
+    def __contains__(self, text):
+        return text in self._symbols
+
+    def __len__(self):
+        return len(self._symbols)
+
+# the table shared by every class loaded in this process
+SYMBOLS = SymbolTable()
+
+def intern(text):
+    """
+    Returns the shared copy of text from the process wide symbol table
+    """
+    return SYMBOLS.intern(text)
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from jvpm.Analysis import Statistics, analyze, analyze_sources, find_sources, opcode_name
+
+DIRECTORY = os.path.dirname(os.path.dirname(__file__))
+ADD = os.path.join(DIRECTORY, 'Add.class')
+
+class TestAnalysis(unittest.TestCase):
+    def test_add_class(self):
+        stats = analyze_sources([(None, ADD)])
+        self.assertEqual(stats.classes, 1)
+        self.assertEqual(stats.methods, 1)
+        self.assertEqual(stats.opcodes[0x60], 1)
+        self.assertEqual(stats.opcodes[0x05], 5)
+        self.assertEqual(sum(stats.opcodes.values()), stats.instructions)
+        self.assertEqual(stats.constant_tags, {1: 7, 7: 2})
+
+    def test_merge(self):
+        first = analyze_sources([(None, ADD)])
+        second = analyze_sources([(None, ADD)])
+        first.merge(second)
+        self.assertEqual(first.classes, 2)
+        self.assertEqual(first.opcodes[0x05], 10)
+        self.assertEqual(sum(first.size_histogram().values()), 2)
+
+    def test_errors_are_counted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'Bad.class')
+            with open(path, 'wb') as class_file:
+                class_file.write(b'not a class')
+            stats = analyze_sources([(None, path)])
+        self.assertEqual(stats.classes, 0)
+        self.assertEqual(sum(stats.errors.values()), 1)
+
+    def test_jar_and_parallel_match_serial(self):
+        with tempfile.TemporaryDirectory() as directory:
+            jar = os.path.join(directory, 'lib.jar')
+            with zipfile.ZipFile(jar, 'w') as archive:
+                archive.write(ADD, 'pkg/Add.class')
+            paths = [DIRECTORY, jar]
+            self.assertEqual(list(find_sources([jar])), [(jar, 'pkg/Add.class')])
+            serial = analyze(paths)
+            parallel = analyze(paths, jobs=2, chunk_size=1)
+        self.assertEqual(serial.to_json(), parallel.to_json())
+        self.assertEqual(serial.classes, 5)
+        self.assertIn('iconst_2', serial.report())
+
+    def test_parallel_keeps_a_bounded_window(self):
+        submitted = []
+        lock = threading.Lock()
+
+        class CountingExecutor(ThreadPoolExecutor):
+            in_flight = 0
+            most = 0
+
+            def submit(self, function, *args):
+                with lock:
+                    CountingExecutor.in_flight += 1
+                    CountingExecutor.most = max(CountingExecutor.most, CountingExecutor.in_flight)
+                submitted.append(args[0])
+                future = ThreadPoolExecutor.submit(self, function, *args)
+                future.add_done_callback(lambda _: self._finished())
+                return future
+
+            def _finished(self):
+                with lock:
+                    CountingExecutor.in_flight -= 1
+
+        with patch('jvpm.Analysis.ProcessPoolExecutor', CountingExecutor), \
+                patch('jvpm.Analysis.find_sources', return_value=iter([(None, ADD)] * 40)):
+            stats = analyze([DIRECTORY], jobs=2, chunk_size=1)
+        self.assertEqual(stats.classes, 40)
+        self.assertEqual(len(submitted), 40)
+        self.assertLessEqual(CountingExecutor.most, 4)
+
+    def test_opcode_name(self):
+        self.assertEqual(opcode_name(0x60), 'iadd')
+        self.assertEqual(opcode_name(0xfe), '0xfe')
+        self.assertEqual(Statistics().to_json()['opcodes'], {})
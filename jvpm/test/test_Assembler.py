@@ -0,0 +1,90 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from jvpm.Assembler import ClassAssembler, argument_slots, MNEMONICS
+from jvpm.ClassFile import ClassFile
+from jvpm.OpCodes import OpCodes
+
+def load(assembler):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, assembler.name + '.class')
+        assembler.write(path)
+        return ClassFile(path)
+
+class TestAssembler(unittest.TestCase):
+
+    def test_hello_world(self):
+        asm = ClassAssembler('Hello', source_file='Hello.java')
+        asm.method('main', '([Ljava/lang/String;)V', [
+            ('getstatic', 'java/lang/System', 'out', 'Ljava/io/PrintStream;'),
+            ('ldc', 'Hello World'),
+            ('invokevirtual', 'java/io/PrintStream', 'println', '(Ljava/lang/String;)V'),
+            ('getstatic', 'java/lang/System', 'out', 'Ljava/io/PrintStream;'),
+            ('ldc', 40000),
+            'iconst_2',
+            'isub',
+            ('invokevirtual', 'java/io/PrintStream', 'println', '(I)V'),
+            'return'], line_numbers=[(0, 3), (8, 4)])
+        java = load(asm)
+        self.assertEqual(java.get_class_name(), 'Hello')
+        self.assertEqual(java.method_table[0].code.max_locals, 1)
+        self.assertEqual(java.attribute_table[0].get_line_number(10), 4)
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            java.run_opcodes()
+        self.assertEqual(out.getvalue(), 'Hello World\n39998\n')
+
+    def test_labels(self):
+        asm = ClassAssembler('Sum')
+        asm.method('sum', '(I)I', [
+            'iconst_0', 'istore_1',
+            ('label', 'loop'), 'iload_0', ('ifle', 'done'),
+            'iload_1', 'iload_0', 'iadd', 'istore_1', ('iinc', 0, -1), ('goto', 'loop'),
+            ('label', 'done'), 'iload_1', 'ireturn'])
+        code = load(asm).attribute_table[0]
+        self.assertEqual(code.code[3:6], bytes([0x9e, 0x00, 0x0d]))
+        self.assertEqual(code.max_locals, 2)
+        self.assertEqual(OpCodes.run_batch(code, np.array([3, 10])).tolist(), [6, 55])
+
+    def test_large_constant_pool(self):
+        asm = ClassAssembler('Big')
+        for i in range(65000):
+            asm.pool.utf8('c%d' % i)
+        asm.method('main', '([Ljava/lang/String;)V', [('ldc', 'last'), 'return'])
+        java = load(asm)
+        self.assertEqual(len(java.c_pool_table), asm.pool.count - 1)
+        self.assertEqual(java.attribute_table[0].code[0], MNEMONICS['ldc_w'])
+        self.assertEqual(java.run_opcodes()._op_stack, ['last'])
+        with self.assertRaises(ValueError):
+            for i in range(1000):
+                asm.pool.utf8('more%d' % i)
+
+    def test_large_method(self):
+        asm = ClassAssembler('Long')
+        asm.method('main', '([Ljava/lang/String;)V', ['iconst_1', 'istore_0'] * 32767 + ['return'])
+        self.assertEqual(load(asm).attribute_table[0].code_length, 65535)
+        with self.assertRaises(ValueError):
+            asm.method('too_long', '()V', ['nop'] * 65536)
+
+    def test_wide_jumps(self):
+        asm = ClassAssembler('Jumps')
+        code, _ = asm.assemble_code([('label', 'top'), 'nop', ('goto_w', 'top'), (0xc9, 'top')])
+        self.assertEqual(code, bytes([0x00, 0xc8, 0xff, 0xff, 0xff, 0xff, 0xc9, 0xff, 0xff, 0xff, 0xfa]))
+        with self.assertRaises(ValueError):
+            asm.assemble_code([(0xba,)])
+
+    def test_wide_constants(self):
+        asm = ClassAssembler('Wide')
+        asm.field('count', 'J')
+        asm.method('main', '()V', [('ldc2_w', 5), ('ldc2_w', 1.5), ('ldc', 2.5), 'return'])
+        java = load(asm)
+        self.assertEqual(len(java.field_table), 1)
+        tags = [constant.tag for constant in java.c_pool_table]
+        self.assertEqual(tags.count(0), 2)
+        self.assertEqual(java.run_opcodes()._op_stack, [2.5])
+
+    def test_argument_slots(self):
+        self.assertEqual(argument_slots('()V'), 0)
+        self.assertEqual(argument_slots('(IJ[Ljava/lang/String;D[[I)V'), 7)
@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+from jvpm.OpCodes import OpCodes
+from jvpm.BatchOpCodes import BatchOpCodes
+from jvpm.ClassFile import CodeAttribute
+
+class TestBatchOpCodes(unittest.TestCase):
+
+    def test_iadd(self):
+        inputs = np.array([[1, 2], [3, 4], [0x7fffffff, 1]])
+        result = OpCodes.run_batch([0x1a, 0x1b, 0x60, 0xac], inputs)
+        self.assertEqual(result.dtype, np.int32)
+        self.assertEqual(result.tolist(), [3, 7, -0x80000000])
+
+    def test_code_attribute(self):
+        method = CodeAttribute()
+        method.code = [0x1a, 0x05, 0x78, 0xac]
+        result = OpCodes.run_batch(method, np.array([1, -3]))
+        self.assertEqual(result.tolist(), [4, -12])
+
+    def test_idiv_truncates(self):
+        inputs = np.array([[7, 2], [-7, 2], [7, -2]])
+        self.assertEqual(OpCodes.run_batch([0x1a, 0x1b, 0x6c, 0xac], inputs).tolist(), [3, -3, -3])
+        self.assertEqual(OpCodes.run_batch([0x1a, 0x1b, 0x70, 0xac], inputs).tolist(), [1, -1, 1])
+        with self.assertRaises(ZeroDivisionError):
+            OpCodes.run_batch([0x1a, 0x1b, 0x6c, 0xac], np.array([[1, 0]]))
+
+    def test_iushr(self):
+        result = OpCodes.run_batch([0x1a, 0x04, 0x7c, 0xac], np.array([-2, 4]))
+        self.assertEqual(result.tolist(), [0x7fffffff, 2])
+
+    def test_fmul(self):
+        result = OpCodes.run_batch([0x22, 0x23, 0x6a, 0xae], np.array([[1.5, 2.0], [3.0, -0.5]]))
+        self.assertEqual(result.dtype, np.float32)
+        self.assertEqual(result.tolist(), [3.0, -1.5])
+
+    def test_branch_mask(self):
+        # max(a, b): if (a < b) return b; return a;
+        code = [0x1a, 0x1b, 0xa2, 0x00, 0x05, 0x1b, 0xac, 0x1a, 0xac]
+        result = OpCodes.run_batch(code, np.array([[1, 2], [5, 3], [4, 4]]))
+        self.assertEqual(result.tolist(), [2, 5, 4])
+
+    def test_loop(self):
+        # sum of 1..n: s = 0; while (n > 0) { s += n; n--; } return s;
+        code = [0x03, 0x3c, 0x1a, 0x9e, 0x00, 0x0d, 0x1b, 0x1a, 0x60, 0x3c, 0x84, 0x00, 0xff,
+                0xa7, 0xff, 0xf5, 0x1b, 0xac]
+        result = OpCodes.run_batch(code, np.array([0, 1, 4, 10]))
+        self.assertEqual(result.tolist(), [0, 1, 10, 55])
+
+    def test_merged_stack(self):
+        # a > 0 ? 1 : -1
+        code = [0x1a, 0x9e, 0x00, 0x07, 0x04, 0xa7, 0x00, 0x04, 0x02, 0xac]
+        result = OpCodes.run_batch(code, np.array([3, -3, 0]))
+        self.assertEqual(result.tolist(), [1, -1, -1])
+
+    def test_void(self):
+        self.assertIsNone(BatchOpCodes(np.array([1, 2])).run([0x1a, 0x3c, 0xb1]))
+
+    def test_not_supported(self):
+        with self.assertRaises(NotImplementedError):
+            OpCodes.run_batch([0xb6, 0x00, 0x01], np.array([1]))
@@ -0,0 +1,52 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from benchmarks import harness, memory
+from benchmarks.__main__ import main
+
+def results(**seconds):
+    return {'results': {name: {'seconds': value, 'loops': 1} for name, value in seconds.items()}}
+
+class TestHarness(unittest.TestCase):
+    def test_compare(self):
+        rows = harness.compare(results(slow=1.0, fast=1.0, same=1.0, gone=1.0),
+                               results(slow=1.2, fast=0.5, same=1.05, new=1.0))
+        self.assertEqual([(name, status) for name, _, _, _, status in rows],
+                         [('fast', 'improvement'), ('same', 'ok'), ('slow', 'regression')])
+        self.assertAlmostEqual(rows[2][3], 1.2)
+
+    def test_compare_threshold(self):
+        rows = harness.compare(results(slow=1.0), results(slow=1.2), threshold=0.25)
+        self.assertEqual(rows[0][4], 'ok')
+
+    def test_compare_zero_baseline(self):
+        self.assertEqual(harness.compare(results(a=0.0), results(a=1.0))[0][3:], (float('inf'), 'regression'))
+
+    def test_compare_command_exit_status(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            current = os.path.join(directory, 'current.json')
+            harness.save(results(a=1.0, b=1.0), baseline)
+            harness.save(results(a=1.0, b=1.5), current)
+            with patch('sys.stdout', new_callable=io.StringIO) as out:
+                self.assertEqual(main(['compare', baseline, current]), 1)
+                self.assertEqual(main(['compare', baseline, baseline]), 0)
+        self.assertIn('1 regressions in 2 benchmarks', out.getvalue())
+        self.assertIn('0 regressions in 2 benchmarks', out.getvalue())
+
+    def test_run_filter(self):
+        calls = []
+        with patch.dict(harness.BENCHMARKS, clear=True):
+            harness.benchmark('unit.counted')(lambda: lambda: calls.append(1))
+            harness.benchmark('other.skipped')(lambda: self.fail('filtered out'))
+            run = harness.run(['unit.*'], repeat=2, min_time=0.0)
+        self.assertEqual(list(run['results']), ['unit.counted'])
+        self.assertEqual(run['results']['unit.counted']['loops'], 1)
+        self.assertEqual(len(calls), 2)
+
+    def test_footprint(self):
+        name, data = memory.corpus()[0]
+        self.assertEqual(name, 'Add')
+        self.assertGreater(memory.footprint(data, copies=2), 0)
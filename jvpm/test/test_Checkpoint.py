@@ -0,0 +1,112 @@
+import io
+import marshal
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from jvpm.Assembler import ClassAssembler
+from jvpm.Checkpoint import Execution, SnapshotError, checkpoint, load, restore, save
+from jvpm.ClassFile import ClassFile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def counting_class(steps=200):
+    asm = ClassAssembler('Counting')
+    asm.method('main', '([Ljava/lang/String;)V',
+               ['iconst_0', 'istore_0', 'fconst_2'] + ['iload_0', 'iconst_3', 'iadd', 'istore_0'] * steps +
+               [('getstatic', 'java/lang/System', 'out', 'Ljava/io/PrintStream;'), 'iload_0',
+                ('invokevirtual', 'java/io/PrintStream', 'println', '(I)V'), 'return'])
+    return asm.assemble()
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.data = counting_class()
+        self.java = ClassFile.from_bytes(self.data)
+
+    def run_to_end(self, execution):
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            execution.run()
+        return out.getvalue()
+
+    def test_resume_matches_uninterrupted_run(self):
+        expected = self.run_to_end(Execution(ClassFile.from_bytes(self.data)))
+        execution = Execution(self.java)
+        self.assertEqual(execution.step(450), 450)
+        snapshot = checkpoint(execution)
+        resumed = restore(snapshot)
+        self.assertEqual((resumed.method, resumed.index, resumed.instructions),
+                         (execution.method, execution.index, 450))
+        self.assertEqual(resumed.ops._lva, execution.ops._lva)
+        self.assertIsInstance(resumed.ops._op_stack[0], np.float32)
+        self.assertEqual(self.run_to_end(resumed), expected)
+        self.assertEqual(expected, '600\n')
+        self.assertTrue(resumed.finished())
+
+    def test_restore_with_class_file(self):
+        execution = Execution(self.java)
+        execution.step(10)
+        snapshot = checkpoint(execution, include_class=False)
+        self.assertLess(len(snapshot), len(checkpoint(execution)))
+        with self.assertRaises(SnapshotError):
+            restore(snapshot)
+        with self.assertRaises(SnapshotError):
+            restore(snapshot, ClassFile.from_bytes(counting_class(10)))
+        self.assertEqual(self.run_to_end(restore(snapshot, ClassFile.from_bytes(self.data))), '600\n')
+
+    def test_rejects_bad_snapshots(self):
+        snapshot = checkpoint(Execution(self.java))
+        header, python = snapshot[:8], snapshot[6:8]
+        for bad in (b'', b'XXXX' + snapshot[4:], snapshot[:4] + b'\x00\x09' + snapshot[6:], snapshot[:20],
+                    snapshot[:6] + b'\x02\x07' + snapshot[8:], header + marshal.dumps([1, 2]),
+                    header + marshal.dumps({'position': (0, 0, 0)}),
+                    header + marshal.dumps(dict(marshal.loads(snapshot[8:]), position=None)),
+                    header + marshal.dumps(dict(marshal.loads(snapshot[8:]), op_stack=('list', 5)))):
+            with self.assertRaises(SnapshotError):
+                restore(bad)
+        self.assertEqual(tuple(python), sys.version_info[:2])
+
+    def test_wait_and_yield_state_is_kept(self):
+        execution = Execution(self.java)
+        execution.ops.notified = False
+        execution.ops.yielding = True
+        resumed = restore(checkpoint(execution))
+        self.assertFalse(resumed.ops.notified)
+        self.assertTrue(resumed.ops.yielding)
+        resumed = restore(checkpoint(Execution(self.java)))
+        self.assertTrue(resumed.ops.notified)
+        self.assertFalse(resumed.ops.yielding)
+
+    def test_monitors_are_kept(self):
+        execution = Execution(self.java)
+        execution.isolate.monitors.acquire('lock', execution.ops, 2)
+        resumed = restore(checkpoint(execution))
+        self.assertIs(resumed.isolate.monitors.owner('lock'), resumed.ops)
+
+    def test_monitor_owned_by_another_run(self):
+        execution = Execution(self.java)
+        execution.isolate.monitors.acquire('free', execution.ops)
+        execution.isolate.monitors.acquire('lock', execution.ops)
+        snapshot = checkpoint(execution)
+        with self.assertRaises(SnapshotError):
+            restore(snapshot, isolate=execution.isolate)
+        self.assertIs(execution.isolate.monitors.owner('free'), execution.ops)
+        self.assertIs(execution.isolate.monitors.owner('lock'), execution.ops)
+        execution.isolate.monitors.release('free', execution.ops)
+        with self.assertRaises(SnapshotError):
+            restore(snapshot, isolate=execution.isolate)
+        self.assertIsNone(execution.isolate.monitors.owner('free'))
+
+    def test_restore_in_a_fresh_process(self):
+        execution = Execution(self.java)
+        execution.step(100)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'counting.snapshot')
+            save(execution, path)
+            output = subprocess.run(
+                [sys.executable, '-c', 'import sys; from jvpm.Checkpoint import load; load(sys.argv[1]).run()', path],
+                cwd=ROOT, stdout=subprocess.PIPE, check=True).stdout
+            self.assertEqual(load(path).instructions, 100)
+        self.assertEqual(output, b'600\n')
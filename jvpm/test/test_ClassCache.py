@@ -0,0 +1,79 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from jvpm.ClassCache import ClassCache
+from jvpm.ClassFile import ClassFile
+from jvpm.ClassWriter import write_class
+
+DIRECTORY = os.path.dirname(os.path.dirname(__file__))
+ADD = os.path.join(DIRECTORY, 'Add.class')
+
+class TestClassCache(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.cache = ClassCache(self.temp.name)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_hit_skips_parsing(self):
+        self.cache.load(ADD)
+        with patch.object(ClassFile, '_parse_class_file') as parse:
+            java = self.cache.load(ADD)
+        parse.assert_not_called()
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(java.get_class_name(), 'Add')
+
+    def test_same_as_parsed(self):
+        for name in ('Add', 'AddTwo', 'Foo', 'test'):
+            path = os.path.join(DIRECTORY, name + '.class')
+            self.cache.load(path)
+            cached = self.cache.load(path)
+            parsed = ClassFile(path)
+            self.assertEqual(write_class(cached), write_class(parsed))
+            self.assertEqual([code.code for code in cached.attribute_table],
+                             [code.code for code in parsed.attribute_table])
+            self.assertEqual([list(code.get_instructions()) for code in cached.attribute_table],
+                             [list(code.get_instructions()) for code in parsed.attribute_table])
+
+    def test_runs_from_cache(self):
+        self.cache.load(ADD)
+        with patch('sys.stdout', new_callable=io.StringIO):
+            self.assertEqual(self.cache.load(ADD).run_opcodes()._op_stack, ClassFile(ADD).run_opcodes()._op_stack)
+
+    def test_corrupt_entry_is_rebuilt(self):
+        with open(ADD, 'rb') as class_file:
+            data = class_file.read()
+        self.cache.load_bytes(data)
+        entry = self.cache.entry_path(self.cache.key(data))
+        with open(entry, 'r+b') as entry_file:
+            entry_file.seek(-1, os.SEEK_END)
+            entry_file.write(b'\xff')
+        self.assertEqual(self.cache.load_bytes(data).get_class_name(), 'Add')
+        self.assertEqual(self.cache.rebuilds, 1)
+        self.cache.load_bytes(data)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_stale_version_is_a_miss(self):
+        with open(ADD, 'rb') as class_file:
+            data = class_file.read()
+        key = self.cache.key(data)
+        with patch('jvpm.ClassCache.__version__', '0.0.0'):
+            self.assertNotEqual(self.cache.key(data), key)
+
+    def test_unwritable_directory_is_not_cached(self):
+        blocked = os.path.join(self.temp.name, 'blocked')
+        with open(blocked, 'w'):
+            pass
+        cache = ClassCache(blocked)
+        self.assertEqual(cache.load(ADD).get_class_name(), 'Add')
+        self.assertEqual(cache.load(ADD).get_class_name(), 'Add')
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_clear(self):
+        self.cache.load(ADD)
+        self.cache.clear()
+        self.cache.load(ADD)
+        self.assertEqual(self.cache.misses, 2)
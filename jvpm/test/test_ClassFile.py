@@ -1,9 +1,18 @@
+import asyncio
+import io
+import os
+import struct
+import threading
+import time
 import unittest
 from unittest.mock import mock_open, patch
 from jvpm.ClassFile import ClassFile
 from jvpm.ClassFile import MethodInfo
 from jvpm.ClassFile import CodeAttribute
 from jvpm.ClassFile import ConstantInfo
+from jvpm.ClassFile import ClassParser
+from jvpm.Assembler import ClassAssembler
+from jvpm.OpCodes import PRINTLN_INT
 from unittest.mock import patch, call
 
 class TestClassFile(unittest.TestCase):
@@ -85,3 +94,178 @@ class TestClassFile(unittest.TestCase):
 
         self.assertEqual(self.cf.attribute_table.__len__(), 1)
         self.assertEqual(type(self.cf.attribute_table[0]), type(CodeAttribute()))
+
+class TestRunAsync(unittest.TestCase):
+    def setUp(self):
+        self.cf = ClassFile(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'AddTwo.class'))
+
+    def test_run_async(self):
+        lines = ['x\n', '3\n', '4\n']
+        async def read_line():
+            return lines.pop(0)
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            asyncio.run(self.cf.run_async(read_line=read_line))
+        self.assertEqual(out.getvalue(), 'Enter a number: Invalid input\nEnter a number: Enter a number: 7\nHello World\n')
+
+    def test_run_async_eof(self):
+        async def read_line():
+            return ''
+        with patch('sys.stdout', new_callable=io.StringIO):
+            with self.assertRaises(EOFError):
+                asyncio.run(self.cf.run_async(read_line=read_line))
+
+    def test_run_async_yields(self):
+        java = ClassFile(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Foo.class'))
+        finished = []
+        seen = []
+        async def run():
+            await java.run_async(yield_every=1)
+            finished.append(True)
+        async def ticker():
+            for _ in range(3):
+                seen.append(bool(finished))
+                await asyncio.sleep(0)
+        async def both():
+            await asyncio.gather(run(), ticker())
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            asyncio.run(both())
+        self.assertEqual(seen, [False, False, False])
+        self.assertEqual(out.getvalue(), '5\n')
+
+class TestClassFileParsing(unittest.TestCase):
+    def setUp(self):
+        self.cf = ClassFile(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'test.class'))
+
+    def test_class_name(self):
+        self.assertEqual(self.cf.get_class_name(), 'test')
+
+    def test_methods_have_code(self):
+        names = [self.cf.get_method_name(method) for method in self.cf.method_table]
+        self.assertEqual(names, ['<init>()V', 'main([Ljava/lang/String;)V'])
+        self.assertEqual([method.code for method in self.cf.method_table], self.cf.attribute_table)
+        self.assertEqual(self.cf.attribute_table[1].code, bytes([0x04, 0x3c, 0x84, 0x01, 0x01, 0xb1]))
+
+    def test_line_number_table(self):
+        self.assertEqual(self.cf.attribute_table[0].line_number_table, [(0, 1)])
+        self.assertEqual(self.cf.attribute_table[0].get_line_number(4), 1)
+        self.assertIsNone(CodeAttribute().get_line_number(0))
+
+    def test_threads_decode_code_once(self):
+        decode = ClassFile._create_method_code
+        calls = []
+        def slow_decode(java, method):
+            calls.append(method)
+            time.sleep(0.01)
+            return decode(java, method)
+        tables = []
+        with patch.object(ClassFile, '_create_method_code', slow_decode):
+            threads = [threading.Thread(target=lambda: tables.append(len(self.cf.attribute_table)))
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(tables, [2] * 8)
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(all(method.code is not None for method in self.cf.method_table))
+
+    def test_class_attributes(self):
+        self.assertEqual(len(self.cf.attributes), 1)
+        self.assertEqual(self.cf._get_utf8(self.cf.attributes[0].attribute_name_index), 'SourceFile')
+
+    def test_wide_values(self):
+        self.cf.data = b'\x00' * 8 + b'\x01\x02'
+        self.assertEqual(self.cf._get_constant_pool_count(), 258)
+
+class TestClassParser(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'test.class'), 'rb') as class_file:
+            self.data = class_file.read()
+
+    def test_from_bytes(self):
+        cf = ClassFile.from_bytes(self.data)
+        self.assertEqual(cf.get_class_name(), 'test')
+        self.assertEqual(cf.attribute_table[1].code, bytes([0x04, 0x3c, 0x84, 0x01, 0x01, 0xb1]))
+
+    def test_from_stream_reads_classes_back_to_back(self):
+        stream = io.BytesIO(self.data + self.data + b'rest')
+        first = ClassFile.from_stream(stream)
+        second = ClassFile.from_stream(stream)
+        self.assertEqual(first.data, self.data)
+        self.assertEqual(second.get_class_name(), 'test')
+        self.assertEqual(stream.read(), b'rest')
+
+    def test_from_stream_truncated(self):
+        with self.assertRaises(EOFError):
+            ClassFile.from_stream(io.BytesIO(self.data[:-3]))
+
+    def test_decodes_constant_pool_before_the_end(self):
+        parser = ClassParser()
+        parser.feed(self.data[:10])
+        self.assertEqual(len(parser.c_pool_table), 0)
+        parser.feed(self.data[10:200])
+        decoded = len(parser.c_pool_table)
+        self.assertGreater(decoded, 0)
+        self.assertFalse(parser.done)
+        with self.assertRaises(EOFError):
+            parser.result()
+        for index in range(200, len(self.data)):
+            self.assertEqual(parser.feed(self.data[index:index + 1]), b'')
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.needed(), 0)
+        self.assertEqual(parser.feed(b'extra'), b'extra')
+        cf = parser.result()
+        self.assertEqual(cf.cpoolsize, ClassFile.from_bytes(self.data).cpoolsize)
+        self.assertEqual(cf.get_method_name(cf.method_table[1]), 'main([Ljava/lang/String;)V')
+
+    def test_extra_bytes_in_last_chunk(self):
+        parser = ClassParser()
+        self.assertEqual(parser.feed(self.data + b'next'), b'next')
+        self.assertEqual(parser.result().data, self.data)
+
+    def test_not_a_class_file(self):
+        with self.assertRaises(Exception):
+            ClassParser().feed(b'\x00' * 10)
+
+class TestConstantPool(unittest.TestCase):
+    def setUp(self):
+        asm = ClassAssembler('Pool')
+        self.long = asm.pool.long(1 << 40)
+        self.double = asm.pool.double(2.5)
+        self.text = asm.pool.utf8('after')
+        self.method = asm.pool.method_ref('java/io/PrintStream', 'println', '(I)V')
+        asm.method('main', '([Ljava/lang/String;)V', ['return'])
+        self.pool = ClassFile.from_bytes(asm.assemble()).c_pool_table
+
+    def test_entries_are_made_lazily(self):
+        self.assertEqual(self.pool._entries, {})
+        entry = self.pool[self.text - 1]
+        self.assertEqual((entry.tag, entry.info), (1, b'after'))
+        self.assertEqual(list(self.pool._entries), [self.text - 1])
+        self.assertIs(self.pool[self.text - 1], entry)
+
+    def test_long_and_double_take_two_slots(self):
+        self.assertEqual(list(self.pool.tags[self.long - 1:self.long + 1]), [5, 0])
+        self.assertEqual(self.pool[self.long - 1].info, (1 << 40).to_bytes(8, 'big'))
+        self.assertEqual(self.pool[self.double - 1].info, struct.pack('>d', 2.5))
+        self.assertEqual(self.pool[self.double].tag, 0)
+        self.assertEqual(self.pool.utf8(self.text - 1), 'after')
+
+    def test_resolve(self):
+        symbol = self.pool.resolve(self.method - 1)
+        self.assertEqual(symbol, 'java/io/PrintStream.println:(I)V')
+        self.assertIs(self.pool.resolve(self.method - 1), symbol)
+        self.assertIs(symbol, PRINTLN_INT)
+
+    def test_invalidate(self):
+        entry = self.pool[self.text - 1]
+        self.pool.resolve(self.method - 1)
+        self.pool.invalidate()
+        self.assertEqual((self.pool._entries, self.pool._strings), ({}, {}))
+        self.assertIsNot(self.pool[self.text - 1], entry)
+        self.assertEqual(self.pool.resolve(self.method - 1), 'java/io/PrintStream.println:(I)V')
+
+    def test_index_out_of_range(self):
+        with self.assertRaises(IndexError):
+            self.pool[len(self.pool)]
+        self.assertEqual(self.pool[-1].tag, self.pool.tags[len(self.pool) - 1])
@@ -0,0 +1,161 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from jvpm.Assembler import ClassAssembler
+from jvpm.ClassFile import ClassFile
+from jvpm.ClassLoader import ClassLoader, class_file_name, estimate_size
+from jvpm.ClassPath import ClassNotFoundError
+
+DIRECTORY = os.path.dirname(os.path.dirname(__file__))
+
+class TestClassLoader(unittest.TestCase):
+    def setUp(self):
+        self.loader = ClassLoader([DIRECTORY])
+
+    def test_class_file_name(self):
+        self.assertEqual(class_file_name('java.lang.Object'), 'java/lang/Object.class')
+        self.assertEqual(class_file_name('java/lang/Object'), 'java/lang/Object.class')
+        self.assertEqual(class_file_name('Add.class'), 'Add.class')
+
+    def test_load_and_hit(self):
+        java = self.loader.load_class('Add')
+        self.assertEqual(java.get_class_name(), 'Add')
+        self.assertIs(self.loader.load_class('Add'), java)
+        self.assertIn('Add', self.loader)
+        self.assertEqual(self.loader.stats(), {'hits': 1, 'misses': 1, 'evictions': 0, 'entries': 1,
+                                               'bytes': estimate_size(java)})
+
+    def test_not_found(self):
+        with self.assertRaises(ClassNotFoundError):
+            self.loader.load_class('java.lang.Missing')
+        self.assertEqual(len(self.loader), 0)
+
+    def test_evicts_least_recently_used(self):
+        loader = ClassLoader([DIRECTORY], max_entries=2)
+        loader.load_class('Add')
+        loader.load_class('Foo')
+        loader.load_class('Add')
+        loader.load_class('AddTwo')
+        self.assertNotIn('Foo', loader)
+        self.assertIn('Add', loader)
+        self.assertEqual(loader.evictions, 1)
+
+    def test_evicts_by_size(self):
+        add = estimate_size(ClassFile(os.path.join(DIRECTORY, 'Add.class')))
+        loader = ClassLoader([DIRECTORY], max_bytes=add)
+        loader.load_class('Add')
+        loader.load_class('Foo')
+        self.assertEqual(len(loader), 1)
+        self.assertIn('Foo', loader)
+
+    def test_unload(self):
+        self.loader.load_class('Add')
+        self.assertTrue(self.loader.unload('Add'))
+        self.assertFalse(self.loader.unload('Add'))
+        self.assertEqual(self.loader.size, 0)
+
+    def test_concurrent_loads_parse_once(self):
+        started = threading.Event()
+        release = threading.Event()
+        original = ClassLoader._define
+
+        def slow_define(loader, key):
+            started.set()
+            release.wait()
+            return original(loader, key)
+
+        results = []
+        with patch.object(ClassLoader, '_define', autospec=True, side_effect=slow_define) as define:
+            threads = [threading.Thread(target=lambda: results.append(self.loader.load_class('Add')))
+                       for _ in range(4)]
+            threads[0].start()
+            started.wait()
+            for thread in threads[1:]:
+                thread.start()
+            release.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(define.call_count, 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(java is results[0] for java in results))
+        self.assertEqual(self.loader.misses, 1)
+
+class TestReload(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.loader = ClassLoader([self.temp.name])
+        self.write('Caller', caller_class())
+        self.write('Callee', callee_class(1))
+        self.write('Other', other_class())
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def write(self, name, data, mtime_ns=None):
+        path = os.path.join(self.temp.name, name + '.class')
+        with open(path, 'wb') as class_file:
+            class_file.write(data)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def test_unchanged_classes_stay_warm(self):
+        caller = self.loader.load_class('Caller')
+        self.assertEqual(self.loader.reload(), [])
+        self.assertIs(self.loader.load_class('Caller'), caller)
+
+    def test_touched_class_is_not_parsed_again(self):
+        callee = self.loader.load_class('Callee')
+        self.write('Callee', callee_class(1), mtime_ns=10 ** 18)
+        with patch.object(ClassFile, 'from_bytes') as from_bytes:
+            self.assertEqual(self.loader.reload(), [])
+        from_bytes.assert_not_called()
+        self.assertIs(self.loader.load_class('Callee'), callee)
+
+    def test_changed_class_is_reloaded(self):
+        caller = self.loader.load_class('Caller')
+        callee = self.loader.load_class('Callee')
+        other = self.loader.load_class('Other')
+        image = self.loader.load_image('Callee')
+        other_image = self.loader.load_image('Other')
+        seen = []
+        self.loader.on_reload(lambda changed, dependents: seen.append((changed, dependents)))
+        self.write('Callee', callee_class(2), mtime_ns=10 ** 18)
+        self.assertEqual(self.loader.reload(), ['Callee'])
+        self.assertEqual(seen, [(['Callee'], ['Caller'])])
+        self.assertIsNot(self.loader.load_class('Callee'), callee)
+        self.assertIs(self.loader.load_class('Caller'), caller)
+        self.assertIs(self.loader.load_class('Other'), other)
+        self.assertIsNot(self.loader.load_image('Callee'), image)
+        self.assertIs(self.loader.load_image('Other'), other_image)
+        self.assertEqual(self.loader.reloads, 1)
+
+    def test_removed_class_is_unloaded(self):
+        self.loader.load_class('Callee')
+        os.remove(os.path.join(self.temp.name, 'Callee.class'))
+        self.assertEqual(self.loader.reload(), ['Callee'])
+        self.assertNotIn('Callee', self.loader)
+
+    def test_watcher(self):
+        self.loader.load_class('Callee')
+        reloaded = threading.Event()
+        self.loader.on_reload(lambda changed, dependents: reloaded.set())
+        with self.loader.watch(0.01):
+            self.write('Callee', callee_class(3), mtime_ns=10 ** 18)
+            self.assertTrue(reloaded.wait(5))
+
+def callee_class(value):
+    asm = ClassAssembler('Callee')
+    asm.method('value', '()I', ['iconst_%d' % value, 'ireturn'])
+    return asm.assemble()
+
+def caller_class():
+    asm = ClassAssembler('Caller')
+    asm.method('main', '([Ljava/lang/String;)V', [('invokestatic', 'Callee', 'value', '()I'), 'pop', 'return'])
+    return asm.assemble()
+
+def other_class():
+    asm = ClassAssembler('Other')
+    asm.method('main', '([Ljava/lang/String;)V', ['return'])
+    return asm.assemble()
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+from jvpm.ClassLoader import ClassLoader
+from jvpm.ClassPath import ClassNotFoundError, ClassPath, DirectoryEntry, JarEntry, open_entry
+
+DIRECTORY = os.path.dirname(os.path.dirname(__file__))
+
+class TestClassPath(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.jar = os.path.join(self.temp.name, 'lib.jar')
+        with zipfile.ZipFile(self.jar, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.write(os.path.join(DIRECTORY, 'Add.class'), 'Add.class')
+            archive.write(os.path.join(DIRECTORY, 'Foo.class'), 'pkg/Foo.class')
+            archive.writestr('META-INF/MANIFEST.MF', 'Manifest-Version: 1.0\n')
+        self.classes = os.path.join(self.temp.name, 'classes')
+        os.makedirs(os.path.join(self.classes, 'pkg'))
+        shutil.copy(os.path.join(DIRECTORY, 'AddTwo.class'), os.path.join(self.classes, 'pkg', 'AddTwo.class'))
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_open_entry(self):
+        self.assertIsInstance(open_entry(self.classes), DirectoryEntry)
+        entry = open_entry(self.jar)
+        self.assertIsInstance(entry, JarEntry)
+        entry.close()
+
+    def test_jar_index(self):
+        entry = JarEntry(self.jar)
+        self.assertEqual(entry.names(), ['Add.class', 'pkg/Foo.class'])
+        with open(os.path.join(DIRECTORY, 'Add.class'), 'rb') as class_file:
+            self.assertEqual(entry.read('Add.class'), class_file.read())
+        self.assertIsNone(entry.read('Missing.class'))
+        entry.close()
+
+    def test_jar_reads_lazily(self):
+        entry = JarEntry(self.jar)
+        with patch.object(zipfile.ZipFile, 'read', wraps=entry._zip.read) as read:
+            entry.read('pkg/Foo.class')
+            entry.read('Missing.class')
+        self.assertEqual(read.call_count, 1)
+        entry.close()
+
+    def test_class_path_order(self):
+        with ClassPath.parse(os.pathsep.join([self.classes, self.jar])) as classpath:
+            self.assertEqual(classpath.names(), ['pkg/AddTwo.class', 'Add.class', 'pkg/Foo.class'])
+            self.assertTrue(classpath.read('pkg/Foo.class').startswith(b'\xca\xfe\xba\xbe'))
+            with self.assertRaises(ClassNotFoundError):
+                classpath.read('pkg/Missing.class')
+
+    def test_loader_from_jar(self):
+        with ClassPath([self.jar, self.classes]) as classpath:
+            loader = ClassLoader(classpath)
+            self.assertEqual(loader.load_class('pkg.Foo').get_class_name(), 'Foo')
+            self.assertEqual(loader.load_class('pkg/AddTwo').get_class_name(), 'TestyTesticles')
+
+    def test_stat_and_refresh(self):
+        with ClassPath([self.classes, self.jar]) as classpath:
+            self.assertIsNotNone(classpath.stat('pkg/AddTwo.class'))
+            self.assertIsNone(classpath.stat('pkg/Missing.class'))
+            with zipfile.ZipFile(self.jar, 'a') as archive:
+                archive.write(os.path.join(DIRECTORY, 'test.class'), 'pkg/Late.class')
+            os.utime(self.jar, ns=(10 ** 18, 10 ** 18))
+            self.assertIsNone(classpath.stat('pkg/Late.class'))
+            classpath.refresh()
+            self.assertEqual(classpath.stat('pkg/Late.class')[0], 10 ** 18)
+            self.assertTrue(classpath.read('pkg/Late.class').startswith(b'\xca\xfe\xba\xbe'))
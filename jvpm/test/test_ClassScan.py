@@ -0,0 +1,64 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+from jvpm.Assembler import ClassAssembler
+from jvpm.ClassFile import ClassFile
+from jvpm.ClassScan import scan, scan_bytes, scan_file, write_records
+
+DIRECTORY = os.path.dirname(os.path.dirname(__file__))
+
+class TestClassScan(unittest.TestCase):
+    def test_matches_class_file(self):
+        for name in ('Add', 'AddTwo', 'Foo', 'test'):
+            path = os.path.join(DIRECTORY, name + '.class')
+            java = ClassFile(path)
+            record = scan_file(path)
+            self.assertEqual(record.name, java.get_class_name())
+            self.assertEqual(record.super_name, 'java/lang/Object')
+            self.assertEqual([name + descriptor for name, descriptor, _ in record.methods],
+                             [java.get_method_name(method) for method in java.method_table])
+
+    def test_module_package_and_dynamic_constants(self):
+        with open(os.path.join(DIRECTORY, 'Foo.class'), 'rb') as class_file:
+            data = class_file.read()
+        end = 10 + ClassFile.from_bytes(data).cpoolsize
+        count = int.from_bytes(data[8:10], 'big')
+        extra = bytes([19, 0, 1, 20, 0, 1, 17, 0, 0, 0, 1])
+        data = data[:8] + (count + 3).to_bytes(2, 'big') + data[10:end] + extra + data[end:]
+        java = ClassFile.from_bytes(data)
+        self.assertEqual([java.c_pool_table[index].tag for index in range(count - 1, count + 2)], [19, 20, 17])
+        self.assertEqual(scan_bytes(data).name, java.get_class_name())
+
+    def test_members_and_wide_constants(self):
+        assembler = ClassAssembler('pkg/Scanned', source_file='Scanned.java')
+        assembler.interface('java/lang/Runnable')
+        assembler.field('count', 'J')
+        assembler.pool.long(1 << 40)
+        assembler.pool.double(2.5)
+        assembler.method('run', '()V', [('return',)], access_flags=0x0001)
+        record = scan_bytes(assembler.assemble())
+        self.assertEqual(record.name, 'pkg/Scanned')
+        self.assertEqual(record.interfaces, ['java/lang/Runnable'])
+        self.assertEqual([field[:2] for field in record.fields], [('count', 'J')])
+        self.assertEqual(record.methods, [('run', '()V', 0x0001)])
+
+    def test_scan_paths_and_errors(self):
+        with tempfile.TemporaryDirectory() as directory:
+            jar = os.path.join(directory, 'lib.jar')
+            with zipfile.ZipFile(jar, 'w') as archive:
+                archive.write(os.path.join(DIRECTORY, 'Foo.class'), 'pkg/Foo.class')
+                archive.writestr('pkg/Broken.class', b'\xca\xfe\xba\xbe\x00')
+            records = list(scan([jar, os.path.join(DIRECTORY, 'Add.class')]))
+        self.assertEqual([record.source.replace(jar, 'lib.jar') for record in records],
+                         ['lib.jar!/pkg/Broken.class', 'lib.jar!/pkg/Foo.class',
+                          os.path.join(DIRECTORY, 'Add.class')])
+        self.assertIsNotNone(records[0].error)
+        self.assertEqual(records[1].name, 'Foo')
+        out = io.StringIO()
+        self.assertEqual(write_records(records, out), 1)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertIn('error', lines[0])
+        self.assertEqual(lines[2]['methods'][0]['name'], 'main')
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from jvpm.Assembler import ClassAssembler
+from jvpm.ClassFile import AttributeInfo, ClassFile
+from jvpm.ClassWriter import write_class, save_class, strip_debug_attributes
+
+DIRECTORY = os.path.dirname(os.path.dirname(__file__))
+
+class TestClassWriter(unittest.TestCase):
+
+    def reload(self, java):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'Out.class')
+            save_class(java, path)
+            return ClassFile(path)
+
+    def test_round_trip(self):
+        for name in ('Add', 'AddTwo', 'Foo', 'test'):
+            java = ClassFile(os.path.join(DIRECTORY, name + '.class'))
+            self.assertEqual(write_class(java), java.data, name)
+
+    def test_round_trip_assembled(self):
+        asm = ClassAssembler('Wide', source_file='Wide.java')
+        asm.field('count', 'J')
+        asm.method('main', '()V', [('ldc2_w', 5), ('ldc2_w', 1.5), ('ldc', 'x'), 'return'], line_numbers=[(0, 1)])
+        data = asm.assemble()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'Wide.class')
+            asm.write(path)
+            self.assertEqual(write_class(ClassFile(path)), data)
+
+    def test_rewritten_code(self):
+        java = ClassFile(os.path.join(DIRECTORY, 'Add.class'))
+        java.attribute_table[0].code = [0x04, 0x05, 0x60, 0xb1]
+        rewritten = self.reload(java)
+        self.assertEqual(rewritten.attribute_table[0].code, bytes([0x04, 0x05, 0x60, 0xb1]))
+        self.assertEqual(rewritten.attribute_table[0].code_length, 4)
+        self.assertEqual(rewritten.attribute_table[0].attribute_length, 16)
+        self.assertEqual(len(rewritten.attributes), 1)
+        self.assertEqual(rewritten.run_opcodes()._op_stack, [3])
+
+    def test_edited_code_drops_stale_offsets(self):
+        java = ClassFile(os.path.join(DIRECTORY, 'test.class'))
+        # 0 iconst_1, 1 istore_1, 2 iinc 1 1, 5 return becomes iconst_1, istore_1, return
+        java.attribute_table[1].code = bytes([0x04, 0x3c, 0xb1])
+        rewritten = self.reload(java)
+        self.assertEqual(rewritten.attribute_table[1].code, bytes([0x04, 0x3c, 0xb1]))
+        self.assertEqual(rewritten.attribute_table[1].attributes, [])
+        self.assertEqual(rewritten.attribute_table[1].line_number_table, [])
+        self.assertEqual(rewritten.attribute_table[0].line_number_table, [(0, 1)])
+        same_length = ClassFile(os.path.join(DIRECTORY, 'test.class'))
+        same_length.attribute_table[1].code = bytes([0x04, 0x3c, 0x00, 0x00, 0x00, 0xb1])
+        self.assertEqual(len(self.reload(same_length).attribute_table[1].attributes), 1)
+
+    def test_edited_code_with_stack_map_table(self):
+        asm = ClassAssembler('Mapped')
+        stack_map = asm.pool.utf8('StackMapTable')
+        asm.method('main', '()V', ['iconst_1', 'pop', 'return'])
+        java = ClassFile.from_bytes(asm.assemble())
+        table = AttributeInfo()
+        table.attribute_name_index = stack_map
+        table.attribute_length = 2
+        table.info = b'\x00\x00'
+        java.attribute_table[0].attributes.append(table)
+        self.assertIn(b'StackMapTable', write_class(java))
+        java.attribute_table[0].code = bytes([0xb1])
+        with self.assertRaises(ValueError):
+            write_class(java)
+
+    def test_strip_debug_attributes(self):
+        java = strip_debug_attributes(ClassFile(os.path.join(DIRECTORY, 'test.class')))
+        stripped = self.reload(java)
+        self.assertEqual(stripped.attributes, [])
+        self.assertEqual([code.attributes for code in stripped.attribute_table], [[], []])
+        self.assertEqual(stripped.attribute_table[1].code, bytes([0x04, 0x3c, 0x84, 0x01, 0x01, 0xb1]))
+        self.assertLess(len(stripped.data), len(ClassFile(os.path.join(DIRECTORY, 'test.class')).data))
@@ -0,0 +1,101 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from jvpm.Assembler import ClassAssembler
+from jvpm.ClassFile import ClassFile
+from jvpm.Coverage import Coverage, MethodCoverage, basic_blocks
+
+class TestCoverage(unittest.TestCase):
+    def setUp(self):
+        asm = ClassAssembler('Covered')
+        # 0 iload_0, 1 ifle 8, 4 iconst_1, 5 goto 9, 8 iconst_0, 9 ireturn
+        asm.method('sign', '(I)I', ['iload_0', ('ifle', 'else'), 'iconst_1', ('goto', 'end'),
+                                     ('label', 'else'), 'iconst_0', ('label', 'end'), 'ireturn'])
+        self.java = ClassFile.from_bytes(asm.assemble())
+        main = ClassAssembler('Main')
+        main.method('main', '([Ljava/lang/String;)V', [
+            ('getstatic', 'java/lang/System', 'out', 'Ljava/io/PrintStream;'), 'iconst_2',
+            ('invokevirtual', 'java/io/PrintStream', 'println', '(I)V'), 'return'])
+        self.main = ClassFile.from_bytes(main.assemble())
+        self.coverage = Coverage()
+
+    def test_basic_blocks(self):
+        self.assertEqual(basic_blocks(self.java.find_method('sign(I)I').code.code), [0, 4, 8, 9])
+        self.assertEqual(basic_blocks(bytes([0x04, 0xac]), [(0, 1, 1, 0)]), [0, 1])
+        self.assertEqual(basic_blocks(b''), [])
+
+    def test_switch_blocks(self):
+        # 0 iload_0, 1 tableswitch to 24 and 25 with default 26, 24 nop, 25 nop, 26 return
+        code = bytes([0x1a, 0xaa, 0, 0]) + b''.join(value.to_bytes(4, 'big') for value in (25, 0, 1, 23, 24)) + \
+            bytes([0x00, 0x00, 0xb1])
+        self.assertEqual(basic_blocks(code), [0, 24, 25, 26])
+
+    def test_run_marks_blocks(self):
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            self.coverage.run(self.main)
+        self.assertEqual(out.getvalue(), '2\n')
+        method = self.coverage.methods['Main.main([Ljava/lang/String;)V']
+        self.assertEqual(method.covered_blocks(), [0])
+        self.assertEqual(method.bitmap, bytearray([1]))
+
+    def test_run_leaves_untaken_branches_uncovered(self):
+        # sign runs with its argument zeroed, so ifle jumps over the block at 4
+        ops = self.coverage.run(self.java)
+        method = self.coverage.methods['Covered.sign(I)I']
+        self.assertEqual(method.covered_blocks(), [0, 8, 9])
+        self.assertEqual(method.missed_ranges(), [(4, 8)])
+        self.assertEqual(ops._op_stack, [])
+
+    def test_run_ends_methods_at_jumps_it_cannot_follow(self):
+        asm = ClassAssembler('Throws')
+        # 0 iconst_1, 1 ifeq 6, 4 aconst_null, 5 athrow, 6 return
+        asm.method('main', '([Ljava/lang/String;)V', ['iconst_1', ('ifeq', 'end'), 'aconst_null', 'athrow',
+                                                       ('label', 'end'), 'return'])
+        asm.method('fail', '()V', ['aconst_null', 'athrow'])
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            self.coverage.run(ClassFile.from_bytes(asm.assemble()))
+        self.assertEqual(out.getvalue().count('ending the method'), 2)
+        self.assertEqual(self.coverage.methods['Throws.main([Ljava/lang/String;)V'].missed_ranges(), [(6, 7)])
+        self.assertEqual(self.coverage.methods['Throws.fail()V'].covered_blocks(), [0])
+        with self.assertRaises(NotImplementedError):
+            ClassFile.from_bytes(asm.assemble()).method('fail', '()V')
+
+    def test_probes_patch_themselves_out(self):
+        sign = self.coverage.instrument(self.java.method('sign', '(I)I'))
+        method = self.coverage.methods['Covered.sign(I)I']
+        self.assertEqual(sign(5), 1)
+        self.assertEqual(method.covered_blocks(), [0, 4, 9])
+        self.assertEqual(method.missed_ranges(), [(8, 9)])
+        self.assertEqual(sign(-5), 0)
+        self.assertEqual(method.covered_blocks(), [0, 4, 8, 9])
+        self.assertFalse([step for step in sign._steps if step[1] is not None and
+                          getattr(step[1], '__name__', '') == 'probe'])
+        self.assertEqual(sign(3), 1)
+
+    def test_report(self):
+        self.coverage.instrument(self.java.method('sign', '(I)I'))(1)
+        report = self.coverage.report()
+        self.assertIn('Covered.sign(I)I', report)
+        self.assertIn('3/4', report)
+        self.assertIn('8-8', report)
+        self.assertTrue(report.splitlines()[-1].startswith('TOTAL'))
+
+    def test_merge_json(self):
+        self.coverage.instrument(self.java.method('sign', '(I)I'))(1)
+        other = Coverage()
+        other.instrument(self.java.method('sign', '(I)I'))(-1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'coverage.json')
+            other.save_json(path)
+            self.coverage.merge(Coverage.load_json(path))
+        self.assertEqual(self.coverage.methods['Covered.sign(I)I'].covered_blocks(), [0, 4, 8, 9])
+
+    def test_merge_different_code(self):
+        with self.assertRaises(ValueError):
+            MethodCoverage(4, [0]).merge(MethodCoverage(5, [0]))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            Coverage.from_json({'format': 0, 'methods': {}})
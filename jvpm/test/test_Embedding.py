@@ -0,0 +1,96 @@
+import io
+import threading
+import unittest
+from unittest.mock import patch
+from jvpm.Assembler import ACC_PUBLIC, ClassAssembler
+from jvpm.ClassFile import ClassFile
+from jvpm.Embedding import JavaMethod, NoSuchMethodError, parse_descriptor
+
+class TestEmbedding(unittest.TestCase):
+    def setUp(self):
+        asm = ClassAssembler('Embedded')
+        asm.method('add', '(II)I', ['iload_0', 'iload_1', 'iadd', 'ireturn'])
+        asm.method('max', '(II)I', ['iload_0', 'iload_1', ('if_icmplt', 'second'), 'iload_0', 'ireturn',
+                                    ('label', 'second'), 'iload_1', 'ireturn'])
+        asm.method('sum', '(I)I', ['iconst_0', 'istore_1', ('label', 'loop'), 'iload_0', ('ifle', 'done'),
+                                   'iload_1', 'iload_0', 'iadd', 'istore_1', 'iload_0', 'iconst_1', 'isub',
+                                   'istore_0', ('goto', 'loop'), ('label', 'done'), 'iload_1', 'ireturn'])
+        asm.method('half', '(F)F', ['fload_0', 'fconst_2', 'fdiv', 'freturn'])
+        asm.method('show', '(I)V', [('getstatic', 'java/lang/System', 'out', 'Ljava/io/PrintStream;'), 'iload_0',
+                                    ('invokevirtual', 'java/io/PrintStream', 'println', '(I)V'), 'return'])
+        asm.method('array', '()V', [('newarray', 10), 'return'])
+        asm.method('first', '(II)I', ['iload_0', ('goto_w', 'end'), 'iload_1', ('label', 'end'), 'ireturn'])
+        asm.method('instance', '(I)I', ['iload_1', 'ireturn'], access_flags=ACC_PUBLIC)
+        self.java = ClassFile.from_bytes(asm.assemble())
+
+    def test_parse_descriptor(self):
+        self.assertEqual(parse_descriptor('(II)I'), (['I', 'I'], 'I'))
+        self.assertEqual(parse_descriptor('([Ljava/lang/String;F[[I)V'),
+                         (['[Ljava/lang/String;', 'F', '[[I'], 'V'))
+
+    def test_call(self):
+        add = self.java.method('add', '(II)I')
+        self.assertIsInstance(add, JavaMethod)
+        self.assertEqual(add(2, 3), 5)
+        self.assertEqual(add(-7, 3), -4)
+        self.assertIs(type(add(1, 1)), int)
+
+    def test_int_overflow_wraps(self):
+        self.assertEqual(self.java.method('add', '(II)I')(2 ** 31 - 1, 1), -2 ** 31)
+
+    def test_branches(self):
+        maximum = self.java.method('max', '(II)I')
+        self.assertEqual(maximum(4, 9), 9)
+        self.assertEqual(maximum(9, 4), 9)
+        self.assertEqual(self.java.method('sum', '(I)I')(10), 55)
+        self.assertEqual(self.java.method('first', '(II)I')(4, 9), 4)
+
+    def test_float(self):
+        result = self.java.method('half', '(F)F')(3)
+        self.assertIs(type(result), float)
+        self.assertEqual(result, 1.5)
+
+    def test_void(self):
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            self.assertIsNone(self.java.method('show', '(I)V')(42))
+        self.assertEqual(out.getvalue(), '42\n')
+
+    def test_reused_frame(self):
+        add = self.java.method('add', '(II)I')
+        add(0, 0)
+        lva = add._frames.ops._lva
+        for value in range(100):
+            self.assertEqual(add(value, value), 2 * value)
+        self.assertIs(add._frames.ops._lva, lva)
+        self.assertEqual(lva, [99, 99])
+        total = self.java.method('sum', '(I)I')
+        self.assertEqual([total(3), total(3)], [6, 6])
+        operands = [step[2] for step in total._steps]
+        total(3)
+        self.assertEqual([step[2] for step in total._steps], operands)
+        self.assertTrue(all(type(step[2]) is list for step in total._steps))
+
+    def test_threads(self):
+        total = self.java.method('sum', '(I)I')
+        results = []
+        threads = [threading.Thread(target=lambda: results.append([total(n) for n in range(50)]))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [[n * (n + 1) // 2 for n in range(50)]] * 4)
+
+    def test_wrong_argument_count(self):
+        with self.assertRaises(TypeError):
+            self.java.method('add', '(II)I')(1)
+
+    def test_missing_method(self):
+        with self.assertRaises(NoSuchMethodError):
+            self.java.method('add', '(I)I')
+        with self.assertRaises(NoSuchMethodError):
+            self.java.method('instance', '(I)I')
+
+    def test_unsupported_opcode(self):
+        with self.assertRaises(NotImplementedError):
+            self.java.method('array', '()V')
@@ -0,0 +1,75 @@
+import gc
+import io
+import os
+import threading
+import tracemalloc
+import unittest
+from jvpm.ClassFile import ClassFile
+from jvpm.Isolate import ClassImage, Isolate
+
+DIRECTORY = os.path.dirname(os.path.dirname(__file__))
+
+class TestIsolate(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(DIRECTORY, 'Foo.class'), 'rb') as class_file:
+            self.data = class_file.read()
+        self.image = ClassImage.from_bytes(self.data)
+
+    def test_image_is_read_only(self):
+        self.assertEqual(self.image.name, 'Foo')
+        self.assertIn('main([Ljava/lang/String;)V', self.image.methods)
+        with self.assertRaises(AttributeError):
+            self.image.name = 'Bar'
+        with self.assertRaises(AttributeError):
+            del self.image.codes
+        with self.assertRaises(TypeError):
+            self.image.methods['other()V'] = b''
+
+    def test_constant_pool_is_frozen(self):
+        pool = self.image.constants
+        java = ClassFile.from_bytes(self.data)
+        self.assertEqual([pool.resolve(index) for index in range(len(pool)) if pool.tags[index] in (1, 9, 10)],
+                         [java.c_pool_table.resolve(index) for index in range(len(pool))
+                          if java.c_pool_table.tags[index] in (1, 9, 10)])
+        self.assertEqual([(entry.tag, entry.info) for entry in pool],
+                         [(entry.tag, entry.info) for entry in java.c_pool_table])
+        self.assertFalse(hasattr(pool, 'invalidate'))
+        with self.assertRaises(AttributeError):
+            pool.symbols = ()
+        with self.assertRaises(TypeError):
+            pool.data[0] = 0
+        Isolate(stdout=io.StringIO()).run(self.image)
+        self.assertFalse(hasattr(pool, '__dict__'))
+
+    def test_isolates_keep_their_own_output(self):
+        outputs = [io.StringIO() for _ in range(8)]
+        isolates = [Isolate('tenant%d' % i, out) for i, out in enumerate(outputs)]
+        threads = [threading.Thread(target=isolate.run, args=(self.image,)) for isolate in isolates]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([out.getvalue() for out in outputs], ['5\n'] * 8)
+        self.assertTrue(all(isolate.frames == [] for isolate in isolates))
+
+    def test_run_one_method(self):
+        out = io.StringIO()
+        isolate = Isolate(stdout=out)
+        ops = isolate.run(self.image, 'main([Ljava/lang/String;)V')
+        self.assertEqual(out.getvalue(), '5\n')
+        self.assertIs(ops.monitors, isolate.monitors)
+
+    def test_isolates_share_the_image(self):
+        first, second = Isolate(), Isolate()
+        self.assertIsNot(first.monitors, second.monitors)
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        isolates = [Isolate(stdout=io.StringIO()) for _ in range(20)]
+        per_isolate = (tracemalloc.get_traced_memory()[0] - before) / 20
+        before = tracemalloc.get_traced_memory()[0]
+        classes = [ClassFile.from_bytes(self.data) for _ in range(20)]
+        per_class = (tracemalloc.get_traced_memory()[0] - before) / 20
+        tracemalloc.stop()
+        self.assertLess(per_isolate, per_class)
+        del isolates, classes
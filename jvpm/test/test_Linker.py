@@ -0,0 +1,115 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from jvpm.Assembler import ClassAssembler
+from jvpm.ClassLoader import ClassLoader
+from jvpm.Linker import MAIN, Linker
+
+def write_class(directory, asm):
+    with open(os.path.join(directory, asm.name + '.class'), 'wb') as class_file:
+        class_file.write(asm.assemble())
+
+class TestLinker(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        main = ClassAssembler('Main')
+        main.method('main', '([Ljava/lang/String;)V', [
+            ('getstatic', 'java/lang/System', 'out', 'Ljava/io/PrintStream;'),
+            ('invokestatic', 'Helper', 'used', '()I'),
+            ('getstatic', 'java/lang/System', 'out', 'Ljava/io/PrintStream;'),
+            'iconst_3',
+            ('invokevirtual', 'java/io/PrintStream', 'println', '(I)V'),
+            'return'])
+        main.method('neverCalled', '()V', [('invokestatic', 'Library', 'big', '()V'), 'return'])
+        helper = ClassAssembler('Helper', 'Base')
+        helper.method('used', '()I', [('invokestatic', 'Helper', 'inherited', '()V'), 'iconst_1', 'ireturn'])
+        helper.method('unused', '()V', ['return'])
+        base = ClassAssembler('Base')
+        base.method('inherited', '()V', ['return'])
+        library = ClassAssembler('Library')
+        library.method('big', '()V', ['return'])
+        for asm in (main, helper, base, library):
+            write_class(self.temp.name, asm)
+        self.loader = ClassLoader([self.temp.name])
+        self.linker = Linker(self.loader)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_links_only_reachable_methods(self):
+        linked = self.linker.link('Main')
+        self.assertEqual(set(linked), {('Main', MAIN), ('Helper', 'used()I'), ('Helper', 'inherited()V')})
+        self.assertIn(('java/io/PrintStream', 'println(I)V'), self.linker.external)
+        self.assertNotIn('Library', self.loader)
+        self.assertEqual(self.linker.classes, ['Main', 'Helper', 'Base'])
+        self.assertIn(('Main', 'neverCalled()V'), self.linker.unlinked())
+        self.assertIn(('Helper', 'unused()V'), self.linker.unlinked())
+
+    def test_only_linked_code_is_decoded(self):
+        self.linker.link('Main')
+        helper = self.loader.load_class('Helper')
+        decoded = {helper.get_method_name(method): method._pending is None for method in helper.method_table}
+        self.assertEqual(decoded, {'used()I': True, 'unused()V': False})
+
+    def test_reload_unlinks_changed_code(self):
+        self.linker.link('Main')
+        old = self.linker.linked[('Helper', 'inherited()V')]
+        base = ClassAssembler('Base')
+        base.method('inherited', '()V', [('invokestatic', 'Library', 'big', '()V'), 'return'])
+        write_class(self.temp.name, base)
+        os.utime(os.path.join(self.temp.name, 'Base.class'), ns=(10 ** 18, 10 ** 18))
+        self.assertEqual(self.loader.reload(), ['Base'])
+        self.assertEqual(set(self.linker.linked), set())
+        linked = self.linker.link('Main')
+        self.assertIsNot(linked[('Helper', 'inherited()V')], old)
+        self.assertIn(('Library', 'big()V'), linked)
+
+    def test_reload_keeps_unrelated_links(self):
+        self.linker.link('Main')
+        self.linker.link('Library', 'big()V')
+        library = ClassAssembler('Library')
+        library.method('big', '()V', ['nop', 'return'])
+        write_class(self.temp.name, library)
+        os.utime(os.path.join(self.temp.name, 'Library.class'), ns=(10 ** 18, 10 ** 18))
+        self.assertEqual(self.loader.reload(), ['Library'])
+        self.assertEqual(set(self.linker.linked), {('Main', MAIN), ('Helper', 'used()I'), ('Helper', 'inherited()V')})
+
+    def test_run(self):
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            self.linker.run('Main')
+        self.assertEqual(out.getvalue(), '3\n')
+
+    def test_run_passes_arguments_and_results(self):
+        calls = ClassAssembler('Calls')
+        calls.method('main', '([Ljava/lang/String;)V', [
+            ('getstatic', 'java/lang/System', 'out', 'Ljava/io/PrintStream;'),
+            'iconst_2', 'iconst_3',
+            ('invokestatic', 'Calls', 'add', '(II)I'),
+            ('invokevirtual', 'java/io/PrintStream', 'println', '(I)V'),
+            'return'])
+        calls.method('add', '(II)I', ['iload_0', 'iload_1', 'iadd', 'ireturn'], max_locals=2)
+        write_class(self.temp.name, calls)
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            ops = self.linker.run('Calls')
+        self.assertEqual(out.getvalue(), '5\n')
+        self.assertEqual(ops._op_stack, [])
+
+    def test_unlink_from_another_thread(self):
+        stop = threading.Event()
+        def reload():
+            while not stop.is_set():
+                self.linker._unlink(['Helper', 'Base'], [])
+        thread = threading.Thread(target=reload)
+        thread.start()
+        try:
+            with patch('sys.stdout', new_callable=io.StringIO) as out:
+                for _ in range(200):
+                    self.linker.run('Main')
+                    self.linker.link('Main')
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(out.getvalue(), '3\n' * 200)
@@ -0,0 +1,51 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from jvpm.ClassFile import ClassFile
+from jvpm.OpCodes import OpCodes
+from jvpm.Profiler import Profiler, opcode_name
+
+ADD = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Add.class')
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = Profiler()
+        with patch('sys.stdout', new_callable=io.StringIO):
+            self.ops = self.profiler.run(ClassFile(ADD))
+
+    def test_counts(self):
+        self.assertEqual(self.profiler.opcode_counts['iadd'], 1)
+        self.assertEqual(self.profiler.opcode_counts['iconst_2'], 5)
+        self.assertEqual(self.profiler.pc_counts[('main([Ljava/lang/String;)V', 2)], 1)
+        self.assertEqual(self.profiler.pair_counts[('iconst_1', 'iconst_2')], 3)
+        self.assertEqual(sum(self.profiler.opcode_counts.values()), 35)
+
+    def test_same_result_as_run_opcodes(self):
+        with patch('sys.stdout', new_callable=io.StringIO):
+            self.assertEqual(self.ops._op_stack, ClassFile(ADD).run_opcodes()._op_stack)
+
+    def test_top_tables(self):
+        self.assertEqual(len(self.profiler.top_opcodes(3)), 3)
+        times = [seconds for _, _, seconds in self.profiler.top_opcodes(100)]
+        self.assertEqual(times, sorted(times, reverse=True))
+        self.assertEqual(self.profiler.top_pairs(1)[0][2], 3)
+        self.assertEqual(len(self.profiler.top_pcs(5)), 5)
+        self.assertIn('iadd', self.profiler.report(100))
+
+    def test_json(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.json')
+            self.profiler.save_json(path)
+            with open(path) as json_file:
+                data = json.load(json_file)
+        self.assertEqual(data['opcodes']['iconst_2']['count'], 5)
+        self.assertEqual(sum(data['opcodes']['iconst_2']['histogram'].values()), 5)
+        self.assertEqual(len(data['pcs']), 35)
+
+    def test_opcode_name(self):
+        self.assertEqual(opcode_name(OpCodes(), 0x60), 'iadd')
+        self.assertEqual(opcode_name(OpCodes(), 0x00), '0x0')
+        self.assertEqual(opcode_name(OpCodes(), 0xfe), '0xfe')
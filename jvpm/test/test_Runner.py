@@ -0,0 +1,33 @@
+import os
+import unittest
+from jvpm import Runner
+
+FOO = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Foo.class')
+
+class TestRunner(unittest.TestCase):
+
+    def test_find_class_files(self):
+        files = Runner.find_class_files([os.path.dirname(FOO)])
+        self.assertIn(FOO, files)
+        self.assertEqual(files, sorted(files))
+        self.assertEqual(Runner.find_class_files(['missing.class']), ['missing.class'])
+
+    def test_run_file(self):
+        result = Runner.run_file(FOO)
+        self.assertEqual(result.output, '5\n')
+        self.assertIsNone(result.error)
+        self.assertGreaterEqual(result.seconds, 0)
+
+    def test_run_file_error(self):
+        result = Runner.run_file('missing.class')
+        self.assertIn('FileNotFoundError', result.error)
+        self.assertIn('Error: FileNotFoundError', Runner.format_result(result))
+
+    def test_run_files_order(self):
+        results = Runner.run_files([FOO, 'missing.class', FOO], jobs=2)
+        self.assertEqual([result.path for result in results], [FOO, 'missing.class', FOO])
+        self.assertEqual(results[2].output, '5\n')
+
+    def test_format_result(self):
+        text = Runner.format_result(Runner.RunResult('Foo.class', '5\n', 0.5))
+        self.assertEqual(text, '==> Foo.class (0.500s)\n5\n')
@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from jvpm.Assembler import ClassAssembler
+from jvpm.ClassFile import ClassFile
+from jvpm.Coverage import Coverage
+from jvpm.Isolate import ClassImage, Isolate
+from jvpm.Sampler import Sampler
+
+DIRECTORY = os.path.dirname(os.path.dirname(__file__))
+
+class TestSampler(unittest.TestCase):
+
+    def test_sample(self):
+        sampler = Sampler()
+        with patch('builtins.print', side_effect=lambda *args: sampler.sample()):
+            ClassFile(os.path.join(DIRECTORY, 'Foo.class')).run_opcodes()
+        self.assertEqual(dict(sampler.samples), {('Foo.main',): 1})
+        self.assertEqual(sampler.collapsed(), 'Foo.main 1\n')
+
+    def test_no_java_frames(self):
+        sampler = Sampler()
+        sampler.sample()
+        self.assertEqual(len(sampler.samples), 0)
+
+    def test_line_numbers(self):
+        java = ClassFile(os.path.join(DIRECTORY, 'test.class'))
+        sampler = Sampler()
+        with patch('jvpm.OpCodes.OpCodes._ret', side_effect=lambda: sampler.sample()):
+            java.run_opcodes()
+        self.assertEqual(dict(sampler.samples), {('test.<init>:1',): 1, ('test.main:1',): 1})
+        self.assertEqual(java.attribute_table[1].get_line_number(3), 1)
+
+    def test_background_thread(self):
+        java = ClassFile(os.path.join(DIRECTORY, 'Foo.class'))
+        with patch('builtins.print'):
+            with Sampler(interval=0.001) as sampler:
+                deadline = time.perf_counter() + 0.2
+                while time.perf_counter() < deadline and not sampler.samples:
+                    java.run_opcodes()
+        self.assertEqual(set(stack for stack in sampler.samples), {('Foo.main',)})
+        self.assertFalse(any(thread.name == 'jvpm-sampler' for thread in threading.enumerate()))
+
+    def test_registered_loops(self):
+        asm = ClassAssembler('Embedded')
+        asm.method('show', '()V', [('getstatic', 'java/lang/System', 'out', 'Ljava/io/PrintStream;'), 'iconst_1',
+                                    ('invokevirtual', 'java/io/PrintStream', 'println', '(I)V'), 'return'])
+        java = ClassFile.from_bytes(asm.assemble())
+        sampler = Sampler()
+        with patch('builtins.print', side_effect=lambda *args: sampler.sample()):
+            java.method('show', '()V')()
+            Isolate().run(ClassImage.from_class(java))
+            Coverage().run(java)
+        self.assertEqual(dict(sampler.samples), {('Embedded.show',): 3})
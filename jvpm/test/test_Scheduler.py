@@ -0,0 +1,109 @@
+import unittest
+from jvpm.ClassFile import ConstantInfo
+from jvpm.Monitors import Monitors, IllegalMonitorStateError
+from jvpm.OpCodes import OpCodes
+from jvpm.Scheduler import Scheduler, JavaThread, DeadlockError
+
+def constant(tag, info):
+    const = ConstantInfo()
+    const.tag = tag
+    const.info = list(info)
+    return const
+
+# 6 is java/lang/Object.wait:()V, 9 is java/lang/Object.notify:()V and 14 is java/lang/Thread.yield:()V
+C_POOL = [constant(1, b'java/lang/Object'), constant(7, [0, 1]), constant(1, b'wait'), constant(1, b'()V'),
+          constant(12, [0, 3, 0, 4]), constant(10, [0, 2, 0, 5]), constant(1, b'notify'),
+          constant(12, [0, 7, 0, 4]), constant(10, [0, 2, 0, 8]), constant(1, b'java/lang/Thread'),
+          constant(7, [0, 10]), constant(1, b'yield'), constant(12, [0, 12, 0, 4]), constant(10, [0, 11, 0, 13])]
+
+class TestScheduler(unittest.TestCase):
+
+    def test_threads_have_own_state(self):
+        scheduler = Scheduler(budget=1)
+        first = scheduler.spawn([0x1a, 0x04, 0x60, 0x3b], lva=[10])
+        second = scheduler.spawn([0x1a, 0x05, 0x60, 0x3b], lva=[20])
+        scheduler.run()
+        self.assertEqual(first.ops._lva, [11])
+        self.assertEqual(second.ops._lva, [22])
+        self.assertEqual(scheduler.instructions, 8)
+        self.assertEqual(scheduler.switches, 8)
+
+    def test_budget(self):
+        scheduler = Scheduler(budget=3)
+        scheduler.spawn([0x04] * 6)
+        scheduler.spawn([0x04] * 6)
+        scheduler.run()
+        self.assertEqual(scheduler.switches, 4)
+
+    def test_monitor_blocks(self):
+        code = [0x04, 0xc2, 0x05, 0x06, 0x60, 0x3b, 0x04, 0xc3]
+        scheduler = Scheduler(budget=1)
+        first = scheduler.spawn(code)
+        second = scheduler.spawn(code)
+        first.run(2)
+        self.assertIs(scheduler.monitors.owner(1), first.ops)
+        self.assertEqual(second.run(5), 2)
+        self.assertEqual(second.ops.pending_monitor, (1, 1))
+        self.assertFalse(second.runnable())
+        scheduler.run()
+        self.assertIsNone(second.ops.pending_monitor)
+        self.assertEqual(second.ops._lva, [5])
+        self.assertIsNone(scheduler.monitors.owner(1))
+
+    def test_wait_notify(self):
+        scheduler = Scheduler()
+        waiter = scheduler.spawn([0x04, 0xc2, 0x04, 0xb6, 0x00, 0x06, 0x04, 0xc3], C_POOL)
+        scheduler.spawn([0x04, 0xc2, 0x04, 0xb6, 0x00, 0x09, 0x04, 0xc3], C_POOL)
+        waiter.run(100)
+        self.assertFalse(waiter.ops.notified)
+        self.assertIsNone(scheduler.monitors.owner(1))
+        scheduler.run()
+        self.assertTrue(waiter.finished())
+        self.assertIsNone(scheduler.monitors.owner(1))
+
+    def test_deadlock(self):
+        scheduler = Scheduler()
+        scheduler.spawn([0x04, 0xc2, 0x04, 0xb6, 0x00, 0x06, 0x04, 0xc3], C_POOL)
+        with self.assertRaises(DeadlockError):
+            scheduler.run()
+
+    def test_yield(self):
+        thread = JavaThread([0x04, 0xb6, 0x00, 0x0e, 0x04], C_POOL)
+        self.assertEqual(thread.run(10), 2)
+        self.assertFalse(thread.ops.yielding)
+
+class TestMonitors(unittest.TestCase):
+
+    def test_reentrant(self):
+        monitors = Monitors()
+        owner, other = object(), object()
+        self.assertTrue(monitors.acquire('lock', owner))
+        self.assertTrue(monitors.acquire('lock', owner))
+        self.assertFalse(monitors.acquire('lock', other))
+        monitors.release('lock', owner)
+        self.assertIs(monitors.owner('lock'), owner)
+        monitors.release('lock', owner)
+        self.assertTrue(monitors.acquire('lock', other))
+
+    def test_not_owner(self):
+        monitors = Monitors()
+        with self.assertRaises(IllegalMonitorStateError):
+            monitors.release('lock', object())
+        with self.assertRaises(IllegalMonitorStateError):
+            monitors.notify('lock', object())
+
+    def test_monitorexit_not_owner_raises(self):
+        ops = OpCodes()
+        ops._op_stack.append('lock')
+        with self.assertRaises(IllegalMonitorStateError):
+            ops.interpret(0xc3)
+
+    def test_notify_all(self):
+        monitors = Monitors()
+        first, second, notifier = object(), object(), object()
+        for waiter in (first, second):
+            monitors.acquire('lock', waiter, 2)
+            self.assertEqual(monitors.wait('lock', waiter), 2)
+        monitors.acquire('lock', notifier)
+        self.assertEqual(monitors.notify('lock', notifier, notify_all=True), [first, second])
+        self.assertEqual(monitors.notify('lock', notifier), [])
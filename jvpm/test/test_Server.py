@@ -0,0 +1,65 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+from jvpm import Server
+
+FOO = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Foo.class')
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.directory.name, 'jvpm.sock')
+        self.server = Server.ClassServer(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def test_request(self):
+        out = io.StringIO()
+        self.assertEqual(Server.request(self.socket_path, FOO, out=out), '5\n')
+        self.assertEqual(out.getvalue(), '5\n')
+
+    def test_cache(self):
+        Server.request(self.socket_path, FOO, out=io.StringIO())
+        Server.request(self.socket_path, FOO, out=io.StringIO())
+        self.assertEqual(self.server.misses, 1)
+        self.assertEqual(self.server.hits, 1)
+
+    def test_missing_file(self):
+        output = Server.request(self.socket_path, 'missing.class', out=io.StringIO())
+        self.assertTrue(output.startswith('Error: FileNotFoundError'))
+
+    def test_concurrent_requests(self):
+        outputs = []
+        threads = [threading.Thread(target=lambda: outputs.append(
+            Server.request(self.socket_path, FOO, out=io.StringIO()))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(outputs, ['5\n'] * 8)
+
+    def test_close_removes_socket(self):
+        self.assertTrue(os.path.exists(self.socket_path))
+        self.server.shutdown()
+        self.server.server_close()
+        self.assertFalse(os.path.exists(self.socket_path))
+        self.server = Server.ClassServer(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def test_refuses_to_remove_regular_file(self):
+        path = os.path.join(self.directory.name, 'notes.txt')
+        with open(path, 'w') as notes:
+            notes.write('keep me')
+        with self.assertRaises(FileExistsError):
+            Server.ClassServer(path)
+        with open(path) as notes:
+            self.assertEqual(notes.read(), 'keep me')
@@ -0,0 +1,56 @@
+import io
+import os
+import unittest
+from jvpm.Assembler import ClassAssembler
+from jvpm.ClassFile import ClassFile
+from jvpm.Isolate import Isolate
+from jvpm.Runner import run_files
+from jvpm.SharedImage import SharedImage, attach, layout, read_images, run_files_shared
+
+DIRECTORY = os.path.dirname(os.path.dirname(__file__))
+
+class TestSharedImage(unittest.TestCase):
+    def setUp(self):
+        self.classes = [ClassFile(os.path.join(DIRECTORY, name + '.class')) for name in ('Foo', 'test')]
+
+    def test_layout_round_trip(self):
+        buffer = layout(self.classes)
+        images = read_images(buffer)
+        self.assertEqual([image.name for image in images], ['Foo', 'test'])
+        self.assertEqual(bytes(images[1].methods['main([Ljava/lang/String;)V']),
+                         bytes([0x04, 0x3c, 0x84, 0x01, 0x01, 0xb1]))
+        pool = images[0].constants
+        self.assertIsInstance(pool.data, memoryview)
+        self.assertEqual([pool.utf8(index) for index in range(len(pool)) if pool.tags[index] == 1],
+                         [self.classes[0].c_pool_table.utf8(index) for index in range(len(pool))
+                          if self.classes[0].c_pool_table.tags[index] == 1])
+        out = io.StringIO()
+        Isolate(stdout=out).run(images[0])
+        self.assertEqual(out.getvalue(), '5\n')
+
+    def test_bad_image(self):
+        with self.assertRaises(ValueError):
+            read_images(b'\x00' * 16)
+
+    def test_attach(self):
+        with SharedImage(self.classes) as image:
+            shm, images = attach(image.name)
+            self.assertEqual(images[0].name, 'Foo')
+            self.assertEqual(bytes(images[0].constants.data), self.classes[0].data)
+            del images
+            shm.close()
+
+    def test_wide_constants(self):
+        asm = ClassAssembler('Wide')
+        asm.pool.long(1 << 40)
+        asm.method('main', '([Ljava/lang/String;)V', [('ldc', 'after'), 'return'])
+        image = read_images(layout([ClassFile.from_bytes(asm.assemble())]))[0]
+        ops = Isolate().run(image)
+        self.assertEqual(ops._op_stack, ['after'])
+
+    def test_run_files_shared_matches_run_files(self):
+        paths = [os.path.join(DIRECTORY, name + '.class') for name in ('Add', 'Foo')]
+        shared = run_files_shared(paths, 2)
+        plain = run_files(paths, 2)
+        self.assertEqual([(result.path, result.output, result.error) for result in shared],
+                         [(result.path, result.output, result.error) for result in plain])
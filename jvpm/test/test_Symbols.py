@@ -0,0 +1,72 @@
+import io
+import unittest
+from unittest.mock import patch
+from jvpm.Assembler import ClassAssembler
+from jvpm.ClassFile import ClassFile, ConstantInfo
+from jvpm.OpCodes import OpCodes, PRINTLN_STRING, resolve_symbol
+from jvpm.Symbols import SYMBOLS, SymbolTable, intern
+
+def greeting_class(name):
+    asm = ClassAssembler(name)
+    asm.method('main', '([Ljava/lang/String;)V', [
+        ('getstatic', 'java/lang/System', 'out', 'Ljava/io/PrintStream;'),
+        ('ldc', 'Hello' + ' World'),
+        ('invokevirtual', 'java/io/PrintStream', 'println', '(Ljava/lang/String;)V'),
+        ('ldc', 'Hello' + ' World'),
+        'return'])
+    return ClassFile.from_bytes(asm.assemble())
+
+class TestSymbolTable(unittest.TestCase):
+    def test_intern(self):
+        table = SymbolTable()
+        first = ''.join(['java/lang/', 'Object'])
+        second = ''.join(['java/lang/', 'Object'])
+        self.assertIsNot(first, second)
+        self.assertIs(table.intern(first), first)
+        self.assertIs(table.intern(second), first)
+        self.assertIn(second, table)
+        self.assertEqual(len(table), 1)
+        self.assertFalse(hasattr(table, 'clear'))
+
+    def test_classes_share_symbols(self):
+        first = greeting_class('First')
+        second = greeting_class('Second')
+        self.assertIs(first._get_utf8(first.method_table[0].name_index),
+                      second._get_utf8(second.method_table[0].name_index))
+        self.assertIs(first.get_method_name(first.method_table[0]), second.get_method_name(second.method_table[0]))
+        self.assertIs(first._get_utf8(first._u2_info(first._get_super_class())), SYMBOLS.intern('java/lang/Object'))
+
+    def test_ldc_strings_are_interned(self):
+        stacks = []
+        for name in ('First', 'Second'):
+            with patch('sys.stdout', new_callable=io.StringIO) as out:
+                stacks.append(greeting_class(name).run_opcodes()._op_stack)
+            self.assertEqual(out.getvalue(), 'Hello World\n')
+        self.assertIs(stacks[0][-1], stacks[1][-1])
+        self.assertIs(stacks[0][-1], intern('Hello World'))
+
+    def test_resolved_references_compare_by_identity(self):
+        java = greeting_class('Third')
+        methods = [java.c_pool_table.resolve(index) for index in range(len(java.c_pool_table))
+                   if java.c_pool_table.tags[index] == 10]
+        self.assertEqual(len(methods), 1)
+        self.assertIs(methods[0], PRINTLN_STRING)
+
+    def test_natives_do_not_need_the_interned_copy(self):
+        asm = ClassAssembler('Printer')
+        asm.method('main', '([Ljava/lang/String;)V', [
+            ('getstatic', 'java/lang/System', 'out', 'Ljava/io/PrintStream;'), 'iconst_3',
+            ('invokevirtual', 'java/io/PrintStream', 'println', '(I)V'), 'return'])
+        java = ClassFile.from_bytes(asm.assemble())
+        index = [index for index in range(len(java.c_pool_table)) if java.c_pool_table.tags[index] == 10][0]
+        java.c_pool_table._strings[index] = ''.join(['java/io/PrintStream.println', ':(I)V'])
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            java.run_opcodes()
+        self.assertEqual(out.getvalue(), '3\n')
+
+    def test_resolve_symbol_on_a_list(self):
+        text = ConstantInfo()
+        text.tag = 1
+        text.info = list(b'java/lang/Object')
+        self.assertIs(resolve_symbol([text], 0), intern('java/lang/Object'))
+        self.assertIs(OpCodes()._get_str_from_cpool(0, [text]), intern('java/lang/Object'))